@@ -1,36 +1,115 @@
-from pymongo import MongoClient
 import pandas as pd
 
-MONGO_DB_URL = "mongodb://localhost:27017/"
-DB_NAME = "missha_price_data"
+from veri_toplama.db import get_collection
+from veri_toplama.price_history import price_trend
+from veri_toplama.catalog import product_version
+from veri_toplama.review_tokens import analyze_reviews, analyze_review_stream
+from veri_toplama.review_store import iter_product_reviews
+from veri_toplama.review_stats import load_review_stats, summary_from_stats
+from analiz.cache import cached_analysis
+
 COLLECTION = "e_ticaret_offers"
 
 
 def _get_collection():
-    client = MongoClient(MONGO_DB_URL)
-    db = client[DB_NAME]
-    return db[COLLECTION]
+    # Süreç genelinde paylaşılan, havuzlu MongoClient kullanılır
+    return get_collection(COLLECTION)
+
+
+# Analizlerin kullandığı alanlar (_id ve büyük/ilgisiz alanlar hariç)
+ANALIZ_PROJECTION = {
+    "_id": 0, "product_id": 1, "product_name": 1, "category": 1, "site": 1,
+    "vendor_name": 1, "seller_nickname": 1, "price": 1, "rating": 1,
+    "review_count": 1, "scrape_ts": 1, "reviews_list": 1,
+}
+
+# Görünüm -> çekilecek alanlar. Fiyat/puan analizleri eski dokümanlardaki yorum dizilerini
+# (reviews_list) hiç taşımaz; yorumlar ayrı reviews koleksiyonundan okunur (load_reviews).
+GORUNUMLER = {
+    "teklifler": ["product_name", "category", "site", "vendor_name", "seller_nickname",
+                  "price", "rating", "review_count", "scrape_ts"],
+    "puanlar": ["site", "price", "rating", "review_count"],
+}
+YORUM_ALANLARI = ["site", "text", "rating_value", "first_seen", "last_seen"]
+
+# Alan -> sütun tipi. Listede olmayan alanlar object olarak kalır.
+ALAN_TIPLERI = {
+    "price": "float64",
+    "rating": "float64",
+    "review_count": "float64",
+    "scrape_ts": "datetime64[ns]",
+    "rating_value": "float64",
+    "first_seen": "datetime64[ns]",
+    "last_seen": "datetime64[ns]",
+}
 
+CURSOR_BATCH_SIZE = 500
 
-def load_data(product_id: str) -> pd.DataFrame:
+GRUP_ANAHTARI = ["site", "vendor_name", "seller_nickname"]
+
+
+def _sutun(values, dtype):
+    if dtype == "datetime64[ns]":
+        return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+    if dtype == "float64":
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float64")
+    return pd.Series(values, dtype=object)
+
+
+def frame_from_cursor(cursor, fields, batch_size: int = CURSOR_BATCH_SIZE) -> pd.DataFrame:
     """
-    Belirli bir product_id için e_ticaret_offers koleksiyonundan tüm kayıtları DataFrame olarak döndürür.
+    Cursor'ı batch'ler halinde okuyup sütun listelerine doldurur ve DataFrame'i açık tiplerle kurar
+    (ara doküman listesi tutulmaz). Hiçbir dokümanda bulunmayan alanlar sütun olarak eklenmez.
     """
-    col = _get_collection()
-    docs = list(col.find({"product_id": product_id}))
-    if not docs:
+    columns = {field: [] for field in fields}
+    seen = set()
+    for doc in cursor.batch_size(batch_size):
+        seen.update(doc.keys())
+        for field, values in columns.items():
+            values.append(doc.get(field))
+    if not seen:
         return pd.DataFrame()
-    df = pd.DataFrame(docs)
-    if "scrape_ts" in df.columns:
-        df["scrape_ts"] = pd.to_datetime(df["scrape_ts"], errors="coerce")
-    return df
+    return pd.DataFrame({
+        field: _sutun(values, ALAN_TIPLERI.get(field, "object"))
+        for field, values in columns.items()
+        if field in seen
+    })
+
+
+def load_view(product_id: str, view: str) -> pd.DataFrame:
+    """Ürünün tekliflerini GORUNUMLER'deki görünümün alanlarıyla (projection) yükler."""
+    fields = GORUNUMLER[view]
+    cursor = _get_collection().find({"product_id": product_id}, {"_id": 0, **{f: 1 for f in fields}})
+    return frame_from_cursor(cursor, fields)
+
+
+def load_reviews(product_id: str) -> pd.DataFrame:
+    """Ürünün tekrarsız yorum arşivini (reviews koleksiyonu) DataFrame olarak yükler."""
+    db = _get_collection().database
+    return frame_from_cursor(iter_product_reviews(db, product_id, YORUM_ALANLARI), YORUM_ALANLARI)
+
+
+def load_data(product_id: str, projection: dict | None = None) -> pd.DataFrame:
+    """
+    Belirli bir product_id için e_ticaret_offers koleksiyonundan tüm kayıtları DataFrame olarak döndürür.
+    projection verilirse sadece istenen alanlar çekilir. Sadece belirli bir analiz için load_view tercih edilmeli.
+    """
+    projection = projection or ANALIZ_PROJECTION
+    fields = [f for f, include in projection.items() if include and f != "_id"]
+    return frame_from_cursor(_get_collection().find({"product_id": product_id}, projection), fields)
 
 
-def fiyat_trendi(product_id: str) -> pd.DataFrame | None:
+def fiyat_trendi(product_id: str, unit: str = "hour", start=None, end=None) -> pd.DataFrame | None:
     """
     Zaman içinde min / max / ortalama fiyat trendini döndürür.
+    Veriyi append-only price_history koleksiyonundan okur (unit: "hour", "day", ...);
+    geçmiş henüz yoksa güncel tekliflerden tek noktalı trend üretir.
     """
-    df = load_data(product_id)
+    rows = price_trend(_get_collection().database, product_id, unit=unit, start=start, end=end)
+    if rows:
+        return pd.DataFrame(rows, columns=["scrape_ts", "min", "max", "mean"])
+
+    df = load_view(product_id, "teklifler")
     if df.empty or "scrape_ts" not in df.columns:
         return None
 
@@ -48,26 +127,7 @@ def rakip_analizi(product_id: str) -> pd.DataFrame | None:
     Her site + satıcı + seller_nickname için son (en güncel) fiyat / puan / yorum sayısını döndürür.
     seller_nickname'i de dahil ederek Pazarama gibi sitelerde farklı satıcıları ayırt eder.
     """
-    df = load_data(product_id)
-    if df.empty:
-        return None
-
-    # seller_nickname None ise boş string yap (gruplama için)
-    df["seller_nickname"] = df["seller_nickname"].fillna("")
-
-    # En son scrape edilen kayıtları al (site + vendor_name + seller_nickname bazında)
-    latest = (
-        df.sort_values("scrape_ts")
-        .groupby(["site", "vendor_name", "seller_nickname"], as_index=False)
-        .tail(1)
-    )
-
-    # seller_nickname boş string ise None yap
-    latest["seller_nickname"] = latest["seller_nickname"].replace("", None)
-
-    latest = latest.sort_values("price")
-    cols = ["site", "vendor_name", "seller_nickname", "price", "rating", "review_count"]
-    return latest[cols]
+    return UrunAnalizi(product_id).rakip_analizi()
 
 
 def dinamik_fiyat_oneri(product_id: str, marj_yuzde: float = 5.0) -> dict | None:
@@ -76,29 +136,7 @@ def dinamik_fiyat_oneri(product_id: str, marj_yuzde: float = 5.0) -> dict | None
     - Tüm sitelerdeki en düşük güncel fiyatı bulur (seller_nickname'i de dikkate alarak).
     - Bu fiyata göre belirli bir marj ile önerilen fiyat döner.
     """
-    df = load_data(product_id)
-    if df.empty:
-        return None
-
-    # seller_nickname None ise boş string yap (gruplama için)
-    df["seller_nickname"] = df["seller_nickname"].fillna("")
-
-    # En son scrape edilen kayıtları al (site + vendor_name + seller_nickname bazında)
-    latest = (
-        df.sort_values("scrape_ts")
-        .groupby(["site", "vendor_name", "seller_nickname"], as_index=False)
-        .tail(1)
-    )
-
-    min_price = latest["price"].min()
-    suggested = round(min_price * (1 + marj_yuzde / 100), 2)
-
-    return {
-        "product_id": product_id,
-        "min_rakip_fiyati": float(min_price),
-        "onerilen_fiyat": suggested,
-        "marj_yuzde": marj_yuzde,
-    }
+    return UrunAnalizi(product_id).dinamik_fiyat_oneri(marj_yuzde)
 
 
 def puan_ozellik_analizi(product_id: str) -> pd.DataFrame | None:
@@ -107,21 +145,7 @@ def puan_ozellik_analizi(product_id: str) -> pd.DataFrame | None:
     - Site bazında ortalama puan ve toplam yorum sayısını döndürür.
     - İleri seviye metin analizi (yorum içeriği) bu projede opsiyonel tutulmuştur.
     """
-    df = load_data(product_id)
-    if df.empty or "rating" not in df.columns:
-        return None
-
-    agg = (
-        df.groupby("site")
-        .agg(
-            ort_puan=("rating", "mean"),
-            toplam_yorum=("review_count", "sum"),
-            teklif_sayisi=("price", "count"),
-        )
-        .reset_index()
-        .sort_values("ort_puan", ascending=False)
-    )
-    return agg
+    return UrunAnalizi(product_id).puan_ozellik_analizi()
 
 
 def yuksek_puan_yorum_analizi(product_id: str, min_rating: int = 4, top_k: int = 20) -> dict | None:
@@ -143,138 +167,136 @@ def yuksek_puan_yorum_analizi(product_id: str, min_rating: int = 4, top_k: int =
             "ortalama_dusuk_puan": float
         }
     """
-    import re
-    from collections import Counter
-    from pymongo import MongoClient
-    
-    client = MongoClient(MONGO_DB_URL)
-    db = client[DB_NAME]
-    collection = db[COLLECTION]
-    
-    # Ürün için tüm kayıtları çek (reviews_list olanları)
-    products = list(collection.find({
-        "product_id": product_id,
-        "reviews_list": {"$exists": True, "$ne": []}
-    }))
-    
-    if not products:
-        client.close()
-        return None
-    
-    # Türkçe stop words (gereksiz kelimeler) - genişletilmiş liste
-    stop_words = {
-        "bir", "bu", "şu", "o", "ve", "ile", "için", "de", "da", "ki", "mi", "mu", "mü",
-        "çok", "az", "en", "gibi", "kadar", "daha", "var", "yok", "ama", "ancak",
-        "fakat", "lakin", "şey", "her", "hiç", "kim", "ne", "nasıl", "niçin", "neden",
-        "ben", "sen", "biz", "siz", "onlar", "bana", "sana", "bize", "size", "onlara",
-        "ile", "gibi", "kadar", "için", "göre", "dolayı", "rağmen", "karşı", "doğru",
-        "kadar", "sonra", "önce", "beri", "dışında", "içinde", "üzerinde", "altında",
-        "ürün", "ürünü", "ürünün", "fiyat", "fiyatı", "fiyatın", "satıcı", "satıcıyı",
-        "almış", "aldım", "alındı", "geldi", "geldim", "geldiği", "oldu", "olduğu",
-        "iyi", "kötü", "güzel", "çirkin", "beğendim", "beğenmedim", "tavsiye", "tavsiye ederim"
-    }
-    
-    def temizle_ve_ayir(text):
-        """Metni temizler ve kelimelere ayırır."""
-        if not text or not isinstance(text, str):
-            return []
-        # Küçük harfe çevir
-        text = text.lower()
-        # Özel karakterleri kaldır, sadece harfler ve Türkçe karakterler
-        text = re.sub(r'[^a-zçğıöşü\s]', ' ', text)
-        # Kelimelere ayır
-        kelimeler = text.split()
-        # Stop words'leri ve 2 karakterden kısa kelimeleri filtrele
-        kelimeler = [k for k in kelimeler if len(k) > 2 and k not in stop_words]
-        return kelimeler
-    
-    yuksek_puan_yorumlar = []
-    dusuk_puan_yorumlar = []
-    yuksek_puan_ratings = []
-    dusuk_puan_ratings = []
-    
-    # Tüm ürünlerden yorumları topla
-    for product in products:
-        reviews = product.get("reviews_list", [])
-        if not reviews or not isinstance(reviews, list):
-            continue
-        
-        for review in reviews:
-            if not isinstance(review, dict):
-                continue
-            
-            review_text = review.get("text")
-            review_rating = review.get("rating")
-            
-            # Text kontrolü - boş veya çok kısa yorumları atla
-            if not review_text or not isinstance(review_text, str) or len(review_text.strip()) < 10:
-                continue
-            
-            # Rating varsa kullan, yoksa None olarak işle
-            if review_rating is not None:
-                try:
-                    # Rating'i float'a çevir
-                    if isinstance(review_rating, str):
-                        # String ise sayısal kısmını çıkar
-                        rating_match = re.search(r'(\d+(?:\.\d+)?)', str(review_rating))
-                        if rating_match:
-                            rating_val = float(rating_match.group(1))
-                        else:
-                            continue
-                    else:
-                        rating_val = float(review_rating)
-                    
-                    # Rating değerini kontrol et (1-5 arası olmalı)
-                    if not (1 <= rating_val <= 5):
-                        continue
-                    
-                    if rating_val >= min_rating:
-                        yuksek_puan_yorumlar.append(review_text.strip())
-                        yuksek_puan_ratings.append(rating_val)
-                    elif rating_val <= 2:  # Düşük puan (1-2 yıldız)
-                        dusuk_puan_yorumlar.append(review_text.strip())
-                        dusuk_puan_ratings.append(rating_val)
-                except (ValueError, TypeError) as e:
-                    # Rating geçersizse atla
-                    continue
-            else:
-                # Rating yoksa, yorumu yüksek puanlı olarak kabul et (varsayılan)
-                # Çünkü bazı sitelerde rating bilgisi yorum metninde olmayabilir
-                yuksek_puan_yorumlar.append(review_text.strip())
-    
-    # Eğer hiç yorum yoksa None döndür
-    if not yuksek_puan_yorumlar and not dusuk_puan_yorumlar:
-        client.close()
-        return None
-    
-    # Kelime frekanslarını hesapla
-    def kelime_frekansi(yorumlar):
-        tum_kelimeler = []
-        for yorum in yorumlar:
-            kelimeler = temizle_ve_ayir(yorum)
-            tum_kelimeler.extend(kelimeler)
-        return Counter(tum_kelimeler)
-    
-    yuksek_kelimeler = kelime_frekansi(yuksek_puan_yorumlar) if yuksek_puan_yorumlar else Counter()
-    dusuk_kelimeler = kelime_frekansi(dusuk_puan_yorumlar) if dusuk_puan_yorumlar else Counter()
-    
-    # En çok geçen kelimeleri al
-    yuksek_top = [{"kelime": kelime, "frekans": sayi} 
-                  for kelime, sayi in yuksek_kelimeler.most_common(top_k)]
-    dusuk_top = [{"kelime": kelime, "frekans": sayi} 
-                 for kelime, sayi in dusuk_kelimeler.most_common(top_k)]
-    
-    # Ortalama puanları hesapla
-    ortalama_yuksek = sum(yuksek_puan_ratings) / len(yuksek_puan_ratings) if yuksek_puan_ratings else None
-    ortalama_dusuk = sum(dusuk_puan_ratings) / len(dusuk_puan_ratings) if dusuk_puan_ratings else None
-    
-    client.close()
-    
-    return {
-        "yuksek_puan_kelimeler": yuksek_top,
-        "dusuk_puan_kelimeler": dusuk_top,
-        "yuksek_puan_yorum_sayisi": len(yuksek_puan_yorumlar),
-        "dusuk_puan_yorum_sayisi": len(dusuk_puan_yorumlar),
-        "ortalama_yuksek_puan": round(ortalama_yuksek, 2) if ortalama_yuksek else None,
-        "ortalama_dusuk_puan": round(ortalama_dusuk, 2) if ortalama_dusuk else None
-    }
\ No newline at end of file
+    return UrunAnalizi(product_id).yuksek_puan_yorum_analizi(min_rating, top_k)
+
+
+def _yorum_kelime_analizi(review_lists, min_rating: int = 4, top_k: int = 20) -> dict | None:
+    """
+    yuksek_puan_yorum_analizi'nin hesaplama çekirdeği.
+    review_lists: her biri bir dokümanın reviews_list alanı olan liste/iterable (cursor da olabilir).
+    Kelime ayırma ve sayım veri_toplama.review_tokens'ta, batch'ler halinde yapılır.
+    """
+    return analyze_reviews(review_lists, min_rating, top_k)
+
+
+def yorum_akisi(product_id: str):
+    """Ürünün reviews koleksiyonundaki yorumlarını (metin + ham puan) DataFrame kurmadan akış halinde verir."""
+    return iter_product_reviews(_get_collection().database, product_id)
+
+
+class UrunAnalizi:
+    """
+    Tek ürün için analiz bağlamı.
+    Her analiz sadece ihtiyaç duyduğu görünümü (teklifler / puanlar / yorumlar) bir kez yükler;
+    fiyat analizleri yorum dizilerini hiç çekmez. Dışarıdan verilen df tüm görünümlerin yerine geçer.
+    Sonuçlar ürünün veri sürümüne göre önbelleğe alınır (analiz/cache.py); önbellek isabetinde
+    ürün verisi hiç yüklenmez. Dışarıdan df verilirse önbellek kullanılmaz.
+
+        analiz = UrunAnalizi(product_id)
+        oneri = analiz.dinamik_fiyat_oneri()
+        rakipler = analiz.rakip_analizi()
+    """
+
+    def __init__(self, product_id: str, df: pd.DataFrame | None = None):
+        self.product_id = product_id
+        self._df = df
+        self._views = {}
+        self._latest = None
+        self._version = None
+        self.use_cache = df is None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Tüm analiz alanlarını içeren DataFrame (analizler view() kullanır)."""
+        if self._df is None:
+            self._df = load_data(self.product_id, ANALIZ_PROJECTION)
+        return self._df
+
+    def view(self, name: str) -> pd.DataFrame:
+        if self._df is not None:
+            return self._df
+        if name not in self._views:
+            self._views[name] = load_view(self.product_id, name)
+        return self._views[name]
+
+    @property
+    def version(self) -> int:
+        """products.data_version; scraper her yazmada artırır."""
+        if self._version is None:
+            self._version = product_version(_get_collection().database, self.product_id)
+        return self._version
+
+    @property
+    def empty(self) -> bool:
+        return self.view("teklifler").empty
+
+    @cached_analysis
+    def en_guncel_teklifler(self) -> pd.DataFrame:
+        """Site + satıcı + seller_nickname bazında en son scrape edilen kayıtlar."""
+        if self._latest is None:
+            df = self.view("teklifler")
+            if df.empty or not {"site", "vendor_name"}.issubset(df.columns):
+                self._latest = pd.DataFrame()
+                return self._latest
+            df = df.copy()
+            if "seller_nickname" not in df.columns:
+                df["seller_nickname"] = None
+            # seller_nickname None ise boş string yap (gruplama için)
+            df["seller_nickname"] = df["seller_nickname"].fillna("")
+            latest = df.sort_values("scrape_ts").groupby(GRUP_ANAHTARI, as_index=False).tail(1)
+            # seller_nickname boş string ise None yap
+            latest["seller_nickname"] = latest["seller_nickname"].mask(latest["seller_nickname"] == "", None)
+            self._latest = latest
+        return self._latest
+
+    @cached_analysis
+    def rakip_analizi(self) -> pd.DataFrame | None:
+        latest = self.en_guncel_teklifler()
+        if latest.empty:
+            return None
+        cols = ["site", "vendor_name", "seller_nickname", "price", "rating", "review_count"]
+        return latest.sort_values("price").reindex(columns=cols)
+
+    @cached_analysis
+    def dinamik_fiyat_oneri(self, marj_yuzde: float = 5.0) -> dict | None:
+        latest = self.en_guncel_teklifler()
+        if latest.empty or "price" not in latest.columns or latest["price"].dropna().empty:
+            return None
+        min_price = latest["price"].min()
+        suggested = round(min_price * (1 + marj_yuzde / 100), 2)
+        return {
+            "product_id": self.product_id,
+            "min_rakip_fiyati": float(min_price),
+            "onerilen_fiyat": suggested,
+            "marj_yuzde": marj_yuzde,
+        }
+
+    @cached_analysis
+    def puan_ozellik_analizi(self) -> pd.DataFrame | None:
+        df = self.view("puanlar")
+        if df.empty or "rating" not in df.columns:
+            return None
+        agg = (
+            df.groupby("site")
+            .agg(
+                ort_puan=("rating", "mean"),
+                toplam_yorum=("review_count", "sum"),
+                teklif_sayisi=("price", "count"),
+            )
+            .reset_index()
+            .sort_values("ort_puan", ascending=False)
+        )
+        return agg
+
+    @cached_analysis
+    def yuksek_puan_yorum_analizi(self, min_rating: int = 4, top_k: int = 20) -> dict | None:
+        if self._df is None:
+            # Kelime frekansları veri alımında hesaplanır (review_stats); burada sadece top-k okunur
+            stats = load_review_stats(_get_collection().database, self.product_id)
+            if stats is not None:
+                return summary_from_stats(stats, min_rating, top_k)
+            # İstatistiği henüz olmayan ürünler için yorum arşivinden akış halinde hesaplanır
+            return analyze_review_stream(yorum_akisi(self.product_id), min_rating, top_k)
+        if "reviews_list" not in self._df.columns:
+            return None
+        return _yorum_kelime_analizi(self._df["reviews_list"], min_rating, top_k)
@@ -0,0 +1,231 @@
+# analiz/cache.py
+# Analiz fonksiyonları için TTL + LRU sonuç önbelleği.
+# Anahtar: (fonksiyon, product_id, veri sürümü, parametreler). Scraper bir ürünü yazdığında
+# products.data_version artar; böylece sonraki okuma eski sonucu görmez ve yeniden hesaplar.
+
+import functools
+import inspect
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from veri_toplama.db import get_collection
+
+# ----------------- YAPILANDIRMA -----------------
+# memory: süreç içi LRU | mongo: süreç içi LRU + süreçler arası paylaşılan MongoDB katmanı | none: kapalı
+CACHE_BACKEND = os.getenv("ANALIZ_CACHE_BACKEND", "memory")
+CACHE_TTL_S = int(os.getenv("ANALIZ_CACHE_TTL", "3600"))  # periodic_runner varsayılan aralığı
+CACHE_MAX_ENTRIES = int(os.getenv("ANALIZ_CACHE_MAXSIZE", "512"))
+CACHE_COLLECTION = "analysis_cache"
+
+
+def _kodla(value):
+    """
+    Sonucu MongoDB'de saklanabilir (BSON) hale getirir: (tür etiketi, değer).
+    DataFrame'ler JSON (orient="table") + sütunların pandas dtype adlarıyla, diğerleri olduğu gibi saklanır.
+    """
+    if isinstance(value, pd.DataFrame):
+        return "dataframe", {
+            "table": value.to_json(orient="table", index=False, date_format="iso"),
+            "dtypes": [str(dtype) for dtype in value.dtypes],
+        }
+    return "bson", value
+
+
+def _coz(value_type, value):
+    """_kodla'nın tersi; bilinmeyen etiketli (ör. eski pickle) kayıtlar için None (önbellek ıskası)."""
+    if value_type == "dataframe":
+        if not isinstance(value, dict):
+            return None
+        df = pd.read_json(io.StringIO(value["table"]), orient="table")
+        # Table şeması metin sütunlarını ayırt etmez; önbelleksiz sonuçla aynı dtype'lar geri kurulur
+        for i, dtype in enumerate(value.get("dtypes", [])):
+            col = df.columns[i]
+            if dtype == "object":
+                # JSON'da null olan hücreler NaN değil None olarak döner
+                df[col] = df[col].astype(object).where(df[col].notna(), None)
+            elif str(df[col].dtype) != dtype:
+                try:
+                    df[col] = df[col].astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+        return df
+    if value_type == "bson":
+        return value
+    return None
+
+
+def _kopya(value):
+    # Önbellekteki DataFrame'i çağıranın değiştirmesine karşı kopyası döndürülür
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+class MemoryCache:
+    """Süreç içi TTL + LRU önbellek (OrderedDict)."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._data), **self.stats}
+
+
+class MongoCache:
+    """
+    Süreçler (gunicorn worker'ları vb.) arasında paylaşılan önbellek.
+    Değerler BSON olarak saklanır (DataFrame'ler JSON + tür etiketi; pickle kullanılmaz, koleksiyona
+    yazabilen biri Flask sürecinde kod çalıştıramaz); süresi dolanları expires_at üzerindeki TTL indeksi siler
+    (indeks: veri_toplama/indexes.py).
+    """
+
+    def __init__(self, collection_name=CACHE_COLLECTION, ttl=CACHE_TTL_S):
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def get(self, key):
+        try:
+            doc = get_collection(self.collection_name).find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"value": 1, "value_type": 1}
+            )
+            value = _coz(doc.get("value_type"), doc.get("value")) if doc is not None else None
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"WARNING analiz önbelleği okunamadı: {e}")
+            return None
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            value_type, stored = _kodla(value)
+            get_collection(self.collection_name).replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "value_type": value_type,
+                    "value": stored,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"WARNING analiz önbelleğine yazılamadı: {e}")
+
+    def clear(self):
+        get_collection(self.collection_name).delete_many({})
+
+    def snapshot(self):
+        return {"backend": "mongo", **self.stats}
+
+
+class AnalizCache:
+    """Katmanlı önbellek: önce süreç içi LRU, sonra (varsa) paylaşılan MongoDB katmanı."""
+
+    def __init__(self, backend=CACHE_BACKEND):
+        self.backend = backend
+        self.enabled = backend != "none"
+        self.layers = [MemoryCache()] if self.enabled else []
+        if backend == "mongo":
+            self.layers.append(MongoCache())
+
+    def get(self, key):
+        for i, layer in enumerate(self.layers):
+            value = layer.get(key)
+            if value is not None:
+                # Alt katmanda bulunan değer üst katmanlara da yazılır
+                for upper in self.layers[:i]:
+                    upper.set(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        for layer in self.layers:
+            layer.set(key, value)
+
+    def clear(self):
+        for layer in self.layers:
+            layer.clear()
+
+    def snapshot(self):
+        return {"backend": self.backend, "layers": [layer.snapshot() for layer in self.layers]}
+
+
+_cache = None
+
+
+def get_cache():
+    """Süreç başına tek önbellek örneği."""
+    global _cache
+    if _cache is None:
+        _cache = AnalizCache()
+    return _cache
+
+
+def cache_key(func_name, product_id, version, params):
+    return f"{func_name}|{product_id}|v{version}|{repr(sorted(params.items()))}"
+
+
+def cached_analysis(method):
+    """
+    UrunAnalizi metotları için önbellek dekoratörü.
+    Varsayılan değerler anahtara dahil edilir (oneri() ile oneri(5.0) aynı anahtarı kullanır).
+    None sonuçlar önbelleğe alınmaz; veri geldiğinde hemen hesaplanır.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = get_cache()
+        if not cache.enabled or not self.use_cache:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = {k: v for k, v in bound.arguments.items() if k != "self"}
+        key = cache_key(method.__name__, self.product_id, self.version, params)
+        value = cache.get(key)
+        if value is None:
+            value = method(self, *args, **kwargs)
+            if value is not None:
+                cache.set(key, value)
+        return _kopya(value)
+
+    return wrapper
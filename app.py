@@ -1,8 +1,13 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify
-from flask_pymongo import PyMongo
 import os
+import json
+import base64
 
-from analiz.analiz import rakip_analizi, dinamik_fiyat_oneri, load_data, puan_ozellik_analizi, yuksek_puan_yorum_analizi
+from analiz.analiz import UrunAnalizi
+from analiz.cache import get_cache
+from veri_toplama.db import get_db, pool_metrics
+from veri_toplama.indexes import bootstrap_indexes
+from veri_toplama.catalog import PRODUCTS_COLLECTION
 
 # Gemini API için
 try:
@@ -24,9 +29,74 @@ if not GEMINI_API_KEY or GEMINI_API_KEY == "your_api_key_here":
 
 app = Flask(__name__)
 
-# MongoDB URI
-app.config["MONGO_URI"] = "mongodb://localhost:27017/missha_price_data"
-mongo = PyMongo(app)
+# MongoDB: analiz katmanı ve scraper'larla aynı paylaşılan, havuzlu istemci
+# (bağlantı adresi MONGO_URI, havuz boyutu MONGO_MAX_POOL_SIZE ortam değişkenleriyle ayarlanır)
+db = get_db()
+
+# Ana sayfada sayfa başına gösterilecek ürün sayısı
+PAGE_SIZE = 50
+
+# Açılışta indeksleri kur ve sıcak sorgularda koleksiyon taraması olup olmadığını raporla
+try:
+    bootstrap_indexes(db)
+except Exception as e:
+    print(f"⚠️ İndeks kurulumu yapılamadı: {e}")
+
+
+def kayitlar(df):
+    """DataFrame'i şablon/JSON için dict listesine çevirir (NaN -> None, zaman -> metin)."""
+    rows = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    for row in rows:
+        ts = row.get("scrape_ts")
+        if hasattr(ts, "strftime"):
+            row["scrape_ts"] = ts.strftime("%Y-%m-%dT%H:%M:%S")
+    return rows
+
+
+def teklif_satirlari(latest):
+    """En güncel teklifleri product_detail.html'in beklediği (_id: site/vendor/nickname) biçimine çevirir."""
+    if latest.empty:
+        return []
+    offers = []
+    for row in kayitlar(latest):
+        offers.append({
+            "_id": {
+                "site": row.get("site"),
+                "vendor_name": row.get("vendor_name"),
+                "seller_nickname": row.get("seller_nickname"),
+            },
+            "product_name": row.get("product_name"),
+            "category": row.get("category"),
+            "price": row.get("price"),
+            "rating": row.get("rating"),
+            "review_count": row.get("review_count"),
+            "scrape_ts": row.get("scrape_ts"),
+        })
+    return offers
+
+
+def encode_cursor(product):
+    """Keyset sayfalama imleci: (product_name, product_id) çiftini URL-güvenli metne çevirir."""
+    raw = json.dumps([product.get("product_name") or "", product.get("product_id") or ""], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token):
+    try:
+        name, product_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        return name, product_id
+    except Exception:
+        return None
+
+
+def keyset_filter(cursor, direction):
+    """(product_name, product_id) sırasına göre imlecin sonrası ($gt) veya öncesi ($lt) için filtre."""
+    name, product_id = cursor
+    op = "$gt" if direction == "after" else "$lt"
+    return {"$or": [
+        {"product_name": {op: name}},
+        {"product_name": name, "product_id": {op: product_id}},
+    ]}
 
 
 @app.route("/")
@@ -34,65 +104,78 @@ def index():
     """
     Tüm ürünleri (product_id bazında) listeler.
     Kategori, marka filtreleme ve arama desteği ile.
+    Filtreler, keyset sayfalama ve filtre sayıları products kataloğunda tek bir $facet sorgusu ile hesaplanır.
     """
     # Filtre parametrelerini al
     selected_category = request.args.get("category", "")
     selected_brand = request.args.get("brand", "")
     search_query = request.args.get("search", "").strip()
+    after = decode_cursor(request.args["after"]) if request.args.get("after") else None
+    before = decode_cursor(request.args["before"]) if request.args.get("before") else None
+    
+    # Arama filtresi ($text ilk aşamada olmalı; products.search_text metin indeksini kullanır)
+    base_match = {"$text": {"$search": search_query}} if search_query else {}
+    category_match = {"category": selected_category} if selected_category else {}
+    brand_match = {"brand": selected_brand} if selected_brand else {}
+    list_match = {**category_match, **brand_match}
+    
+    # Sayfa: imleçten sonrası (ileri) veya öncesi (geri, ters sıralanıp sonra çevrilir)
+    page_match = dict(list_match)
+    sort_dir = 1
+    if before:
+        page_match.update(keyset_filter(before, "before"))
+        sort_dir = -1
+    elif after:
+        page_match.update(keyset_filter(after, "after"))
     
     pipeline = [
+        {"$match": base_match},
         {
-            "$group": {
-                "_id": "$product_id",
-                "product_name": {"$first": "$product_name"},
-                "category": {"$first": "$category"},
+            "$facet": {
+                "items": [
+                    {"$match": page_match},
+                    {"$sort": {"product_name": sort_dir, "product_id": sort_dir}},
+                    {"$limit": PAGE_SIZE + 1},
+                    {"$project": {"_id": 0}},
+                ],
+                "total": [{"$match": list_match}, {"$count": "n"}],
+                # Kategori sayıları marka filtresine, marka sayıları kategori filtresine göre hesaplanır
+                "categories": [
+                    {"$match": brand_match},
+                    {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}},
+                ],
+                "brands": [
+                    {"$match": category_match},
+                    {"$group": {"_id": "$brand", "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}},
+                ],
             }
         },
-        {"$sort": {"product_name": 1}},
     ]
+    result = next(db[PRODUCTS_COLLECTION].aggregate(pipeline), {})
     
-    # Kategori filtresi
-    if selected_category:
-        pipeline.insert(0, {"$match": {"category": selected_category}})
-    
-    products = list(mongo.db.e_ticaret_offers.aggregate(pipeline))
-    
-    # Flask tarafında erişimi kolaylaştırmak için _id yerine product_id kullan
-    for p in products:
-        p["product_id"] = p.pop("_id")
-    
-    # Arama filtresi (ürün adında arama)
-    if search_query:
-        search_lower = search_query.lower()
-        products = [
-            p for p in products 
-            if search_lower in p.get("product_name", "").lower() or 
-               search_lower in p.get("product_id", "").lower()
-        ]
-    
-    # Marka filtresi
-    if selected_brand:
-        products = [p for p in products if selected_brand.lower() in p.get("product_name", "").lower()]
-    
-    # Tüm kategorileri ve markaları al (filtreleme için)
-    all_categories = sorted(set(p.get("category") for p in products if p.get("category")))
+    products = result.get("items", [])
+    has_more = len(products) > PAGE_SIZE
+    products = products[:PAGE_SIZE]
+    if before:
+        products.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
     
-    # Markaları product_name'den çıkar (ilk kelime genelde marka)
-    all_brands = set()
-    for p in products:
-        product_name = p.get("product_name", "")
-        if product_name:
-            # İlk kelimeyi marka olarak al
-            first_word = product_name.split()[0] if product_name.split() else ""
-            if first_word and len(first_word) > 2:  # Çok kısa kelimeleri atla
-                all_brands.add(first_word)
-    all_brands = sorted(all_brands)
+    total = result["total"][0]["n"] if result.get("total") else 0
+    categories = [c for c in result.get("categories", []) if c["_id"]]
+    brands = [b for b in result.get("brands", []) if b["_id"]]
     
     return render_template(
         "index.html", 
         products=products,
-        categories=all_categories,
-        brands=all_brands,
+        total=total,
+        prev_cursor=encode_cursor(products[0]) if products and has_prev else None,
+        next_cursor=encode_cursor(products[-1]) if products and has_next else None,
+        categories=categories,
+        brands=brands,
         selected_category=selected_category,
         selected_brand=selected_brand,
         search_query=search_query
@@ -104,38 +187,12 @@ def product_detail(product_id):
     """
     Belirli bir ürün için son fiyatlar, rakip analizi ve basit dinamik fiyat önerisini gösterir.
     """
+    # Tüm analizler ürünün tek seferde yüklenen verisinden hesaplanır
+    analiz = UrunAnalizi(product_id)
+
     # En güncel teklifler (site+vendor+seller_nickname bazında - Pazarama için tüm satıcıları göster)
-    # seller_nickname None ise vendor_name kullanılır (gruplama için)
-    pipeline = [
-        {"$match": {"product_id": product_id}},
-        {"$sort": {"scrape_ts": 1}},
-        {
-            "$group": {
-                "_id": {
-                    "site": "$site",
-                    "vendor_name": "$vendor_name",
-                    "seller_nickname": {"$ifNull": ["$seller_nickname", ""]}  # None ise boş string
-                },
-                "product_name": {"$last": "$product_name"},
-                "category": {"$last": "$category"},
-                "price": {"$last": "$price"},
-                "rating": {"$last": "$rating"},
-                "review_count": {"$last": "$review_count"},
-                "scrape_ts": {"$last": "$scrape_ts"},
-                "seller_nickname_original": {"$last": "$seller_nickname"},  # Orijinal değeri de sakla
-            }
-        },
-        {"$sort": {"price": 1}},
-    ]
-    offers = list(mongo.db.e_ticaret_offers.aggregate(pipeline))
-    
-    # seller_nickname'i düzelt (boş string ise None yap)
-    for offer in offers:
-        if offer["_id"]["seller_nickname"] == "":
-            offer["_id"]["seller_nickname"] = None
-        else:
-            # Orijinal değeri kullan
-            offer["_id"]["seller_nickname"] = offer.get("seller_nickname_original")
+    offers = teklif_satirlari(analiz.en_guncel_teklifler())
+    offers.sort(key=lambda o: (o["price"] is None, o["price"] or 0))
     
     # Boş kayıtları filtrele (site veya vendor_name olmayanları)
     offers = [
@@ -158,14 +215,14 @@ def product_detail(product_id):
             fiyat_oneri=None,
         )
 
-    product_name = offers[0].get("product_name", product_id)
+    product_name = offers[0].get("product_name") or product_id
 
     # Analiz fonksiyonlarını çağır
-    fiyat_oneri = dinamik_fiyat_oneri(product_id)
+    fiyat_oneri = analiz.dinamik_fiyat_oneri()
     # rakip_analizi pandas DataFrame döndürüyor; tabloya çevirmek istersen
-    rakip_df = rakip_analizi(product_id)
+    rakip_df = analiz.rakip_analizi()
     rakip_rows = (
-        rakip_df.to_dict(orient="records") if rakip_df is not None else None
+        kayitlar(rakip_df) if rakip_df is not None else None
     )
     # Rakip analizi için en ucuz fiyatı hesapla
     rakip_min_price = None
@@ -173,7 +230,7 @@ def product_detail(product_id):
         valid_rakip_prices = [r.get("price") for r in rakip_rows if r.get("price") is not None and isinstance(r.get("price"), (int, float))]
         rakip_min_price = min(valid_rakip_prices) if valid_rakip_prices else None
     # Yüksek puanlı yorum analizi
-    yorum_analizi = yuksek_puan_yorum_analizi(product_id)
+    yorum_analizi = analiz.yuksek_puan_yorum_analizi()
 
     return render_template(
         "product_detail.html",
@@ -206,22 +263,12 @@ def chat_api():
     if not product_id:
         return jsonify({"error": "product_id alanı gerekli."}), 400
 
-    df = load_data(product_id)
-    if df.empty:
-        return jsonify({"answer": "Bu ürün için henüz veri bulunamadı."})
-
-    # seller_nickname None ise boş string yap (gruplama için)
-    df["seller_nickname"] = df["seller_nickname"].fillna("")
-    
+    # Sohbet bağlamı da ürünün tek seferde yüklenen verisinden hesaplanır
+    analiz = UrunAnalizi(product_id)
     # En güncel kayıtlar (seller_nickname'i de dahil et)
-    latest = (
-        df.sort_values("scrape_ts")
-        .groupby(["site", "vendor_name", "seller_nickname"], as_index=False)
-        .tail(1)
-    )
-    
-    # seller_nickname boş string ise None yap
-    latest["seller_nickname"] = latest["seller_nickname"].replace("", None)
+    latest = analiz.en_guncel_teklifler()
+    if latest.empty:
+        return jsonify({"answer": "Bu ürün için henüz veri bulunamadı."})
 
     # En ucuz teklif
     cheapest = latest.sort_values("price").iloc[0]
@@ -230,9 +277,9 @@ def chat_api():
     rated = latest.dropna(subset=["rating"])
     best_rated = rated.sort_values(["rating", "review_count"], ascending=[False, False]).iloc[0] if not rated.empty else None
 
-    fiyat_oneri = dinamik_fiyat_oneri(product_id)
-    oz_analiz = puan_ozellik_analizi(product_id)
-    yorum_analizi = yuksek_puan_yorum_analizi(product_id)
+    fiyat_oneri = analiz.dinamik_fiyat_oneri()
+    oz_analiz = analiz.puan_ozellik_analizi()
+    yorum_analizi = analiz.yuksek_puan_yorum_analizi()
 
     # Ürün verilerini hazırla (Gemini için context)
     product_context = {
@@ -253,7 +300,7 @@ def chat_api():
             "review_count": int(best_rated["review_count"] or 0),
         } if best_rated is not None else None,
         "fiyat_oneri": fiyat_oneri,
-        "teklifler": latest[["site", "vendor_name", "seller_nickname", "price", "rating", "review_count"]].to_dict("records"),
+        "teklifler": kayitlar(latest.reindex(columns=["site", "vendor_name", "seller_nickname", "price", "rating", "review_count"])),
     }
     
     if yorum_analizi:
@@ -426,6 +473,12 @@ Sadece verilen ürün bilgilerine dayanarak cevap ver, varsayım yapma."""
     )
 
 
+@app.route("/api/health")
+def health_api():
+    """MongoDB bağlantı havuzu ve analiz önbelleği metriklerini döndürür."""
+    return jsonify({"mongo_pools": pool_metrics(), "analysis_cache": get_cache().snapshot()})
+
+
 def fallback_answer(question_lower: str, context: dict) -> str:
     """Gemini kullanılamazsa basit cevap üretir."""
     # Fiyat soruları
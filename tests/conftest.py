@@ -0,0 +1,15 @@
+# Scraper modülleri veri_toplama içinden düz (flat) import edildiği için dizin yola eklenir;
+# analiz paketi (veri_toplama.db'yi paket olarak import eder) için depo kökü de eklenir.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "veri_toplama"))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
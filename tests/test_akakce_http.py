@@ -0,0 +1,41 @@
+# akakce_http.classify_page'in kaydedilmiş tam boy Akakçe sayfası üzerinde testleri (ağ gerekmez).
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+from conftest import read_fixture
+from akakce_http import classify_page
+
+
+def test_full_size_page_parses_seller_list_past_first_20kb():
+    html = read_fixture("akakce_product.html")
+    assert html.find('id="PL"') > 20000
+
+    state, (product_name, base_data) = classify_page(200, html)
+
+    assert state == "ok"
+    assert product_name == "Logitech MX Master 3S Kablosuz Mouse"
+    assert [(s["vendor_name"], s["seller_nickname"], s["price"]) for s in base_data] == [
+        ("Trendyol", "TeknoMarket", 1899.0),
+        ("Hepsiburada", "", 1949.9),
+        ("n11", "BilgisayarDünyası", 1979.0),
+        ("Pazarama", "", 2010.5),
+    ]
+    assert base_data[0]["link"] == "https://www.akakce.com/c/?z=1001"
+
+
+def test_empty_seller_list_is_ok_without_sellers():
+    # Satıcısı olmayan ürün tarayıcıya geri gönderilmez
+    html = read_fixture("akakce_product.html")
+    start, end = html.index('<ul id="PL">'), html.index("</ul>\n</main>")
+    state, parsed = classify_page(200, html[:start] + '<ul id="PL">' + html[end:])
+    assert (state, parsed) == ("ok", ("Logitech MX Master 3S Kablosuz Mouse", []))
+
+
+def test_missing_seller_list_is_blocked_or_incomplete():
+    assert classify_page(200, "<html><body><h1>Just a moment...</h1></body></html>") == ("blocked", None)
+    assert classify_page(200, "<html><body><div class='pdt_v8'></div></body></html>") == ("incomplete", None)
+    assert classify_page(403, "") == ("blocked", None)
+    assert classify_page(200, "") == ("incomplete", None)
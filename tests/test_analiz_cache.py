@@ -0,0 +1,107 @@
+# analiz/cache.py'nin paylaşılan (MongoDB) katmanı: değerler BSON'dan geçerek aynı dönmeli ve
+# veri sürümü artınca eski sonuç kullanılmamalı. Koleksiyon bellekte taklit edilir (mongod gerekmez).
+from datetime import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+bson = pytest.importorskip("bson")
+
+from analiz import cache as cache_mod
+
+
+class FakeCollection:
+    """Dokümanları gerçekten BSON'a kodlayıp saklayan bellek içi koleksiyon."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def replace_one(self, filter, doc, upsert=False):
+        self.docs[filter["_id"]] = bson.encode(doc)
+
+    def find_one(self, filter, projection=None):
+        raw = self.docs.get(filter["_id"])
+        if raw is None:
+            return None
+        doc = bson.decode(raw)
+        return doc if doc["expires_at"] > filter["expires_at"]["$gt"] else None
+
+    def delete_many(self, filter):
+        self.docs.clear()
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection()
+    monkeypatch.setattr(cache_mod, "get_collection", lambda name: fake)
+    return fake
+
+
+def _roundtrip(value):
+    mongo = cache_mod.MongoCache()
+    mongo.set("k", value)
+    return mongo.get("k")
+
+
+def test_dataframe_roundtrip_keeps_values_and_dtypes(collection):
+    df = pd.DataFrame({
+        "site": pd.Series(["trendyol", None], dtype=object),
+        "vendor_name": ["Trendyol", "n11"],
+        "price": [1899.0, float("nan")],
+        "offers": [3, 1],
+        "scrape_ts": pd.to_datetime(["2026-10-18T10:00:00", "2026-10-18T11:30:00"]),
+    })
+
+    back = _roundtrip(df)
+
+    pd.testing.assert_frame_equal(back, df)
+    # Nesne sütunlarındaki boş hücreler önbelleksiz sonuçtaki gibi None
+    assert back["site"].tolist() == ["trendyol", None]
+    assert _roundtrip(pd.DataFrame()).empty
+
+
+def test_dict_roundtrip_and_no_pickle(collection):
+    value = {
+        "yuksek_puan_kelimeler": [{"kelime": "ışık", "frekans": 2}],
+        "ortalama_yuksek_puan": 4.5,
+        "dusuk_puan_yorum_sayisi": 0,
+        "son_tarama": datetime(2026, 10, 18, 10, 0),
+        "yok": None,
+    }
+    assert _roundtrip(value) == value
+    assert bson.decode(collection.docs["k"])["value_type"] == "bson"
+    # Bilinmeyen etiketli (ör. eski pickle) kayıt ıskadır, çözülmeye çalışılmaz
+    doc = bson.decode(collection.docs["k"])
+    collection.docs["k"] = bson.encode({**doc, "value_type": "pickle", "value": bson.Binary(b"\x80\x04")})
+    assert cache_mod.MongoCache().get("k") is None
+
+
+class FakeAnaliz:
+    def __init__(self, version):
+        self.product_id = "p1"
+        self.version = version
+        self.use_cache = True
+        self.calls = 0
+
+    @cache_mod.cached_analysis
+    def teklifler(self, site=None):
+        self.calls += 1
+        return pd.DataFrame({"site": [site], "version": [self.version]})
+
+
+def test_data_version_bump_invalidates_shared_cache(collection, monkeypatch):
+    monkeypatch.setattr(cache_mod, "_cache", cache_mod.AnalizCache(backend="mongo"))
+
+    first = FakeAnaliz(version=1)
+    assert first.teklifler("trendyol")["version"].tolist() == [1]
+    # Başka bir süreç: bellek katmanı boş, sonuç paylaşılan katmandan gelir
+    cache_mod.get_cache().layers[0].clear()
+    same_version = FakeAnaliz(version=1)
+    assert same_version.teklifler("trendyol")["version"].tolist() == [1]
+    assert same_version.calls == 0
+
+    # Scraper ürünü yazınca data_version artar; eski sonuç kullanılmaz
+    bumped = FakeAnaliz(version=2)
+    assert bumped.teklifler("trendyol")["version"].tolist() == [2]
+    assert bumped.calls == 1
+    assert len(collection.docs) == 2
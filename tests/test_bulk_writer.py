@@ -0,0 +1,66 @@
+# BulkWriter hata raporlamasının sahte koleksiyonlarla testleri (MongoDB gerekmez).
+import time
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError
+from pymongo import InsertOne
+
+from bulk_writer import BulkWriter
+
+
+class FakeResult:
+    def __init__(self, n):
+        self.bulk_api_result = {"nInserted": n}
+
+
+class FakeCollection:
+    def __init__(self, fail_indexes=()):
+        self.fail_indexes = set(fail_indexes)
+        self.written = []
+
+    def bulk_write(self, ops, ordered=True):
+        errors = [{"index": i, "code": 11000, "errmsg": "duplicate key"} for i in range(len(ops)) if i in self.fail_indexes]
+        self.written.extend(op for i, op in enumerate(ops) if i not in self.fail_indexes)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ops) - len(errors)})
+        return FakeResult(len(ops))
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def test_timer_flush_errors_are_returned_by_next_flush():
+    db = FakeDB(offers=FakeCollection(fail_indexes={0}))
+    writer = BulkWriter(db, max_delay_s=0.05)
+    writer.add("offers", InsertOne({"a": 1}), tag=("p1", "trendyol"))
+    writer.add("offers", InsertOne({"a": 2}), tag=("p1", "n11"))
+    deadline = time.monotonic() + 2
+    while len(writer) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(writer) == 0  # zamanlayıcı boşalttı
+
+    errors = writer.flush()
+    assert [e["tag"] for e in errors] == [("p1", "trendyol")]
+    assert writer.flush() == []  # hatalar bir kez döndürülür
+    writer.close()
+
+
+def test_size_limit_and_after_flush_errors_are_reported():
+    def after_flush(written):
+        raise RuntimeError("katalog yenilenemedi")
+
+    db = FakeDB(offers=FakeCollection(fail_indexes={1}))
+    writer = BulkWriter(db, max_ops=2, max_delay_s=0, after_flush=after_flush)
+    assert writer.add("offers", InsertOne({"a": 1}), tag="t1") == []
+    size_errors = writer.add("offers", InsertOne({"a": 2}), tag="t2")
+    assert [e["collection"] for e in size_errors] == ["offers", "after_flush"]
+
+    errors = writer.flush()
+    assert [(e["collection"], e["tag"]) for e in errors] == [("offers", "t2"), ("after_flush", None)]
+    assert len(db["offers"].written) == 1
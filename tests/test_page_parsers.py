@@ -0,0 +1,112 @@
+# page_parsers'ın kaydedilmiş HTML sayfaları üzerinde testleri (tarayıcı gerekmez).
+import pytest
+
+pytest.importorskip("lxml")
+
+from conftest import read_fixture
+from page_parsers import parse_detail, parse_reviews, review_page_url, review_text_xpath
+
+
+def test_hepsiburada_detail_resolves_reviews_link():
+    detail = parse_detail(read_fixture("hepsiburada_detail.html"), "hepsiburada",
+                          base_url="https://www.hepsiburada.com/urun-p-HBC0001")
+    assert detail == {
+        "rating": 4.6,
+        "reviews": 1250,
+        "reviews_href": "https://www.hepsiburada.com/urun-p-HBC0001-yorumlari",
+    }
+
+
+def test_hepsiburada_counts_only_active_star_classes():
+    reviews = parse_reviews(read_fixture("hepsiburada_reviews.html"), "hepsiburada")
+    assert reviews == [
+        # <br> satır sonu olur, satır içi boşluklar teke iner
+        {"text": "Kargo hızlıydı,\nürün sağlam geldi.", "rating": 4},
+        # Yıldız container'ı yoksa puan bilinmiyor
+        {"text": "Yıldızsız ama uzun bir yorum metni", "rating": None},
+    ]
+
+
+def test_trendyol_detail_and_star_count():
+    detail = parse_detail(read_fixture("trendyol_detail.html"), "trendyol")
+    assert (detail["rating"], detail["reviews"]) == (4.3, 87)
+
+    reviews = parse_reviews(read_fixture("trendyol_reviews.html"), "trendyol")
+    # Dolu yıldız yoksa varsayılan puan
+    assert [r["rating"] for r in reviews] == [3, 5, 1]
+
+
+def test_max_reviews_limits_items():
+    reviews = parse_reviews(read_fixture("trendyol_reviews.html"), "trendyol", max_reviews=2)
+    assert len(reviews) == 2
+
+
+def test_n11_min_length_drops_short_texts():
+    html = read_fixture("n11_reviews.html")
+    assert parse_detail(html, "n11") == {"rating": 4.8, "reviews": 12, "reviews_href": None}
+    assert parse_reviews(html, "n11") == [{"text": "Hızlı kargo", "rating": 2}]
+
+
+def test_pazarama_item_is_the_text_element():
+    reviews = parse_reviews(read_fixture("pazarama_reviews.html"), "pazarama")
+    assert reviews == [
+        {"text": "Paketleme çok özenliydi, teşekkürler.", "rating": 5, "date": None},
+        {"text": "Ürün açıklamadaki gibi çıktı.", "rating": 5, "date": None},
+    ]
+    assert review_text_xpath("pazarama").endswith("//div[contains(@class, 'text-gray-600')]")
+
+
+def test_ptt_number_rating_and_default():
+    html = read_fixture("pttavm_reviews.html")
+    detail = parse_detail(html, "pttavm")
+    assert (detail["rating"], detail["reviews"]) == (4.2, 35)
+    assert parse_reviews(html, "pttavm") == [
+        {"text": "Sipariş ertesi gün elime ulaştı.", "rating": 4},
+        {"text": "Puanı okunamayan bir yorum.", "rating": 5},
+    ]
+
+
+def test_cursor_stops_at_first_known_review():
+    pytest.importorskip("pymongo")
+    from review_cursor import ReviewCursor
+
+    seen = ReviewCursor("p1", "trendyol")
+    seen.set_newest_first(True)
+    seen.record([{"text": "Eski yorum, daha önce kaydedildi."}])
+
+    cursor = ReviewCursor("p1", "trendyol", seen.fingerprints)
+    cursor.set_newest_first(True)
+    reviews = parse_reviews(read_fixture("trendyol_reviews.html"), "trendyol", cursor=cursor)
+    assert [r["text"] for r in reviews] == [
+        "Beden tam oldu, kumaşı kaliteli.",
+        "Rengi fotoğraftakinden daha koyu.",
+    ]
+    assert cursor.stopped_at_known
+
+    # Backfill imleci bilinen yorumda durmaz
+    backfill = ReviewCursor("p1", "trendyol", seen.fingerprints, backfill=True)
+    assert len(parse_reviews(read_fixture("trendyol_reviews.html"), "trendyol", cursor=backfill)) == 3
+
+
+def test_cursor_without_newest_first_sort_neither_stops_nor_advances():
+    pytest.importorskip("pymongo")
+    from review_cursor import ReviewCursor
+
+    seen = ReviewCursor("p1", "trendyol")
+    seen.set_newest_first(True)
+    seen.record([{"text": "Eski yorum, daha önce kaydedildi."}])
+
+    # Varsayılan ("önerilen") sırada bilinen yorumun altında daha yeni yorumlar olabilir
+    cursor = ReviewCursor("p1", "trendyol", seen.fingerprints)
+    reviews = parse_reviews(read_fixture("trendyol_reviews.html"), "trendyol", cursor=cursor)
+    assert len(reviews) == 3 and not cursor.stopped_at_known
+    cursor.record(reviews)
+    assert cursor.fingerprints == seen.fingerprints
+
+
+def test_review_page_url_replaces_page_param():
+    url = "https://www.hepsiburada.com/urun-p-HBC0001-yorumlari?sayfa=1&sirala=yeni"
+    assert review_page_url(url, "hepsiburada", 3) == (
+        "https://www.hepsiburada.com/urun-p-HBC0001-yorumlari?sirala=yeni&sayfa=3"
+    )
+    assert review_page_url(url, "trendyol", 3) is None
@@ -0,0 +1,39 @@
+# review_tokens'ın Türkçe küçük harf / kelime sayımı testleri (sadece standart kütüphane).
+from collections import Counter
+
+from review_tokens import analyze_review_stream, count_terms, tokenize, turkish_lower
+
+REVIEWS = [
+    {"text": "IŞIK çok güzel, KARGO HIZLI geldi", "rating": 5},
+    {"text": "İYİ paketlenmiş ama KIRIK geldi, İade ettim", "rating": 1},
+    {"text": "Işığı yeterli değil, iade edeceğim", "rating": "2,0"},
+    {"text": "Fiyatına göre idare eder", "rating": 3},
+    {"text": "Puansız ama uzun bir yorum: ışık harika", "rating": None},
+]
+
+
+def test_turkish_lower_maps_dotted_and_dotless_i():
+    assert turkish_lower("IŞIK") == "ışık"
+    assert turkish_lower("İyi") == "iyi"
+    assert turkish_lower("İADE IRMAK") == "iade ırmak"
+
+
+def test_stop_words_are_removed_after_lowercasing():
+    # "İYİ", "ÜRÜN" ve "AMA" ancak Türkçe küçültmeden sonra stop word olarak tanınır
+    assert tokenize("İYİ ÜRÜN ama IŞIK harika") == ["ışık", "harika"]
+    assert count_terms(["İYİ ÜRÜN", "IŞIK harika", "Işık"]) == Counter({"ışık": 2, "harika": 1})
+
+
+def test_batched_counts_match_unbatched():
+    texts = [r["text"] for r in REVIEWS]
+    assert count_terms(texts) == sum((count_terms([t]) for t in texts), Counter())
+    # Metinler birleştirilirken kelimeler birbirine yapışmamalı
+    assert count_terms(["abc", "def"]) == Counter({"abc": 1, "def": 1})
+
+    one_by_one = analyze_review_stream(iter(REVIEWS), batch_size=1)
+    batched = analyze_review_stream(iter(REVIEWS), batch_size=1000)
+    assert one_by_one == batched
+    assert batched["yuksek_puan_yorum_sayisi"] == 2
+    assert batched["dusuk_puan_yorum_sayisi"] == 2
+    assert {"kelime": "ışık", "frekans": 2} in batched["yuksek_puan_kelimeler"]
+    assert {"kelime": "iade", "frekans": 2} in batched["dusuk_puan_kelimeler"]
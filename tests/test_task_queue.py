@@ -0,0 +1,132 @@
+# task_queue'nun yerel MongoDB üzerinde testleri: birden çok işçi süreç aynı kuyruğu boşaltır.
+# mongod yoksa atlanır; MONGO_URI ile başka bir sunucu verilebilir (her test kendi geçici veritabanını siler).
+import multiprocessing
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from task_queue import (
+    TASKS_COLLECTION, MAX_ATTEMPTS, PENDING, RUNNING, DONE, FAILED,
+    enqueue_run, claim, complete, fail_exhausted, has_unfinished, run_status,
+)
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+WORKERS = 4
+TASKS = 200
+
+
+@pytest.fixture
+def queue_db():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"MongoDB'ye bağlanılamadı ({MONGO_URI})")
+    name = f"test_task_queue_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    client.drop_database(name)
+    client.close()
+
+
+def _products(n):
+    return [{"product_id": f"p{i}", "url": f"https://www.akakce.com/p{i}.html"} for i in range(n)]
+
+
+def _expire_leases(db, query=None):
+    db[TASKS_COLLECTION].update_many(
+        {"state": RUNNING, **(query or {})},
+        {"$set": {"lease_expires": datetime.utcnow() - timedelta(seconds=1)}},
+    )
+
+
+def _drain_worker(args):
+    """Ayrı süreçte çalışan işçi: kuyruk bitene kadar görev kiralar ve tamamlar; aldığı görevleri döndürür."""
+    db_name, run_id, worker = args
+    client = MongoClient(MONGO_URI)
+    db = client[db_name]
+    owner = f"worker-{worker}:{os.getpid()}"
+    seen = []
+    try:
+        while True:
+            claimed = claim(db, owner, 2, run_id=run_id)
+            if not claimed:
+                if not has_unfinished(db, run_id):
+                    return seen
+                time.sleep(0.05)
+                continue
+            for task in claimed:
+                seen.append((task["_id"], task["attempts"]))
+                assert complete(db, task, owner, {"owner": owner})
+    finally:
+        client.close()
+
+
+def _drain(db, run_id, workers=WORKERS):
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    with ctx.Pool(workers) as pool:
+        per_worker = pool.map(_drain_worker, [(db.name, run_id, i) for i in range(workers)])
+    return [claim for claims in per_worker for claim in claims]
+
+
+def test_enqueue_is_idempotent_and_claim_complete_lifecycle(queue_db):
+    run_id = enqueue_run(queue_db, _products(3))
+    enqueue_run(queue_db, _products(3), run_id=run_id)
+    assert run_status(queue_db, run_id) == {PENDING: 3, RUNNING: 0, DONE: 0, FAILED: 0}
+
+    first, second = claim(queue_db, "a", 2, run_id=run_id)
+    assert first["attempts"] == 1 and first["lease_owner"] == "a"
+    assert complete(queue_db, first, "a", {"status": "ok"})
+    # Başarısız görev deneme hakkı varken tekrar bekler
+    assert complete(queue_db, second, "a", {"status": "error"}, ok=False)
+    assert run_status(queue_db, run_id) == {PENDING: 2, RUNNING: 0, DONE: 1, FAILED: 0}
+
+
+def test_concurrent_workers_claim_every_task_exactly_once(queue_db):
+    run_id = enqueue_run(queue_db, _products(TASKS))
+
+    claims = _drain(queue_db, run_id)
+
+    ids = [task_id for task_id, _ in claims]
+    assert len(ids) == TASKS
+    assert len(set(ids)) == TASKS
+    assert run_status(queue_db, run_id) == {PENDING: 0, RUNNING: 0, DONE: TASKS, FAILED: 0}
+
+
+def test_expired_leases_are_reclaimed_by_other_workers(queue_db):
+    run_id = enqueue_run(queue_db, _products(20))
+    # Çöken işçi: görevleri kiralar ve bırakmadan ölür
+    abandoned = claim(queue_db, "crashed", 5, run_id=run_id)
+    _expire_leases(queue_db, {"lease_owner": "crashed"})
+
+    claims = _drain(queue_db, run_id)
+
+    attempts = dict(claims)
+    assert sorted(attempts) == sorted(f"{run_id}|p{i}|akakce" for i in range(20))
+    assert all(attempts[task["_id"]] == 2 for task in abandoned)
+    # Lease başka sürece geçtiği için eski sahibin sonucu yazılmaz
+    assert not complete(queue_db, abandoned[0], "crashed", {"status": "ok"})
+    assert run_status(queue_db, run_id)[DONE] == 20
+
+
+def test_fail_exhausted_marks_dead_tasks_failed(queue_db):
+    run_id = enqueue_run(queue_db, _products(2))
+    for _ in range(MAX_ATTEMPTS):
+        tasks = claim(queue_db, "crashed", 2, run_id=run_id)
+        assert len(tasks) == 2
+        _expire_leases(queue_db)
+    # Deneme hakkı bitmiş görevler artık kiralanmaz
+    assert claim(queue_db, "other", 2, run_id=run_id) == []
+
+    fail_exhausted(queue_db, run_id)
+
+    assert run_status(queue_db, run_id) == {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 2}
+    assert not has_unfinished(queue_db, run_id)
@@ -0,0 +1,204 @@
+# veri_toplama/akakce_http.py
+# Akakçe satıcı listesi için asyncio/httpx tabanlı hafif çekici.
+# Satıcı listesi sunucu tarafında render edildiğinden tarayıcıya gerek yoktur; sayfa
+# engellenmiş veya eksik gelirse ilgili ürün Selenium yoluna (engine.run_base_task) bırakılır.
+# İstekler Selenium yolu ile aynı "akakce" sınırına tabidir: scheduler'daki token kovası (hız, burst)
+# ve eşzamanlılık; dağıtık modda canlı düğüm sayısına bölünmüş hali. Tek hız sınırı bu kovadır;
+# rate_limit nezaket gecikmeleri (tarayıcı yolu için) burada ayrıca uygulanmaz, aksi halde istekler tek sıraya girerdi.
+#
+# Yerel HTML örnekleriyle denemek için:
+#   python -m http.server 8000  (örnek sayfaların olduğu klasörde)
+#   python akakce_http.py http://localhost:8000/urun.html
+
+import asyncio
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from utils import USER_AGENTS, AKAKCE_NO_SELLER_LIST, parse_akakce_html, enrich_with_base_data
+from scheduler import TokenBucket, load_limits, FALLBACK_LIMIT
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+    print("⚠️ httpx paketi yüklü değil, Akakçe sayfaları tarayıcı ile çekilecek. 'pip install httpx' ile yükleyin.")
+
+# ----------------- YAPILANDIRMA -----------------
+HTTP_ENABLED = HTTPX_AVAILABLE and os.getenv("AKAKCE_HTTP", "1") != "0"
+REQUEST_TIMEOUT_S = float(os.getenv("AKAKCE_HTTP_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("AKAKCE_HTTP_RETRIES", "3"))
+BACKOFF_BASE_S = 1.0
+MAX_BACKOFF_S = 30.0
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BLOCK_STATUSES = {401, 403}
+# Bot koruması / doğrulama sayfalarında görülen işaretler
+BLOCK_MARKERS = ("captcha", "cf-chl", "just a moment", "access denied", "erişim engellendi")
+
+HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.5",
+}
+
+
+def classify_page(status_code, html):
+    """
+    Yanıtı tüm belge üzerinde parse_akakce_html ile ayrıştırıp sınıflandırır:
+    ('ok', (product_name, base_data)) | ('blocked', None) | ('incomplete', None).
+    Satıcı listesi (#PL) varsa ama boşsa ürünün satıcısı yoktur: 'ok' ve boş base_data döner,
+    tarayıcıyla tekrar denenmez. Sadece listenin hiç bulunamadığı sayfalar eksik sayılır.
+    """
+    if status_code in BLOCK_STATUSES:
+        return "blocked", None
+    if status_code != 200 or not html:
+        return "incomplete", None
+    product_name, base_data = parse_akakce_html(html)
+    if product_name == AKAKCE_NO_SELLER_LIST:
+        # Satıcı listesi yoksa bot sayfası mı yoksa eksik sayfa mı ayırt et
+        lowered = html.lower()
+        if any(marker in lowered for marker in BLOCK_MARKERS):
+            return "blocked", None
+        return "incomplete", None
+    return "ok", (product_name, base_data)
+
+
+def _retry_delay(attempt, response=None):
+    """Üstel geri çekilme + jitter; sunucu Retry-After verdiyse ona uyulur."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF_S)
+    return min(BACKOFF_BASE_S * (2 ** attempt), MAX_BACKOFF_S) * random.uniform(0.8, 1.2)
+
+
+def default_limit():
+    """Tek düğüm için Akakçe sınırı (SCHEDULER_LIMITS ile ezilebilir)."""
+    return load_limits().get("akakce", FALLBACK_LIMIT)
+
+
+class HostLimiter:
+    """
+    Host başına eşzamanlılık (asyncio.Semaphore) + token kovası.
+    limit: scheduler sınır tanımı {"rate", "burst", "concurrency"}.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit or default_limit()
+        self._semaphores = {}
+        self._buckets = {}
+
+    async def acquire(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(max(1, int(self.limit["concurrency"])))
+            self._buckets[host] = TokenBucket(self.limit["rate"], self.limit["burst"])
+        semaphore, bucket = self._semaphores[host], self._buckets[host]
+        await semaphore.acquire()
+        try:
+            while not bucket.try_take():
+                await asyncio.sleep(bucket.time_until_token() or 0.05)
+        except BaseException:
+            semaphore.release()
+            raise
+
+    def release(self, url):
+        self._semaphores[urlsplit(url).netloc].release()
+
+
+async def fetch_html(client, limiter, url):
+    """URL'yi yeniden deneme/geri çekilme ile çeker; (durum kodu, html) döndürür."""
+    last_error = None
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        try:
+            await limiter.acquire(url)
+            try:
+                response = await client.get(url)
+            finally:
+                limiter.release(url)
+            if response.status_code not in RETRY_STATUSES:
+                return response.status_code, response.text
+            last_error = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            last_error = f"{type(e).__name__}: {e}"
+        if attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt, response))
+    raise RuntimeError(last_error or "bilinmeyen hata")
+
+
+async def _fetch_product(client, limiter, product_config):
+    start = time.perf_counter()
+    outcome = {"config": product_config, "state": "error", "detail": "", "duration_s": 0.0}
+    try:
+        status_code, html = await fetch_html(client, limiter, product_config["url"])
+        state, parsed = classify_page(status_code, html)
+        outcome["detail"] = f"HTTP {status_code}"
+        if state == "ok":
+            product_name, base_data = parsed
+            outcome["config"] = enrich_with_base_data(product_config, product_name, base_data)
+            outcome["detail"] = f"{len(base_data)} satıcı"
+        outcome["state"] = state
+    except Exception as e:
+        outcome["detail"] = str(e)
+    outcome["duration_s"] = time.perf_counter() - start
+    return outcome
+
+
+async def fetch_base_data_async(product_list, limit=None, on_outcome=None):
+    """
+    Tüm ürün sayfalarını tek bir (bağlantıları yeniden kullanan) istemci ile, limit'e uyarak çeker.
+    Sonuçlar tamamlanma sırasıyla döner; on_outcome verilirse her ürün biter bitmez çağrılır
+    (checkpoint: yarıda kalan bir çalıştırmada biten ürünler kaybolmaz).
+    """
+    limiter = HostLimiter(limit)
+    concurrency = max(1, int(limiter.limit["concurrency"]))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {**HEADERS, "User-Agent": random.choice(USER_AGENTS)}
+    async with httpx.AsyncClient(
+        headers=headers, limits=limits, timeout=REQUEST_TIMEOUT_S, follow_redirects=True
+    ) as client:
+        outcomes = []
+        for next_done in asyncio.as_completed([_fetch_product(client, limiter, p) for p in product_list]):
+            outcome = await next_done
+            outcomes.append(outcome)
+            if on_outcome:
+                on_outcome(outcome)
+        return outcomes
+
+
+def fetch_base_data_http(product_list, limit=None, on_outcome=None):
+    """
+    Senkron giriş noktası. limit verilmezse scheduler'ın "akakce" sınırı kullanılır;
+    dağıtık modda engine, share_limits ile düğüm sayısına bölünmüş sınırı geçirir.
+    Her ürün için (tamamlanma sırasıyla) sözlük döndürür; on_outcome her biri geldiğinde çağrılır:
+    {"config": zenginleştirilmiş veya orijinal config, "state": "ok"|"blocked"|"incomplete"|"error",
+     "detail": str, "duration_s": float}
+    state != "ok" olan ürünler Selenium yoluna bırakılmalıdır.
+    """
+    if not product_list:
+        return []
+    return asyncio.run(fetch_base_data_async(product_list, limit, on_outcome))
+
+
+if __name__ == "__main__":
+    if not HTTPX_AVAILABLE:
+        sys.exit(1)
+    urls = sys.argv[1:]
+    if not urls:
+        print("Kullanım: python akakce_http.py <akakce_url> [<akakce_url> ...]")
+        sys.exit(1)
+    configs = [{"product_id": f"url_{i}", "url": url} for i, url in enumerate(urls)]
+    start = time.perf_counter()
+    for res in fetch_base_data_http(configs):
+        cfg = res["config"]
+        print(f"[{res['state']}] {cfg['url']} ({res['duration_s']:.2f}s) {res['detail']}")
+        if res["state"] == "ok":
+            print(f"  {cfg['akakce_product_name']}")
+            for item in cfg["base_data"]:
+                print(f"  - {item['vendor_name']} / {item['seller_nickname']}: {item['price']} TL")
+    print(f"Toplam: {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,162 @@
+# veri_toplama/bulk_writer.py
+# MongoDB için arkadan yazan (write-behind) tampon.
+# Teklif upsert'leri, fiyat gözlemleri ve ürün kayıtları tek tek update_one/insert_one yerine
+# koleksiyon başına sırasız (ordered=False) bulk_write yığınları halinde yazılır.
+# Tampon MAX_OPS işleme ulaşınca veya en eski işlem MAX_DELAY_S'yi geçince boşaltılır;
+# başarısız işlemler yığındaki sıralarına göre kaynağına (tag) eşlenip raporlanır.
+# Boyut/zaman sınırında (zamanlayıcı iş parçacığında) oluşan hatalar da biriktirilir ve bir
+# sonraki açık flush() çağrısına döndürülür; böylece görev sonundaki flush hiçbir hatayı kaçırmaz.
+
+import os
+import threading
+import time
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+# ----------------- YAPILANDIRMA -----------------
+MAX_OPS = int(os.getenv("BULK_MAX_OPS", "500"))
+MAX_DELAY_S = float(os.getenv("BULK_MAX_DELAY_S", "2.0"))
+MAX_KEPT_ERRORS = 100
+
+
+class BulkWriter:
+    """
+    Koleksiyon bazında işlem biriktirir ve sırasız bulk_write ile yazar.
+
+        writer = BulkWriter(db)
+        writer.add("e_ticaret_offers", UpdateOne(...), tag=("p1", "trendyol"))
+        errors = writer.flush()   # son flush()'tan beri: [{"collection", "tag", "code", "errmsg"}, ...]
+
+    after_flush verilirse her boşaltmadan sonra başarılı yazılan [(koleksiyon, tag), ...] ile çağrılır;
+    fırlattığı hata da collection="after_flush" olan bir hata kaydı olarak raporlanır.
+    """
+
+    def __init__(self, db, max_ops=MAX_OPS, max_delay_s=MAX_DELAY_S, after_flush=None):
+        self.db = db
+        self.max_ops = max(1, max_ops)
+        self.max_delay_s = max_delay_s
+        self.after_flush = after_flush
+        self._lock = threading.RLock()
+        self._buffers = {}
+        self._size = 0
+        self._oldest = None
+        self._timer = None
+        # Son flush()'tan beri henüz kimseye döndürülmemiş hatalar
+        self._undrained = []
+        self.errors = []
+        self.stats = {"flushes": 0, "ops": 0, "inserted": 0, "upserted": 0, "modified": 0, "errors": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, collection_name, op, tag=None):
+        """
+        İşlemi tampona ekler; boyut sınırı aşıldıysa hemen boşaltır ve o boşaltmanın hatalarını döndürür
+        (hatalar bir sonraki flush() sonucunda da yer alır).
+        """
+        with self._lock:
+            self._buffers.setdefault(collection_name, []).append((op, tag))
+            self._size += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._arm_timer()
+            if self._size >= self.max_ops:
+                return self._flush()
+        return []
+
+    def _arm_timer(self):
+        # Zaman sınırı: az yazan süreçlerde de işlemler MAX_DELAY_S'den uzun beklemez
+        if self.max_delay_s <= 0 or (self._timer and self._timer.is_alive()):
+            return
+        self._timer = threading.Timer(self.max_delay_s, self._flush_if_due)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_if_due(self):
+        with self._lock:
+            if self._oldest is None:
+                return
+            if time.monotonic() - self._oldest >= self.max_delay_s:
+                self._flush()
+            else:
+                self._timer = None
+                self._arm_timer()
+
+    def flush(self):
+        """
+        Tüm tamponları yazar; son flush()'tan beri (boyut/zaman sınırındaki boşaltmalar dahil)
+        başarısız olan tüm işlemlerin listesini döndürür.
+        """
+        with self._lock:
+            self._flush()
+            errors, self._undrained = self._undrained, []
+            return errors
+
+    def _flush(self):
+        """Tamponları yazar; bu boşaltmanın hatalarını döndürür ve flush() için biriktirir."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            self._size = 0
+            self._oldest = None
+            errors, written = [], []
+            for collection_name, entries in buffers.items():
+                errors.extend(self._write(collection_name, entries, written))
+            if buffers:
+                self.stats["flushes"] += 1
+            if self.after_flush and written:
+                try:
+                    self.after_flush(written)
+                except Exception as e:
+                    errors.append({"collection": "after_flush", "tag": None, "code": None, "errmsg": str(e)})
+            if errors:
+                self.stats["errors"] += len(errors)
+                self.errors = (self.errors + errors)[-MAX_KEPT_ERRORS:]
+                for err in errors[:5]:
+                    print(f"WARNING bulk yazma hatası [{err['collection']}] {err['tag']}: {err['errmsg']}")
+                self._undrained.extend(errors)
+            return errors
+
+    def _write(self, collection_name, entries, written):
+        ops = [op for op, _ in entries]
+        self.stats["ops"] += len(ops)
+        try:
+            result = self.db[collection_name].bulk_write(ops, ordered=False)
+            details = result.bulk_api_result
+            failed = {}
+        except BulkWriteError as e:
+            details = e.details
+            # Sırasız yazmada diğer işlemler devam eder; hatalar yığındaki index ile gelir
+            failed = {err["index"]: err for err in details.get("writeErrors", [])}
+        except PyMongoError as e:
+            details = {}
+            failed = {i: {"code": None, "errmsg": str(e)} for i in range(len(entries))}
+
+        self.stats["inserted"] += details.get("nInserted", 0)
+        self.stats["upserted"] += details.get("nUpserted", 0)
+        self.stats["modified"] += details.get("nModified", 0)
+
+        errors = []
+        for index, (_, tag) in enumerate(entries):
+            err = failed.get(index)
+            if err is None:
+                written.append((collection_name, tag))
+            else:
+                errors.append({
+                    "collection": collection_name,
+                    "tag": tag,
+                    "code": err.get("code"),
+                    "errmsg": err.get("errmsg"),
+                })
+        return errors
+
+    def close(self):
+        errors = self.flush()
+        if self._timer:
+            self._timer.cancel()
+        return errors
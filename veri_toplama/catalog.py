@@ -0,0 +1,97 @@
+# veri_toplama/catalog.py
+# Ana sayfa için ürün kataloğu özeti (products koleksiyonu).
+# Scraper'lar yazdıkça ürün bazında güncellenir; app.py tek bir indeksli sorgu ile okur.
+
+from pymongo import UpdateOne
+
+PRODUCTS_COLLECTION = "products"
+OFFERS_COLLECTION = "e_ticaret_offers"
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def extract_brand(product_name):
+    """Markayı ürün adının ilk kelimesinden çıkarır (çok kısa kelimeler marka sayılmaz)."""
+    words = (product_name or "").split()
+    if words and len(words[0]) > 2:
+        return words[0]
+    return None
+
+
+def build_summary(product_id, docs):
+    """Bir ürünün e_ticaret_offers dokümanlarından katalog özetini hesaplar."""
+    registered = [d for d in docs if not d.get("scrape_ts")]
+    scraped = [d for d in docs if d.get("scrape_ts")]
+
+    # Ad ve kategori önce targets.json kaydından, yoksa en son scrape edilen teklifden alınır
+    scraped_sorted = sorted(scraped, key=lambda d: d["scrape_ts"], reverse=True)
+    product_name = next((d["product_name"] for d in registered + scraped_sorted if d.get("product_name")), product_id)
+    category = next((d["category"] for d in registered + scraped_sorted if d.get("category")), None)
+    prices = [d["price"] for d in scraped if isinstance(d.get("price"), (int, float)) and d["price"] > 0]
+
+    return {
+        "product_id": product_id,
+        "product_name": product_name,
+        "category": category,
+        "brand": extract_brand(product_name),
+        "min_price": min(prices) if prices else None,
+        "offer_count": len(scraped),
+        "site_count": len({d.get("site") for d in scraped if d.get("site")}),
+        "last_scrape_ts": scraped_sorted[0]["scrape_ts"] if scraped_sorted else None,
+    }
+
+
+def refresh_product_summary(db, product_id, collection_name=OFFERS_COLLECTION):
+    """Tek ürünün özetini (indeksli, küçük bir sorgu ile) yeniden hesaplayıp products'a yazar."""
+    docs = list(db[collection_name].find(
+        {"product_id": product_id},
+        {"_id": 0, "product_name": 1, "category": 1, "price": 1, "site": 1, "scrape_ts": 1},
+    ))
+    if not docs:
+        return None
+    summary = build_summary(product_id, docs)
+    # data_version her yazmada artar; analiz önbelleği bu sürüme göre geçersiz olur
+    db[PRODUCTS_COLLECTION].update_one(
+        {"_id": product_id},
+        {"$set": summary, "$inc": {"data_version": 1}},
+        upsert=True,
+    )
+    return summary
+
+
+def product_version(db, product_id):
+    """Ürünün veri sürümünü döndürür (hiç yazılmamışsa 0)."""
+    doc = db[PRODUCTS_COLLECTION].find_one({"_id": product_id}, {"data_version": 1})
+    return (doc or {}).get("data_version", 0)
+
+
+def register_products(db, product_list):
+    """targets.json ürünlerini katalogda oluşturur; scrape özet alanlarına dokunmaz."""
+    ops = []
+    for product in product_list:
+        if not product.get("product_id"):
+            continue
+        ops.append(UpdateOne(
+            {"_id": product["product_id"]},
+            {
+                "$set": {
+                    "product_id": product["product_id"],
+                    "product_name": product.get("product_name") or product["product_id"],
+                    "category": product.get("category"),
+                    "brand": extract_brand(product.get("product_name")),
+                },
+                "$setOnInsert": {"min_price": None, "offer_count": 0, "site_count": 0, "last_scrape_ts": None},
+            },
+            upsert=True,
+        ))
+    if ops:
+        db[PRODUCTS_COLLECTION].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def rebuild_catalog(db, collection_name=OFFERS_COLLECTION):
+    """Tüm katalog özetini e_ticaret_offers'tan baştan oluşturur (ilk kurulum / onarım)."""
+    count = 0
+    for product_id in db[collection_name].distinct("product_id"):
+        if refresh_product_summary(db, product_id, collection_name):
+            count += 1
+    return count
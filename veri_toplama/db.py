@@ -0,0 +1,153 @@
+# veri_toplama/db.py
+# Süreç genelinde paylaşılan MongoClient kaydı.
+# Scraper'lar (import db), analiz katmanı ve app.py (import veri_toplama.db) aynı havuzu kullanır.
+
+import os
+import threading
+
+from pymongo import MongoClient, monitoring
+
+# ----------------- YAPILANDIRMA -----------------
+MONGO_DB_URL = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = os.getenv("MONGO_DB", "missha_price_data")
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Bağlantı havuzu olaylarını sayan dinleyici."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "pools_created": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "checkout_failed": 0,
+            "pools_cleared": 0,
+        }
+
+    def _inc(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def pool_created(self, event):
+        self._inc("pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._inc("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._inc("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc("checkout_failed")
+
+    def connection_checked_out(self, event):
+        self._inc("checked_out")
+
+    def connection_checked_in(self, event):
+        self._inc("checked_in")
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts["open_connections"] = counts["connections_created"] - counts["connections_closed"]
+        counts["in_use"] = counts["checked_out"] - counts["checked_in"]
+        return counts
+
+
+_lock = threading.Lock()
+_clients = {}
+_metrics = {}
+_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """Fork sonrası çocuk süreç ebeveynin istemcilerini kullanmamalı; kendi havuzunu açar."""
+    global _lock, _pid
+    _lock = threading.Lock()
+    _clients.clear()
+    _metrics.clear()
+    _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_client(uri=None):
+    """Verilen URI için süreç başına tek (havuzlu) MongoClient döndürür."""
+    uri = uri or MONGO_DB_URL
+    if _pid != os.getpid():
+        _reset_after_fork()
+    client = _clients.get(uri)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            metrics = PoolMetrics()
+            client = MongoClient(
+                uri,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+                serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                event_listeners=[metrics],
+            )
+            _clients[uri] = client
+            _metrics[uri] = metrics
+    return client
+
+
+def get_db(name=None, uri=None):
+    """Paylaşılan istemci üzerinden veritabanı döndürür."""
+    return get_client(uri)[name or DB_NAME]
+
+
+def get_collection(name, db_name=None):
+    return get_db(db_name)[name]
+
+
+def pool_metrics():
+    """Her URI için havuz ayarlarını ve sayaçlarını döndürür (parolalar gizlenir)."""
+    result = {}
+    for uri, metrics in list(_metrics.items()):
+        safe_uri = uri.split("@")[-1] if "@" in uri else uri
+        result[safe_uri] = {
+            "pid": os.getpid(),
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            **metrics.snapshot(),
+        }
+    return result
+
+
+def close_all():
+    """Tüm paylaşılan istemcileri kapatır (süreç kapanışında)."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _metrics.clear()
@@ -1,10 +1,7 @@
 import json
-import time
-import random
 from utils import initialize_driver
+from readiness import load_page, scroll_until_stable
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 CATEGORIES = [
     {"name": "Gunes Kremi", "url": "https://www.akakce.com/gunes-kremi.html"},
@@ -12,6 +9,8 @@ CATEGORIES = [
     {"name": "Deterjan", "url": "https://www.akakce.com/toz-deterjan.html"}
 ]
 
+PRODUCT_XPATH = "//li[@class='pd_v8']"
+
 def load_existing_product_ids():
     """Mevcut targets.json'dan product_id'leri yükler."""
     try:
@@ -84,46 +83,16 @@ def run_discovery(products_per_category=34):
     try:
         for cat in CATEGORIES:
             print(f"🔎 {cat['name']} taranıyor...")
-            driver.get(cat["url"])
-            
-            # Sayfanın yüklenmesi için bekleme - WebDriverWait ile
-            wait = WebDriverWait(driver, 20)
-            try:
-                # Sayfa yüklenene kadar bekle
-                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            except:
-                pass
-            
-            time.sleep(random.uniform(3, 5))
+            # Sayfa yüklenip ilk ürün kartları görünene kadar bekle
+            # (aynı hosta art arda istekler arası nezaket gecikmesi rate_limit'tedir)
+            load_page(driver, cat["url"], ready=(By.XPATH, PRODUCT_XPATH), timeout=20)
             
-            # Sayfayı kademeli olarak kaydır (lazy loading için)
+            # Ürün sayısı artmayı bırakana kadar kaydır (lazy loading için)
             print("   📜 Sayfa kaydırılıyor...")
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            scroll_attempts = 0
-            max_scrolls = 5
-            
-            while scroll_attempts < max_scrolls:
-                # Kademeli scroll
-                for scroll_pos in [500, 1000, 1500, 2000]:
-                    driver.execute_script(f"window.scrollTo(0, {scroll_pos});")
-                    time.sleep(0.5)
-                
-                # En alta scroll
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                
-                # Yeni içerik yüklendi mi kontrol et
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-                scroll_attempts += 1
-            
-            # Ürünlerin yüklenmesi için ek bekleme
-            time.sleep(2)
+            scroll_until_stable(driver, count_locator=(By.XPATH, PRODUCT_XPATH), target_count=products_per_category)
 
             # Ürünleri topla
-            items = driver.find_elements(By.XPATH, "//li[@class='pd_v8']")
+            items = driver.find_elements(By.XPATH, PRODUCT_XPATH)
             print(f"📦 Bu sayfada {len(items)} ürün bulundu.")
             
             if len(items) == 0:
@@ -163,9 +132,6 @@ def run_discovery(products_per_category=34):
                 except Exception as e:
                     print(f"   ⚠️  Ürün işlenirken hata: {e}")
                     continue
-            
-            # Kategoriler arası kısa mola
-            time.sleep(random.uniform(3, 5))
 
         # Mevcut ürünleri yükle ve yeni ürünleri ekle
         if new_targets:
@@ -0,0 +1,181 @@
+# veri_toplama/driver_pool.py
+
+import os
+import atexit
+import threading
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+from utils import initialize_driver
+
+# ----------------- YAPILANDIRMA -----------------
+# Süreç başına açık tutulacak en fazla tarayıcı sayısı
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "1"))
+# Bir tarayıcı bu kadar sayfa yükledikten sonra kapatılıp yenisi açılır (bellek şişmesine karşı)
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "40"))
+# Havuzda boş tarayıcı beklerken en fazla bekleme süresi (saniye)
+DRIVER_ACQUIRE_TIMEOUT = 180
+
+
+class PooledDriver:
+    """
+    Havuzdaki WebDriver'ı saran ince katman.
+    Yüklenen sayfaları sayar; diğer tüm çağrıları gerçek driver'a iletir.
+    """
+
+    def __init__(self, driver):
+        self._driver = driver
+        self.pages = 0
+        self.broken = False
+
+    def get(self, url):
+        self.pages += 1
+        return self._driver.get(url)
+
+    def quit(self):
+        # Ödünç alan taraf tarayıcıyı kapatmaz; havuz geri alırken atar
+        self.broken = True
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class DriverPool:
+    """Sağlık kontrolü, durum sıfırlama ve N sayfa sonra yenileme yapan WebDriver havuzu."""
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES, factory=initialize_driver):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self._factory = factory
+        self._idle = LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "borrows": 0, "recycled": 0, "discarded": 0}
+
+    def _is_healthy(self, pooled):
+        try:
+            pooled._driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, pooled):
+        """Bir sonraki görev için çerez, depolama ve fazla sekmeleri temizler."""
+        driver = pooled._driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            # delete_all_cookies sadece mevcut alan adını temizler, CDP tüm çerezleri siler
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            # Okunmamış performance logları sonraki göreve taşınmasın
+            try:
+                driver.get_log("performance")
+            except Exception:
+                pass
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._created -= 1
+        self.stats["discarded"] += 1
+        try:
+            pooled._driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=DRIVER_ACQUIRE_TIMEOUT):
+        """
+        Havuzdan sağlıklı bir tarayıcı döndürür; gerekirse yenisini açar.
+        timeout içinde boş tarayıcı olmazsa TimeoutError fırlatır.
+        """
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                create = False
+                with self._lock:
+                    if self._created < self.size:
+                        self._created += 1
+                        create = True
+                if create:
+                    try:
+                        pooled = PooledDriver(self._factory())
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    self.stats["created"] += 1
+                    self.stats["borrows"] += 1
+                    return pooled
+                try:
+                    pooled = self._idle.get(timeout=timeout)
+                except Empty:
+                    raise TimeoutError(
+                        f"Tarayıcı havuzunda {timeout} sn içinde boş tarayıcı bulunamadı "
+                        f"(havuz boyutu {self.size}, hepsi kullanımda)"
+                    ) from None
+
+            if self._is_healthy(pooled):
+                self.stats["borrows"] += 1
+                return pooled
+            self._discard(pooled)
+
+    def release(self, pooled):
+        """Tarayıcıyı sıfırlayıp havuza iade eder; bozuk veya yıpranmışsa kapatır."""
+        if pooled.broken or not self._reset(pooled):
+            self._discard(pooled)
+            return
+        if pooled.pages >= self.max_pages:
+            self.stats["recycled"] += 1
+            self._discard(pooled)
+            return
+        self._idle.put(pooled)
+
+    def close_all(self):
+        """Havuzdaki boştaki tüm tarayıcıları kapatır."""
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(pooled)
+
+
+_POOL = None
+_POOL_PID = None
+
+
+def get_pool():
+    """Süreç başına tek havuz döndürür (fork sonrası çocuk süreç kendi havuzunu açar)."""
+    global _POOL, _POOL_PID
+    if _POOL is None or _POOL_PID != os.getpid():
+        _POOL = DriverPool()
+        _POOL_PID = os.getpid()
+        atexit.register(_POOL.close_all)
+    return _POOL
+
+
+@contextmanager
+def borrow_driver():
+    """
+    Havuzdan tarayıcı ödünç alır ve iş bitince iade eder.
+
+        with borrow_driver() as driver:
+            driver.get(url)
+    """
+    pool = get_pool()
+    driver = pool.acquire()
+    try:
+        yield driver
+    finally:
+        pool.release(driver)
@@ -0,0 +1,278 @@
+# veri_toplama/engine.py
+
+import time
+import queue
+import importlib
+from dataclasses import dataclass, field, asdict
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+
+from scheduler import DomainScheduler, load_limits, FALLBACK_LIMIT
+
+# ----------------- YAPILANDIRMA -----------------
+
+# Site adı -> (modül, scrape fonksiyonu). Modüller her işçi süreçte bir kez import edilir.
+SCRAPER_MODULES = {
+    "hepsiburada": ("hb_scraping", "scrape_hepsiburada_product"),
+    "trendyol": ("ty_scraper", "scrape_trendyol_product"),
+    "n11": ("n11_scraper", "scrape_n11_product"),
+    "pttavm": ("ptt_scraper", "scrape_ptt_product"),
+    "pazarama": ("pazarama_scraper", "scrape_pazarama_product"),
+}
+
+MAX_PROCESSES = 10
+
+STATUS_ICONS = {"ok": "✅", "not_found": "⚠️", "skipped": "⏭️", "error": "❌"}
+
+
+@dataclass
+class TaskResult:
+    """Tek bir (ürün, site) görevinin yapılandırılmış sonucu."""
+    product_id: str
+    site: str
+    status: str  # "ok" | "not_found" | "skipped" | "error"
+    duration_s: float
+    message: str = ""
+    error_type: str | None = None
+    data: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return self.status == "ok"
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: data.get(k) for k in ("product_id", "site", "status", "duration_s", "message", "error_type")},
+                   data=data.get("data") or {})
+
+    def summary_line(self):
+        icon = STATUS_ICONS.get(self.status, "?")
+        line = f"{icon} [{self.site}] {self.product_id} ({self.duration_s:.1f}s) {self.message}"
+        if self.error_type:
+            line += f" <{self.error_type}>"
+        return line
+
+
+# ----------------- İŞÇİ SÜREÇ TARAFI -----------------
+
+_SCRAPERS = {}
+
+
+def _close_worker_drivers():
+    from driver_pool import get_pool
+    from offer_store import flush_offers
+    flush_offers()
+    get_pool().close_all()
+
+
+def _init_worker():
+    """Her işçi süreçte scraper modüllerini bir kez yükler."""
+    for site, (module_name, func_name) in SCRAPER_MODULES.items():
+        module = importlib.import_module(module_name)
+        _SCRAPERS[site] = getattr(module, func_name)
+    # İşçi süreç kapanırken havuzdaki tarayıcıları kapat (atexit işçilerde çalışmaz)
+    Finalize(None, _close_worker_drivers, exitpriority=10)
+
+
+def _timed(product_config, site, func):
+    """Fonksiyonu çalıştırır, süresini ölçer ve TaskResult'a çevirir."""
+    product_id = product_config.get("product_id", "unknown")
+    start = time.perf_counter()
+    try:
+        outcome = func(product_config) or {}
+        return TaskResult(
+            product_id=product_id,
+            site=site,
+            status=outcome.get("status", "ok"),
+            duration_s=time.perf_counter() - start,
+            message=outcome.get("message", ""),
+            data=outcome.get("data", {}),
+        )
+    except Exception as e:
+        return TaskResult(
+            product_id=product_id,
+            site=site,
+            status="error",
+            duration_s=time.perf_counter() - start,
+            message=str(e),
+            error_type=type(e).__name__,
+        )
+
+
+def run_site_task(product_config):
+    """Bir (ürün, site) görevini işçi süreç içinde doğrudan çalıştırır."""
+    site = product_config.get("target_site", "unknown")
+    scraper = _SCRAPERS.get(site)
+    if scraper is None:
+        return TaskResult(product_config.get("product_id", "unknown"), site, "skipped", 0.0, f"{site} için scraper yok.")
+    result = _timed(product_config, site, scraper)
+    # Görevin teklifleri kuyruğa "bitti" yazılmadan önce diske inmeli; görev sırasında zamanlayıcıyla
+    # yapılan yazmaların hataları da burada döner ve görevi "error" yapar (yeniden denenir)
+    from offer_store import flush_offers
+    errors = flush_offers()
+    if errors:
+        result.status = "error"
+        result.message = f"{result.message} | {len(errors)} yazma hatası: {errors[0]['errmsg']}"
+        result.error_type = "BulkWriteError"
+    return result
+
+
+def _fetch_base_data(product_config):
+    from utils import fetch_product_base_data
+    # HTTP yolu ana süreçte zaten denendi; işçide doğrudan tarayıcı kullanılır
+    enriched = fetch_product_base_data(product_config, use_http=False)
+    return {
+        "status": "ok",
+        "message": f"{len(enriched['base_data'])} satıcı",
+        "data": {"config": enriched},
+    }
+
+
+def run_base_task(product_config):
+    """Koordinatör görevi: Akakçe satıcı listesini ürün başına bir kez çeker."""
+    return _timed(product_config, "akakce", _fetch_base_data)
+
+
+# ----------------- ANA SÜREÇ TARAFI -----------------
+
+def _failed_result(item, site, error):
+    """İşçide yakalanamayan hata (ör. süreç çökmesi, pickle hatası) için TaskResult."""
+    return TaskResult(
+        product_id=item.get("product_id", "unknown"),
+        site=site,
+        status="error",
+        duration_s=0.0,
+        message=str(error),
+        error_type=type(error).__name__,
+    )
+
+
+class ScraperEngine:
+    """
+    Kalıcı işçi süreç havuzu. Scraper modülleri her işçide bir kez yüklenir,
+    görevler subprocess yerine doğrudan fonksiyon çağrısı ile çalışır.
+    Görevler domain bazlı zamanlayıcı (scheduler.DomainScheduler) üzerinden dağıtılır:
+    her domainin token bucket ve eşzamanlılık sınırına uyulur, domainler sırayla beslenir.
+
+        with ScraperEngine(processes=10) as engine:
+            results = engine.run(tasks)
+    """
+
+    def __init__(self, processes=MAX_PROCESSES, limits=None):
+        self.processes = max(1, processes)
+        # None ise her _map çağrısında scheduler.load_limits() kullanılır; işçi düğümler paylaşılmış sınır verir
+        self.limits = limits
+        self._pool = None
+        self.schedule_stats = []
+
+    def __enter__(self):
+        self._pool = Pool(processes=self.processes, initializer=_init_worker)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._pool.close()
+        else:
+            self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def _map(self, func, items, domain_of, on_result=None):
+        """
+        Görevleri zamanlayıcıya göre apply_async ile başlatır, bittikçe sonuçları toplar.
+        on_result verilirse her sonuç geldiği anda çağrılır (ör. kuyruğa checkpoint).
+        """
+        scheduler = DomainScheduler(self.limits)
+        for item in items:
+            scheduler.submit(domain_of(item), item)
+
+        finished = queue.Queue()
+        results = []
+        in_flight = 0
+        while scheduler.pending or in_flight:
+            while in_flight < self.processes:
+                picked = scheduler.next_ready()
+                if picked is None:
+                    break
+                domain, item = picked
+                self._pool.apply_async(
+                    func, (item,),
+                    callback=lambda r, d=domain: finished.put((d, r)),
+                    error_callback=lambda e, d=domain, it=item: finished.put((d, _failed_result(it, d, e))),
+                )
+                in_flight += 1
+
+            # Boş işçi varsa bir sonraki token'a kadar, yoksa bir görev bitene kadar bekle
+            timeout = scheduler.wait_hint() if in_flight < self.processes else None
+            try:
+                domain, result = finished.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            in_flight -= 1
+            scheduler.done(domain)
+            print(f"{result.summary_line()} | kuyruk={scheduler.pending}", flush=True)
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+        for line in scheduler.report_lines():
+            print(line)
+        self.schedule_stats.append(scheduler.snapshot())
+        return results
+
+    def fetch_base_data(self, product_list, on_result=None):
+        """
+        Akakçe aşamasını çalıştırır; (zenginleştirilmiş config listesi, sonuçlar) döndürür.
+        Sayfalar önce ana süreçte asenkron HTTP ile çekilir; sadece engellenen/eksik
+        gelen ürünler işçi süreçlerde Selenium ile yeniden denenir. HTTP istekleri de
+        self.limits'teki (yoksa load_limits) "akakce" sınırına uyar.
+        """
+        from akakce_http import fetch_base_data_http, HTTP_ENABLED
+
+        use_http = HTTP_ENABLED and bool(product_list)
+        results, pending = [], ([] if use_http else list(product_list))
+
+        def on_outcome(outcome):
+            # Her ürün HTTP'den döner dönmez checkpoint'lenir
+            config = outcome["config"]
+            if outcome["state"] == "ok":
+                result = TaskResult(
+                    product_id=config.get("product_id", "unknown"),
+                    site="akakce",
+                    status="ok",
+                    duration_s=outcome["duration_s"],
+                    message=f"{outcome['detail']} (http)",
+                    data={"config": config},
+                )
+                print(result.summary_line(), flush=True)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+            else:
+                print(f"↩️ [akakce] {config.get('product_id')} HTTP {outcome['state']} ({outcome['detail']}), tarayıcıya düşülüyor.", flush=True)
+                pending.append(config)
+
+        if use_http:
+            limit = (self.limits or load_limits()).get("akakce", FALLBACK_LIMIT)
+            fetch_base_data_http(product_list, limit, on_outcome)
+
+        if pending:
+            results.extend(self._map(run_base_task, pending, lambda _: "akakce", on_result))
+        enriched = [r.data["config"] for r in results if r.ok]
+        return enriched, results
+
+    def run(self, tasks, on_result=None):
+        """Site görevlerini çalıştırır ve TaskResult listesi döndürür."""
+        return self._map(run_site_task, tasks, lambda t: t.get("target_site", "unknown"), on_result)
+
+
+def summarize(results):
+    """Sonuçları duruma göre sayar ve toplam süreyi döndürür."""
+    summary = {}
+    for r in results:
+        summary[r.status] = summary.get(r.status, 0) + 1
+    summary["total_duration_s"] = round(sum(r.duration_s for r in results), 1)
+    return summary
@@ -3,18 +3,19 @@
 import sys
 import json
 import time
-import re
 import io
-import random
-from urllib.parse import urlparse, parse_qs, unquote
-from pymongo import MongoClient
 from selenium.webdriver.common.by import By 
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 # UTILS dosyasından ortak fonksiyonları içeri aktar
-from utils import initialize_driver, scrape_akakce_base_data 
+from utils import get_base_data, site_offers, iter_offer_details, offers_data
+from driver_pool import borrow_driver 
+from redirects import resolve_marketplace_url
+from readiness import load_page, wait_for, scroll_reviews, select_sort
+from offer_store import save_offer, expire_stale_offers
+from page_parsers import SITE_SPECS, parse_detail, parse_reviews, review_item_xpath, review_page_url, review_text_xpath
+from review_cursor import DEFAULT_MAX_REVIEWS, load_review_cursor, save_review_cursor
+from db import get_db
 
 # ----------------- UTF-8 KORUMASI (Kritik Hata Çözümü) -----------------
 # Windows konsolunda Türkçe karakterler ve özel semboller (₺, stars vb.) 
@@ -23,180 +24,135 @@ if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 # ----------------- YAPILANDIRMA -----------------
-MONGO_DB_URL = "mongodb://localhost:27017/"
-DB_NAME = "missha_price_data"
 SITE_NAME = "hepsiburada"
 
-# Sizin belirlediğiniz KARARLI ve GÜNCEL olduğu varsayılan XPath'ler
-RATING_XPATH = '//*[@id="container"]/main/div/div[2]/section[1]/div[2]/div[1]/div[2]/div/div/span'
-REVIEW_XPATH = '//*[@id="container"]/main/div/div[2]/section[1]/div[2]/div[1]/div[2]/div/a'
+# XPath'ler ve yorum seçicileri page_parsers.SITE_SPECS'te
+SPEC = SITE_SPECS[SITE_NAME]
 
 # ----------------- HEPSIBURADA ÖZEL FONKSİYONLAR -----------------
 
-def scrape_hepsiburada_reviews(driver, max_reviews=20):
+def _scrape_hepsiburada_review_page(driver, max_reviews, cursor=None, select_newest=False):
+    """Açık yorum sayfasını kaydırıp bir kez ayrıştırır; select_newest ise önce "En yeni" sıralamasını seçer."""
+    if wait_for(driver, (By.XPATH, "//div[@id='hermes-voltran-comments']"), timeout=20) is None:
+        print("DEBUG HATA: hermes-voltran-comments container bulunamadı!")
+        return []
+    print("DEBUG: hermes-voltran-comments container bulundu")
+
+    # Bilinen yorumda durmak sadece en yeni önce sıralamada güvenli; seçilemezse durulmaz
+    if cursor and select_newest:
+        cursor.set_newest_first(select_sort(driver, SPEC.get("newest_first")))
+
+    # Yorum sayısı artmayı bırakana (max_reviews'a veya bilinen bir yoruma ulaşana) kadar kaydır
+    scroll_reviews(
+        driver,
+        (By.XPATH, review_item_xpath(SITE_NAME)),
+        review_text_xpath(SITE_NAME),
+        max_reviews,
+        cursor,
+    )
+
+    # Sayfa bir kez alınıp çevrimdışı ayrıştırılır: yorum ve yıldız başına find_element/get_attribute yok
+    return parse_reviews(driver.page_source, SITE_NAME, max_reviews, cursor)
+
+def scrape_hepsiburada_reviews(driver, max_reviews=DEFAULT_MAX_REVIEWS, cursor=None, review_url=None):
+    """
+    Açık yorum sayfasındaki yorumları çeker. Backfill imlecinde review_url verilirse yorumlar
+    ?sayfa=N ile sayfalandığı için sonraki sayfalar da (en fazla cursor.max_pages) gezilir.
+    """
     reviews_list = []
-    if max_reviews > 100:
-        max_reviews = 100
+    # 100 sınırı sadece imleçsiz çağrılar için; backfill imleci daha derine iner
+    max_reviews = cursor.max_reviews if cursor else min(max_reviews, 100)
     
     try:
-        wait = WebDriverWait(driver, 20)
-        try:
-            wait.until(EC.presence_of_element_located((By.XPATH, "//div[@id='hermes-voltran-comments']")))
-            print("DEBUG: hermes-voltran-comments container bulundu")
-        except Exception as e:
-            print(f"DEBUG HATA: hermes-voltran-comments container bulunamadı! Hata: {e}")
-            return reviews_list
-
-        # Sayfa Kaydırma Mantığı
-        scroll_positions = [300, 600, 900, 1200, 1500]
-        for scroll_pos in scroll_positions:
-            driver.execute_script(f"window.scrollTo(0, {scroll_pos});")
-            time.sleep(1.5)
-            current_count = len(driver.find_elements(By.XPATH, "//div[@id='hermes-voltran-comments']/div/div[3]"))
-            if current_count >= max_reviews:
-                break
-        
-        # Container'ları İşleme (Senin mantığın: div[X]/div[3])
-        all_main_divs = driver.find_elements(By.XPATH, "//div[@id='hermes-voltran-comments']/div")
-        review_containers = []
-        for main_div in all_main_divs:
-            try:
-                div3 = main_div.find_element(By.XPATH, "./div[3]")
-                review_containers.append(div3)
-            except: pass
-
-        for i, container in enumerate(review_containers[:max_reviews]):
-            try:
-                review_data = {}
-                # Metin çekme - div[2]/div[2]/div[2] yapısı
-                try:
-                    text_container = container.find_element(By.XPATH, ".//div[2]/div[2]/div[2]")
-                    review_data["text"] = text_container.text.strip()
-                except:
-                    review_data["text"] = None
-
-                # Puan çekme - Detaylı Yıldız Sayma Mantığın
-                try:
-                    rating = None
-                    stars_container = container.find_element(By.XPATH, ".//div[2]/div[2]/div[1]/div[2]/div/span/div")
-                    stars = stars_container.find_elements(By.XPATH, ".//div")
-                    active_count = 0
-                    for star in stars:
-                        class_attr = star.get_attribute("class") or ""
-                        if any(keyword in class_attr.lower() for keyword in ["fill", "active", "selected", "full"]):
-                            active_count += 1
-                    rating = active_count if 0 < active_count <= 5 else 5
-                    review_data["rating"] = rating
-                except:
-                    review_data["rating"] = None
-                
-                if review_data.get("text") and len(review_data["text"]) > 10:
-                    reviews_list.append(review_data)
-            except: continue
-            
+        reviews_list = _scrape_hepsiburada_review_page(driver, max_reviews, cursor, select_newest=True)
+
+        if cursor and cursor.backfill and review_url:
+            seen = {r["text"] for r in reviews_list}
+            for page in range(2, cursor.max_pages + 1):
+                if len(reviews_list) >= max_reviews:
+                    break
+                load_page(driver, review_page_url(review_url, SITE_NAME, page))
+                page_reviews = _scrape_hepsiburada_review_page(driver, max_reviews - len(reviews_list), cursor)
+                fresh = [r for r in page_reviews if r["text"] not in seen]
+                # Son sayfadan sonra site boş liste veya son sayfayı tekrar döndürür
+                if not fresh:
+                    break
+                seen.update(r["text"] for r in fresh)
+                reviews_list.extend(fresh)
+            print(f"DEBUG: HB backfill {len(reviews_list)} yorum çekti.")
     except Exception as e:
         print(f"DEBUG HATA: Yorumlar çekilirken hata: {e}")
     
+    if cursor:
+        cursor.record(reviews_list)
     return reviews_list
 
-def deep_scrape_hepsiburada(driver, hb_url):
+def deep_scrape_hepsiburada(driver, hb_url, cursor=None):
     data = {"rating": None, "reviews": None, "reviews_list": [], "high_rating_count": None, "low_rating_count": None}
     try:
-        driver.get(hb_url)
-        time.sleep(random.uniform(5, 8))
-        wait = WebDriverWait(driver, 30)
+        load_page(driver, hb_url)
+        wait_for(driver, (By.XPATH, SPEC["review_count"]), timeout=30)
 
-        # Yorum Sayısı ve Genel Puan
-        review_element = wait.until(EC.presence_of_element_located((By.XPATH, REVIEW_XPATH)))
-        data["reviews"] = int(re.sub(r"[^\d]", "", review_element.text))
-        rating_element = wait.until(EC.presence_of_element_located((By.XPATH, RATING_XPATH)))
-        data["rating"] = float(rating_element.text.replace(",", "."))
+        # Yorum Sayısı, Genel Puan ve yorum bağlantısı tek page_source'tan
+        detail = parse_detail(driver.page_source, SITE_NAME, base_url=driver.current_url)
+        data["rating"], data["reviews"] = detail["rating"], detail["reviews"]
 
         # Yorumlar Sayfasına Git
-        review_href = review_element.get_attribute("href")
-        if review_href:
-            driver.get(review_href)
-            time.sleep(5)
-            data["reviews_list"] = scrape_hepsiburada_reviews(driver, max_reviews=20)
+        if detail["reviews_href"]:
+            load_page(driver, detail["reviews_href"])
+            data["reviews_list"] = scrape_hepsiburada_reviews(driver, cursor=cursor, review_url=detail["reviews_href"])
 
     except Exception as e:
         print(f"DEBUG KRİTİK HATA: HB çekimi sırasında hata: {e}")
     return data
 
-def resolve_hepsiburada_url(akakce_link):
-    def _build_redirect_url(link: str) -> str:
-        parsed = urlparse(link)
-        queries = parse_qs(parsed.query)
-        frag_queries = parse_qs(parsed.fragment.replace("#", ""))
-        f_param = (frag_queries.get("f") or queries.get("f") or [None])[0]
-        if f_param:
-            decoded = unquote(f_param)
-            return f"https://www.akakce.com{decoded}" if decoded.startswith("/") else f"https://www.akakce.com/{decoded}"
-        return link
-
-    akakce_resolved = _build_redirect_url(akakce_link)
-    driver = initialize_driver()
-    try:
-        driver.get(akakce_resolved)
-        WebDriverWait(driver, 15).until(lambda d: len(d.window_handles) >= 1)
-        if len(driver.window_handles) > 1:
-            driver.switch_to.window(driver.window_handles[-1])
-        WebDriverWait(driver, 40).until(lambda d: "hepsiburada.com" in d.current_url or "akakce.com" not in d.current_url)
-        return driver, driver.current_url
-    except:
-        driver.quit()
-        return None, None
+def resolve_hepsiburada_url(driver, akakce_link, db=None):
+    """Akakçe linkini nihai Hepsiburada URL'sine çözer (önbellek -> HTTP -> tarayıcı)."""
+    return resolve_marketplace_url(akakce_link, SITE_NAME, driver=driver, db=db)
 
 def scrape_hepsiburada_product(product_config):
-    client, DRIVER = None, None
-    try:
-        client = MongoClient(MONGO_DB_URL, serverSelectionTimeoutMS=5000)
-        db = client[DB_NAME]
-        collection = db[product_config["collection"]]
-        DRIVER = initialize_driver()
-        product_name, base_data = scrape_akakce_base_data(DRIVER, product_config["url"])
-        DRIVER.quit()
-        DRIVER = None
-
-        for item in base_data:
-            v_name = item["vendor_name"].lower()
-            link = item.get("link", "").lower()
-            if "hepsiburada" in v_name or "hepsiburada" in link:
-                hb_driver, final_url = resolve_hepsiburada_url(item["link"])
-                if hb_driver:
-                    details = deep_scrape_hepsiburada(hb_driver, final_url)
-                    doc = {
-                        "product_id": product_config["product_id"],
-                        "product_name": product_name,
-                        "site": SITE_NAME,
-                        "vendor_name": item["vendor_name"],
-                        "seller_nickname": item.get("seller_nickname") or None,
-                        "price": item["price"],
-                        "rating": details.get("rating"),
-                        "review_count": details.get("reviews"),
-                        "reviews_list": details.get("reviews_list", []),
-                        "scrape_ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
-                    }
-                    collection.update_one(
-                        {"product_id": doc["product_id"], "vendor_name": doc["vendor_name"]},
-                        {"$set": doc},
-                        upsert=True
-                    )
-                    hb_driver.quit()
-                    return f"✅ HB SCRAPER: {product_name} verisi kaydedildi."
-        
-        return "⚠️ HB SCRAPER: Hepsiburada satıcısı bulunamadı."
-    except Exception as e:
-        return f"❌ KRİTİK HATA (HB Scraper): {e}"
-    finally:
-        if DRIVER: DRIVER.quit()
-        if client: client.close()
+    db = get_db()
+    collection_name = product_config.get("collection", "e_ticaret_offers")
+    # Akakçe verisi koordinatörden gelir (yoksa burada bir kez çekilir)
+    product_name, base_data = get_base_data(product_config)
+
+    # Yorumlar son taramada görülen en yeni yoruma kadar okunur (review_backfill: daha derine iner)
+    cursor = load_review_cursor(db, product_config["product_id"], SITE_NAME, product_config.get("review_backfill", False))
+    docs, reviews_saved = [], True
+    with borrow_driver() as driver:
+        # Akakçe'deki bu siteye ait tüm satıcılar kaydedilir; aynı sayfayı paylaşanlar için sayfa bir kez açılır
+        deep_scrape = lambda d, url: deep_scrape_hepsiburada(d, url, cursor)
+        offers = iter_offer_details(driver, db, site_offers(base_data, SITE_NAME), resolve_hepsiburada_url, deep_scrape)
+        for item, _, details in offers:
+            doc = {
+                "product_id": product_config["product_id"],
+                "product_name": product_name,
+                "site": SITE_NAME,
+                "vendor_name": item["vendor_name"],
+                "seller_nickname": item.get("seller_nickname") or None,
+                "price": item["price"],
+                "rating": details.get("rating"),
+                "review_count": details.get("reviews"),
+                "reviews_list": details.get("reviews_list", []),
+                "scrape_ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            # Güncel teklif + fiyat geçmişi + katalog özeti tek yazma yolundan
+            reviews_saved = save_offer(db, doc, collection_name) and reviews_saved
+            docs.append(doc)
+
+    if docs and reviews_saved:
+        save_review_cursor(db, cursor)
+    if docs:
+        # Bu taramada görülmeyen (eski anahtarlı veya listeden düşen) teklifler güncel görünümden çıkar
+        expire_stale_offers(db, product_config["product_id"], SITE_NAME, docs, collection_name)
+        return {"status": "ok", "message": f"✅ HB SCRAPER: {product_name} için {len(docs)} satıcı kaydedildi.", "data": offers_data(docs)}
+    return {"status": "not_found", "message": "⚠️ HB SCRAPER: Hepsiburada satıcısı bulunamadı."}
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         try:
             config = json.loads(sys.argv[1])
             result = scrape_hepsiburada_product(config)
-            print(f"\n{'='*50}\n{result}\n{'='*50}", flush=True)
+            print(f"\n{'='*50}\n{result['message']}\n{'='*50}", flush=True)
         except Exception as e:
             print(f"❌ KRİTİK HATA: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,187 @@
+# veri_toplama/indexes.py
+# MongoDB indeks tanımları, kurulum ve explain tabanlı doğrulama.
+# Hem "python main.py indexes" komutu hem de app.py açılışı tarafından çalıştırılır.
+
+from pymongo.errors import OperationFailure
+
+try:
+    from veri_toplama.price_history import ensure_price_history, PRICE_HISTORY_COLLECTION
+except ImportError:
+    from price_history import ensure_price_history, PRICE_HISTORY_COLLECTION
+
+OFFERS_COLLECTION = "e_ticaret_offers"
+PRODUCTS_COLLECTION = "products"
+ANALYSIS_CACHE_COLLECTION = "analysis_cache"
+REDIRECT_CACHE_COLLECTION = "redirect_cache"
+SCHEDULE_COLLECTION = "scrape_schedule"
+TASKS_COLLECTION = "scrape_tasks"
+NODES_COLLECTION = "scrape_nodes"
+REVIEWS_COLLECTION = "reviews"
+
+# Koleksiyon -> indeks listesi. Her indeks bir sıcak erişim desenine karşılık gelir.
+INDEX_SPECS = {
+    OFFERS_COLLECTION: [
+        # analiz.load_data, app.product_detail ($match product_id + $sort scrape_ts)
+        {"name": "product_scrape_ts", "keys": [("product_id", 1), ("scrape_ts", 1)]},
+        # Scraper upsert anahtarı (offer_store.offer_key) ve site/satıcı bazlı gruplama
+        {"name": "offer_site_key", "keys": [("product_id", 1), ("site", 1), ("vendor_name", 1), ("seller_nickname", 1)]},
+        # get_products_with_scraped_data: distinct product_id (sadece scrape edilmiş dokümanlar)
+        {
+            "name": "scraped_product_site",
+            "keys": [("product_id", 1), ("site", 1)],
+            "options": {"partialFilterExpression": {"scrape_ts": {"$exists": True}}},
+        },
+    ],
+    PRICE_HISTORY_COLLECTION: [
+        {"name": "product_ts", "keys": [("meta.product_id", 1), ("ts", 1)]},
+    ],
+    PRODUCTS_COLLECTION: [
+        # app.index: kategori / marka filtresi + ada göre sıralama
+        {"name": "category_brand_name", "keys": [("category", 1), ("brand", 1), ("product_name", 1)]},
+        {"name": "brand_name", "keys": [("brand", 1), ("product_name", 1)]},
+        # app.index keyset sayfalama: (product_name, product_id) sırası
+        {"name": "name_id", "keys": [("product_name", 1), ("product_id", 1)]},
+        # app.index arama kutusu
+        {
+            "name": "search_text",
+            "keys": [("product_name", "text"), ("product_id", "text")],
+            "options": {"default_language": "turkish"},
+        },
+    ],
+    ANALYSIS_CACHE_COLLECTION: [
+        # analiz/cache.py paylaşılan katmanı: süresi dolan sonuçları MongoDB siler
+        {"name": "expires_at_ttl", "keys": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+    ],
+    SCHEDULE_COLLECTION: [
+        # periodic_runner öncelik kuyruğu: vadesi gelenler en eskiden başlayarak
+        {"name": "next_due", "keys": [("next_due", 1)]},
+    ],
+    TASKS_COLLECTION: [
+        # claim(): çalıştırma + aşama içinde bekleyen/lease'i dolan görevler en eskiden başlayarak
+        {"name": "run_stage_state_created", "keys": [("run_id", 1), ("stage", 1), ("state", 1), ("created_at", 1)]},
+        # latest_unfinished_run() ve çalıştırma filtresiz claim()
+        {"name": "state_created", "keys": [("state", 1), ("created_at", 1)]},
+        # heartbeat(): bir sahibin çalışan görevleri
+        {"name": "lease_owner_state", "keys": [("lease_owner", 1), ("state", 1)]},
+    ],
+    NODES_COLLECTION: [
+        # live_nodes(): son heartbeat'e göre canlı düğümler
+        {"name": "last_seen", "keys": [("last_seen", 1)]},
+        # Çöken (kaydını silemeyen) düğümler kendiliğinden temizlenir
+        {"name": "expires_at_ttl", "keys": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+    ],
+    REVIEWS_COLLECTION: [
+        # _id = içerik hash'i; analiz ve rebuild_review_stats ürünün yorumlarını akış halinde okur
+        {"name": "product_first_seen", "keys": [("product_id", 1), ("first_seen", -1)]},
+    ],
+    REDIRECT_CACHE_COLLECTION: [
+        # redirects.py: Akakçe linki -> pazar yeri URL eşlemeleri süresi dolunca silinir
+        {"name": "expires_at_ttl", "keys": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+    ],
+}
+
+
+def ensure_indexes(db):
+    """INDEX_SPECS'teki tüm indeksleri oluşturur (varsa dokunmaz). Oluşturulan/hatalı isimleri döndürür."""
+    # price_history'nin zaman serisi olarak oluşması için indeksten önce koleksiyon kurulmalı
+    ensure_price_history(db)
+    created, failed = [], []
+    for col_name, specs in INDEX_SPECS.items():
+        col = db[col_name]
+        for spec in specs:
+            try:
+                col.create_index(spec["keys"], name=spec["name"], **spec.get("options", {}))
+                created.append(f"{col_name}.{spec['name']}")
+            except OperationFailure as e:
+                print(f"WARNING indeks oluşturulamadı ({col_name}.{spec['name']}): {e}")
+                failed.append(f"{col_name}.{spec['name']}")
+    return created, failed
+
+
+def missing_indexes(db):
+    """Tanımlı olup veritabanında bulunmayan indeksleri döndürür."""
+    missing = []
+    for col_name, specs in INDEX_SPECS.items():
+        existing = db[col_name].index_information()
+        for spec in specs:
+            if spec["name"] not in existing:
+                missing.append(f"{col_name}.{spec['name']}")
+    return missing
+
+
+def _collect_stages(plan, stages):
+    """Explain çıktısındaki tüm 'stage' değerlerini (iç içe planlar dahil) toplar."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key in ("rejectedPlans", "allPlansExecution"):
+                continue
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+    return stages
+
+
+def _plan_stats(explain):
+    planner = explain.get("queryPlanner", explain)
+    stats = explain.get("executionStats", {})
+    stages = _collect_stages(planner.get("winningPlan", planner), [])
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "n_returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+def explain_hot_queries(db):
+    """Sıcak sorguları örnek bir ürün ile explain eder ve plan istatistiklerini döndürür."""
+    offers = db[OFFERS_COLLECTION]
+    sample = offers.find_one({"scrape_ts": {"$exists": True}}, {"product_id": 1, "site": 1, "vendor_name": 1, "seller_nickname": 1})
+    if not sample:
+        return {}
+    pid = sample["product_id"]
+
+    report = {
+        "load_data": offers.find({"product_id": pid}).explain(),
+        "product_detail": offers.find({"product_id": pid}).sort("scrape_ts", 1).explain(),
+        "scraper_upsert": offers.find({
+            "product_id": pid,
+            "site": sample.get("site"),
+            "vendor_name": sample.get("vendor_name"),
+            "seller_nickname": sample.get("seller_nickname"),
+        }).explain(),
+        "scraped_distinct": db.command({
+            "explain": {"distinct": OFFERS_COLLECTION, "key": "product_id", "query": {"scrape_ts": {"$exists": True}}},
+            "verbosity": "executionStats",
+        }),
+        "price_history": db[PRICE_HISTORY_COLLECTION].find({"meta.product_id": pid}).sort("ts", 1).explain(),
+        "catalog_page": db[PRODUCTS_COLLECTION].find({}).sort([("product_name", 1), ("product_id", 1)]).limit(51).explain(),
+    }
+    return {name: _plan_stats(explain) for name, explain in report.items()}
+
+
+def bootstrap_indexes(db, explain=True):
+    """İndeksleri kurar, doğrular ve (istenirse) explain raporunu yazdırır. COLLSCAN yapan sorguları döndürür."""
+    created, failed = ensure_indexes(db)
+    missing = missing_indexes(db)
+    print(f"İndeksler: {len(created)} hazır, {len(failed)} hatalı, {len(missing)} eksik.")
+    for name in missing:
+        print(f"  ⚠️ Eksik indeks: {name}")
+
+    collscans = []
+    if explain:
+        for name, stats in explain_hot_queries(db).items():
+            flag = "❌ COLLSCAN" if stats["collscan"] else "✅"
+            print(
+                f"  {flag} {name}: {' > '.join(stats['stages'])} | "
+                f"keys={stats['keys_examined']} docs={stats['docs_examined']} "
+                f"returned={stats['n_returned']} {stats['time_ms']}ms"
+            )
+            if stats["collscan"]:
+                collscans.append(name)
+    return collscans
@@ -1,15 +1,24 @@
 # veri_toplama/main.py
 
 import json
-from multiprocessing import Pool
-import subprocess
 import os
 import sys
 import time
 import io
-import shutil
-from utils import initialize_driver, scrape_akakce_base_data
-from pymongo import MongoClient
+from utils import site_offers
+from engine import ScraperEngine, TaskResult, MAX_PROCESSES, summarize
+from task_queue import (
+    BASE_STAGE, SITE_STAGE, Heartbeat, node_id, task_id, enqueue_run, enqueue_site_tasks,
+    claim, complete, fail_exhausted, has_unfinished, latest_unfinished_run, run_status, run_results,
+)
+from scheduler import load_limits, share_limits, total_concurrency
+from nodes import register_node, touch_node, count_result, deregister_node, live_nodes, live_node_count, node_report_lines
+from indexes import bootstrap_indexes
+from catalog import register_products, rebuild_catalog
+from review_stats import backfill_review_stats
+from db import get_db
+from bulk_writer import BulkWriter
+from pymongo import InsertOne
 
 # ----------------- UTF-8 KORUMASI (Charmap Hatası Çözümü) -----------------
 # Windows terminalinde Unicode karakterleri nedeniyle oluşan çökmeleri engeller.
@@ -18,12 +27,15 @@ if sys.stdout.encoding != 'utf-8':
 
 # ----------------- YAPILANDIRMA -----------------
 
-MONGO_DB_URL = "mongodb://localhost:27017/"
-DB_NAME = "missha_price_data"
-
 # Tüm desteklenen sitelerin listesi
 ALL_SITES = ["hepsiburada", "trendyol", "n11", "pttavm", "pazarama"]
 
+# Kiralanacak görev kalmadığında başka süreçlerin bitirmesini beklerken yoklama aralığı (saniye)
+QUEUE_POLL_SECONDS = 10
+
+# Koordinatörün ilerleme/düğüm raporu aralığı (saniye)
+COORDINATOR_REPORT_SECONDS = 30
+
 # ----------------- YARDIMCI FONKSİYONLAR -----------------
 
 def load_existing_product_ids():
@@ -38,11 +50,9 @@ def load_existing_product_ids():
 def get_mongodb_product_ids(collection_name="e_ticaret_offers"):
     """MongoDB'deki mevcut product_id'leri yükler."""
     try:
-        client = MongoClient(MONGO_DB_URL, serverSelectionTimeoutMS=5000)
-        db = client[DB_NAME]
+        db = get_db()
         collection = db[collection_name]
         existing_ids = collection.distinct("product_id")
-        client.close()
         return set(existing_ids)
     except Exception as e:
         print(f"WARNING MongoDB bağlantı hatası: {e}")
@@ -57,27 +67,41 @@ def add_new_products_to_mongodb():
         print(f"HATA: targets.json okunamadı: {e}")
         return False
     
-    mongodb_ids = get_mongodb_product_ids()
-    new_products = [p for p in target_products if p.get("product_id") not in mongodb_ids]
-    
-    if not new_products:
-        print("Tüm ürünler zaten MongoDB'de mevcut.")
-        return True
-    
+    # Koleksiyon başına tek $in sorgusu ile zaten kayıtlı ürünler bulunur
+    by_collection = {}
+    for product in target_products:
+        if product.get("product_id"):
+            by_collection.setdefault(product.get("collection", "e_ticaret_offers"), []).append(product)
+
     try:
-        client = MongoClient(MONGO_DB_URL)
-        db = client[DB_NAME]
-        added_count = 0
-        for product in new_products:
-            collection_name = product.get("collection", "e_ticaret_offers")
-            collection = db[collection_name]
-            if not collection.find_one({"product_id": product["product_id"]}):
-                product["added_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
-                collection.insert_one(product)
-                added_count += 1
-        client.close()
-        print(f"Toplam {added_count} yeni ürün MongoDB'ye eklendi.")
-        return True
+        db = get_db()
+        new_products = []
+        with BulkWriter(db, max_ops=len(target_products) or 1, max_delay_s=0) as writer:
+            for collection_name, products in by_collection.items():
+                existing = set(db[collection_name].distinct(
+                    "product_id", {"product_id": {"$in": [p["product_id"] for p in products]}}
+                ))
+                for product in products:
+                    if product["product_id"] in existing:
+                        continue
+                    existing.add(product["product_id"])
+                    product["added_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                    writer.add(collection_name, InsertOne(product), tag=product["product_id"])
+                    new_products.append(product)
+
+            if not new_products:
+                print("Tüm ürünler zaten MongoDB'de mevcut.")
+                return True
+            errors = writer.flush()
+
+        failed = {err["tag"] for err in errors}
+        added = [p for p in new_products if p["product_id"] not in failed]
+        print(f"Toplam {len(added)} yeni ürün MongoDB'ye eklendi.")
+        for err in errors:
+            print(f"WARNING {err['tag']} eklenemedi: {err['errmsg']}")
+        # Ana sayfa kataloğunda da ürünleri oluştur
+        register_products(db, added)
+        return not errors
     except Exception as e:
         print(f"HATA MongoDB senkronizasyon hatası: {e}")
         return False
@@ -103,81 +127,287 @@ def add_single_product(product_id, product_name, category, url):
         json.dump(products, f, ensure_ascii=False, indent=2)
     return True
 
-def expand_product_tasks(product_config):
-    """Bir ürünü tüm pazar yerleri için ayrı görevlere (task) böler."""
+def expand_product_tasks(product_config, sites=None):
+    """
+    Bir ürünü pazar yerleri için ayrı görevlere (task) böler.
+    Koordinatör base_data eklediyse sadece satıcısı bulunan siteler için görev üretir.
+    sites verilirse sadece o siteler için görev üretilir (ör. takvimde vadesi gelenler).
+    """
     tasks = []
-    for site in ALL_SITES:
+    for site in sites or ALL_SITES:
+        if "base_data" in product_config and not site_offers(product_config["base_data"], site):
+            continue
         task = product_config.copy()
         task['target_site'] = site
         tasks.append(task)
     return tasks
 
-def run_scraper_script(product_config):
-    """Scraper scriptlerini subprocess ile asenkron ve UTF-8 güvenli çalıştırır."""
-    site_name = product_config.get('target_site', 'unknown')
-    script_map = {
-        "hepsiburada": "hb_scraper.py", "trendyol": "ty_scraper.py", 
-        "n11": "n11_scraper.py", "pttavm": "ptt_scraper.py", "pazarama": "pazarama_scraper.py"
-    }
-    
-    script_file = script_map.get(site_name)
-    if not script_file: return f"SKIP: {site_name} için script yok."
-    
+def _checkpoint(db, run_id, owner, claimed, on_done=None):
+    """Her TaskResult geldiği anda ilgili kuyruk görevini kapatan geri çağırma fonksiyonu üretir."""
+    by_id = {task["_id"]: task for task in claimed}
+
+    def on_result(result):
+        task = by_id.get(task_id(run_id, result.product_id, result.site))
+        if task is None:
+            return
+        stored = result.to_dict()
+        if task["stage"] == BASE_STAGE:
+            # base_data site görevlerine gömülür; sonucu şişirmesin
+            enriched = stored["data"].pop("config", None)
+            if result.ok and enriched:
+                # Önce site görevleri eklenir: çökme olursa base yeniden çalışır, ekleme idempotenttir
+                enqueue_site_tasks(db, run_id, expand_product_tasks(enriched, task.get("sites")))
+        # not_found / skipped kalıcı sonuçlardır; sadece hatalar yeniden denenir
+        complete(db, task, owner, stored, ok=result.status != "error")
+        if on_done:
+            on_done(result)
+
+    return on_result
+
+
+def _claim_next(db, owner, limit, run_id=None):
+    """Önce base (Akakçe), yoksa site görevlerini kiralar; (aşama, görevler) döndürür."""
+    for stage in (BASE_STAGE, SITE_STAGE):
+        claimed = claim(db, owner, limit, run_id=run_id, stage=stage)
+        if claimed:
+            return stage, claimed
+    return None, []
+
+
+def _process_batch(db, engine, owner, stage, claimed, on_done=None):
+    """Kiralanmış görevleri çalıştırma (run) bazında gruplayıp engine ile işler."""
+    by_run = {}
+    for task in claimed:
+        by_run.setdefault(task["run_id"], []).append(task)
+    for run_id, tasks in by_run.items():
+        print(f"Kuyruk [{run_id}]: {len(tasks)} {stage} görevi alındı ({owner})")
+        on_result = _checkpoint(db, run_id, owner, tasks, on_done)
+        configs = [task["config"] for task in tasks]
+        if stage == BASE_STAGE:
+            engine.fetch_base_data(configs, on_result=on_result)
+        else:
+            engine.run(configs, on_result=on_result)
+
+
+def _print_run_summary(db, run_id):
+    results = [TaskResult.from_dict(r) for r in run_results(db, run_id)]
+    print("\n" + "="*20 + f" SONUÇLAR [{run_id}] " + "="*20)
+    for status, count in summarize(results).items():
+        print(f"  {status}: {count}")
+    return results
+
+
+def drain_run(run_id, max_processes=MAX_PROCESSES, owner=None):
+    """
+    Kuyruktaki bir çalıştırmayı bitene kadar işler. Önce base (Akakçe) görevleri, sonra
+    site görevleri kiralanır; her sonuç anında kuyruğa yazılır (checkpoint).
+    Aynı run_id için birden çok süreç aynı anda drain_run çalıştırabilir.
+    """
+    db = get_db()
+    owner = owner or node_id()
+    limits = load_limits()
+    num_processes = min(max_processes, total_concurrency(limits))
+
+    with Heartbeat(db, owner), ScraperEngine(processes=num_processes) as engine:
+        while True:
+            stage, claimed = _claim_next(db, owner, num_processes * 4, run_id=run_id)
+            if not claimed:
+                fail_exhausted(db, run_id)
+                if not has_unfinished(db, run_id):
+                    break
+                # Kalan görevler başka süreçlerde çalışıyor; bitmelerini veya lease'lerinin dolmasını bekle
+                time.sleep(QUEUE_POLL_SECONDS)
+                continue
+            # drain_run düğüm olarak kayıtlı değil; canlı işçilerle birlikte sınırları paylaşır
+            engine.limits = share_limits(limits, live_node_count(db) + 1)
+            _process_batch(db, engine, owner, stage, claimed)
+
+    return _print_run_summary(db, run_id)
+
+
+def run_worker(max_processes=MAX_PROCESSES, exit_when_idle=False):
+    """
+    Dağıtık işçi düğüm: tüm çalıştırmaların görevlerini paylaşılan kuyruktan kiralar ve işler.
+    Teklifler scraper'lar tarafından doğrudan e_ticaret_offers'a yazılır. Düğüm kapasitesi
+    scrape_nodes'a ilan edilir; domain sınırları canlı düğüm sayısına bölünür, böylece
+    düğüm eklemek sitelere binen toplam yükü artırmaz.
+    exit_when_idle: kuyrukta bitmemiş görev kalmayınca çık (yerel test / tek seferlik işçi).
+    """
+    db = get_db()
+    owner = node_id()
+    limits = load_limits()
+    num_processes = min(max_processes, total_concurrency(limits))
+    register_node(db, owner, num_processes, limits)
+    load = {"in_flight": 0}
+    print(f"İşçi başladı: {owner} ({num_processes} süreç)")
+
+    def on_done(result):
+        load["in_flight"] -= 1
+        count_result(db, owner, result.status != "error")
+
     try:
-        json_arg = json.dumps(product_config)
-        print(f"STARTING: {product_config['product_name']} -> {site_name}")
-        
-        # Subprocess UTF-8 yönetimi burada gerçekleşir
-        result = subprocess.run(
-            [sys.executable, script_file, json_arg],
-            capture_output=True, text=True, 
-            encoding="utf-8", errors="replace", check=True 
-        )
-        return result.stdout.strip()
+        with Heartbeat(db, owner, on_beat=lambda: touch_node(db, owner, in_flight=load["in_flight"])), \
+                ScraperEngine(processes=num_processes) as engine:
+            while True:
+                stage, claimed = _claim_next(db, owner, num_processes * 2)
+                if not claimed:
+                    touch_node(db, owner, in_flight=0)
+                    fail_exhausted(db)
+                    if exit_when_idle and not has_unfinished(db):
+                        break
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    continue
+                engine.limits = share_limits(limits, live_node_count(db))
+                load["in_flight"] = len(claimed)
+                touch_node(db, owner, in_flight=len(claimed))
+                _process_batch(db, engine, owner, stage, claimed, on_done)
+    except KeyboardInterrupt:
+        # Bitmemiş görevlerin lease'i dolunca başka düğümler tarafından alınır
+        print(f"İşçi durduruluyor: {owner}")
+    finally:
+        deregister_node(db, owner)
+
+
+def run_coordinator(product_list, sites_by_product=None, wait=True):
+    """
+    Koordinatör: ürünleri yeni bir çalıştırma olarak kuyruğa ekler, kendisi tarama yapmaz.
+    wait=True ise çalıştırma bitene kadar ilerlemeyi ve canlı düğümleri raporlar.
+    """
+    db = get_db()
+    run_id = enqueue_run(db, product_list, sites_by_product)
+    print(f"Koordinatör: {run_id} kuyruğa eklendi ({len(product_list)} ürün)")
+    if not wait:
+        return run_id
+
+    while has_unfinished(db, run_id):
+        time.sleep(COORDINATOR_REPORT_SECONDS)
+        fail_exhausted(db, run_id)
+        print_run_status(run_id)
+        nodes = live_nodes(db)
+        for line in node_report_lines(nodes):
+            print(line)
+        if not nodes:
+            print("UYARI: Canlı işçi yok. 'python main.py worker' ile en az bir işçi başlatın.")
+
+    _print_run_summary(db, run_id)
+    return run_id
+
+
+def run_products(product_list, max_processes=MAX_PROCESSES, sites_by_product=None):
+    """
+    Ürün listesini kalıcı kuyruğa yeni bir çalıştırma olarak ekler ve işler:
+    1. Akakçe satıcı listesi ürün başına bir kez çekilir.
+    2. Sadece satıcısı bulunan siteler için site görevleri çalışır.
+    sites_by_product ({product_id: [site, ...]}) verilirse ürün başına sadece bu siteler çalışır.
+    TaskResult listesi döndürür.
+    """
+    run_id = enqueue_run(get_db(), product_list, sites_by_product)
+    print(f"Yeni çalıştırma kuyruğa eklendi: {run_id} ({len(product_list)} ürün)")
+    return drain_run(run_id, max_processes)
+
+
+def print_run_status(run_id=None):
+    db = get_db()
+    run_id = run_id or latest_unfinished_run(db)
+    if not run_id:
+        print("Bitmemiş çalıştırma yok.")
+        return
+    counts = run_status(db, run_id)
+    print(f"{run_id}: " + " | ".join(f"{state}={n}" for state, n in counts.items()))
+
+
+def print_nodes():
+    for line in node_report_lines(live_nodes(get_db())):
+        print(line)
+
+
+def load_target_products(product_id=None):
+    """targets.json'daki ürünleri (product_id verilirse sadece onu) döndürür."""
+    try:
+        with open('targets.json', 'r', encoding='utf-8') as f:
+            products = json.load(f)
     except Exception as e:
-        return f"ERROR ({site_name}): {str(e)}"
+        print(f"Hata: {e}")
+        return []
+    if product_id:
+        products = [p for p in products if p.get('product_id') == product_id]
+    return products
 
 def get_products_with_scraped_data():
-    """MongoDB'de veri çekilmiş (scrape_ts veya price olan) product_id'leri döndürür."""
+    """MongoDB'de veri çekilmiş (scrape_ts olan) product_id'leri döndürür."""
     try:
-        client = MongoClient(MONGO_DB_URL, serverSelectionTimeoutMS=5000)
-        db = client[DB_NAME]
+        db = get_db()
         collection = db["e_ticaret_offers"]
         
-        # Veri çekilmiş ürünleri bul (scrape_ts veya price alanı olanlar)
-        scraped_products = collection.distinct("product_id", {
-            "$or": [
-                {"scrape_ts": {"$exists": True}},
-                {"price": {"$exists": True, "$ne": None}}
-            ]
-        })
-        client.close()
+        # Veri çekilmiş ürünleri bul (scraper'lar her zaman scrape_ts ve price'ı birlikte yazar).
+        # Tek koşul, scraped_product_site kısmi indeksinin kullanılmasını sağlar.
+        scraped_products = collection.distinct("product_id", {"scrape_ts": {"$exists": True}})
         return set(scraped_products)
     except Exception as e:
         print(f"WARNING MongoDB kontrol hatası: {e}")
         return set()
 
+def run_index_bootstrap():
+    """İndeksleri kurar ve sıcak sorguların explain raporunu yazdırır."""
+    try:
+        collscans = bootstrap_indexes(get_db())
+        if collscans:
+            print(f"UYARI: {len(collscans)} sorgu hâlâ koleksiyon taraması yapıyor: {', '.join(collscans)}")
+        return not collscans
+    except Exception as e:
+        print(f"HATA indeks kurulumu başarısız: {e}")
+        return False
+
+def run_review_stats_backfill():
+    """Tekliflerdeki eski yorumları reviews koleksiyonuna taşır ve review_stats'ı baştan kurar."""
+    try:
+        migrated, products = backfill_review_stats(get_db())
+        print(f"Yorumlar: {migrated} yeni yorum taşındı, {products} ürünün istatistiği yeniden oluşturuldu.")
+        return True
+    except Exception as e:
+        print(f"HATA yorum istatistikleri oluşturulamadı: {e}")
+        return False
+
+def run_review_backfill(product_id=None):
+    """
+    Yorumları yorum imlecinde durmadan, REVIEW_BACKFILL_MAX'a kadar kaydırarak yeniden çeker
+    (yeni bir çalıştırma olarak kuyruğa eklenir). product_id verilirse sadece o ürün.
+    """
+    products = [{**p, "review_backfill": True} for p in load_target_products(product_id)]
+    if not products:
+        print("HATA: Yorumları tamamlanacak ürün bulunamadı.")
+        return
+    return run_products(products)
+
+def run_catalog_rebuild():
+    """products katalog özetini e_ticaret_offers'tan baştan oluşturur."""
+    try:
+        count = rebuild_catalog(get_db())
+        print(f"Katalog yeniden oluşturuldu: {count} ürün.")
+        return True
+    except Exception as e:
+        print(f"HATA katalog oluşturulamadı: {e}")
+        return False
+
 # ----------------- ANA ÇALIŞTIRMA -----------------
 
 def main_scraper_runner():
+    """Bitmemiş bir çalıştırma varsa kaldığı yerden devam eder; yoksa tüm ürünler için yenisini başlatır."""
+    run_id = latest_unfinished_run(get_db())
+    if run_id:
+        print(f"Bitmemiş çalıştırma bulundu, devam ediliyor: {run_id}")
+        return drain_run(run_id)
+
     try:
         with open('targets.json', 'r', encoding='utf-8') as f:
             product_list = json.load(f)
     except:
         print("HATA: targets.json bulunamadı veya bozuk."); return
 
-    all_tasks = []
-    for product in product_list:
-        all_tasks.extend(expand_product_tasks(product))
-    
-    num_processes = min(len(all_tasks), 10) # Maksimum 10 paralel işlem
-    print(f"Başlatılıyor: {len(product_list)} ürün | {len(all_tasks)} görev | {num_processes} slot")
-
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(run_scraper_script, all_tasks)
+    if not product_list:
+        print("HATA: targets.json boş."); return
 
-    print("\n" + "="*20 + " SONUÇLAR " + "="*20)
-    for res in results: print(res)
+    return run_products(product_list)
 
 def main_scraper_runner_new_only():
     """Sadece yeni eklenen (henüz veri çekilmemiş) ürünler için scraper çalıştırır."""
@@ -203,26 +433,22 @@ def main_scraper_runner_new_only():
     for p in new_products:
         print(f"  - {p.get('product_name', p.get('product_id'))}")
     
-    # Sadece yeni ürünler için task oluştur
-    all_tasks = []
-    for product in new_products:
-        all_tasks.extend(expand_product_tasks(product))
-    
-    num_processes = min(len(all_tasks), 10)
-    print(f"\nBaslatiliyor: {len(new_products)} yeni urun | {len(all_tasks)} gorev | {num_processes} slot")
-    
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(run_scraper_script, all_tasks)
-    
-    print("\n" + "="*20 + " SONUCLAR " + "="*20)
-    for res in results:
-        print(res)
+    return run_products(new_products)
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         cmd = sys.argv[1].lower()
         if cmd == "sync":
             add_new_products_to_mongodb()
+        elif cmd == "indexes":
+            run_index_bootstrap()
+        elif cmd == "catalog":
+            run_catalog_rebuild()
+        elif cmd == "review-stats":
+            run_review_stats_backfill()
+        elif cmd == "reviews-backfill":
+            # python main.py reviews-backfill [product_id]
+            run_review_backfill(sys.argv[2] if len(sys.argv) > 2 else None)
         elif cmd == "new-only" or cmd == "new":
             # Sadece yeni eklenen ürünler için scraper çalıştır
             add_new_products_to_mongodb()
@@ -230,20 +456,39 @@ if __name__ == "__main__":
         elif cmd == "add" and len(sys.argv) >= 6:
             if add_single_product(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5]):
                 add_new_products_to_mongodb()
+        elif cmd == "resume":
+            # python main.py resume [run_id]  (başka süreçler de aynı çalıştırmaya katılabilir)
+            run_id = sys.argv[2] if len(sys.argv) > 2 else latest_unfinished_run(get_db())
+            if run_id:
+                drain_run(run_id)
+            else:
+                print("Devam edilecek çalıştırma yok.")
+        elif cmd == "status":
+            print_run_status(sys.argv[2] if len(sys.argv) > 2 else None)
+            print_nodes()
+        elif cmd == "nodes":
+            print_nodes()
+        elif cmd == "coordinate":
+            # python main.py coordinate [product_id] [--no-wait]
+            args = [a for a in sys.argv[2:] if not a.startswith("--")]
+            add_new_products_to_mongodb()
+            products = load_target_products(args[0] if args else None)
+            if products:
+                run_coordinator(products, wait="--no-wait" not in sys.argv)
+            else:
+                print("HATA: Kuyruğa eklenecek ürün bulunamadı.")
+        elif cmd == "worker":
+            # python main.py worker [süreç_sayısı] [--exit-when-idle]
+            args = [a for a in sys.argv[2:] if not a.startswith("--")]
+            run_worker(int(args[0]) if args else MAX_PROCESSES, exit_when_idle="--exit-when-idle" in sys.argv)
         else:
-            # Belirli bir ID'yi çalıştırma modu
+            # Belirli bir ID'yi çalıştırma modu: sadece o ürün kuyruğa eklenir
             target_id = sys.argv[1]
-            try:
-                with open('targets.json', 'r', encoding='utf-8') as f:
-                    all_p = json.load(f)
-                filtered = [p for p in all_p if p.get('product_id') == target_id]
-                if filtered:
-                    shutil.copy('targets.json', 'targets.json.bak')
-                    with open('targets.json', 'w', encoding='utf-8') as f:
-                        json.dump(filtered, f, ensure_ascii=False, indent=2)
-                    main_scraper_runner()
-                    shutil.move('targets.json.bak', 'targets.json')
-            except Exception as e: print(f"Hata: {e}")
+            filtered = load_target_products(target_id)
+            if filtered:
+                run_products(filtered)
+            else:
+                print(f"HATA: '{target_id}' targets.json içinde bulunamadı.")
     else:
         add_new_products_to_mongodb()
         main_scraper_runner()
\ No newline at end of file
@@ -0,0 +1,76 @@
+# veri_toplama/nodes.py
+# Dağıtık tarama için işçi düğüm kaydı (scrape_nodes koleksiyonu).
+# Her işçi (python main.py worker) açılışta kapasitesini (işçi süreç sayısı, domain sınırları) yazar,
+# heartbeat ile last_seen ve yük bilgisini günceller, kapanışta kaydını siler.
+# Koordinatör ve işçiler canlı düğüm sayısına bakarak domain sınırlarını paylaştırır.
+
+import os
+import socket
+from datetime import datetime, timedelta
+
+# ----------------- YAPILANDIRMA -----------------
+NODES_COLLECTION = "scrape_nodes"
+# Bu süre boyunca heartbeat atmayan düğüm ölü sayılır
+NODE_STALE_SECONDS = int(os.getenv("NODE_STALE_SECONDS", "120"))
+# Çöken düğümlerin kayıtları TTL indeksi ile bu süre sonunda silinir
+NODE_EXPIRE_SECONDS = NODE_STALE_SECONDS * 10
+
+
+def register_node(db, owner, processes, limits):
+    """Düğümü kapasitesiyle kaydeder (aynı owner tekrar kaydolursa üzerine yazar)."""
+    now = datetime.utcnow()
+    db[NODES_COLLECTION].update_one(
+        {"_id": owner},
+        {"$set": {
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "processes": processes,
+            "limits": limits,
+            "started_at": now,
+            "last_seen": now,
+            "expires_at": now + timedelta(seconds=NODE_EXPIRE_SECONDS),
+            "in_flight": 0,
+            "completed": 0,
+            "failed": 0,
+        }},
+        upsert=True,
+    )
+
+
+def touch_node(db, owner, **stats):
+    """Heartbeat: last_seen'i yeniler; verilen yük alanlarını (in_flight vb.) yazar."""
+    now = datetime.utcnow()
+    db[NODES_COLLECTION].update_one(
+        {"_id": owner},
+        {"$set": {"last_seen": now, "expires_at": now + timedelta(seconds=NODE_EXPIRE_SECONDS), **stats}},
+    )
+
+
+def count_result(db, owner, ok):
+    db[NODES_COLLECTION].update_one({"_id": owner}, {"$inc": {"completed" if ok else "failed": 1}})
+
+
+def deregister_node(db, owner):
+    db[NODES_COLLECTION].delete_one({"_id": owner})
+
+
+def live_nodes(db):
+    """Son NODE_STALE_SECONDS içinde heartbeat atmış düğümler."""
+    since = datetime.utcnow() - timedelta(seconds=NODE_STALE_SECONDS)
+    return list(db[NODES_COLLECTION].find({"last_seen": {"$gte": since}}).sort("started_at", 1))
+
+
+def live_node_count(db):
+    since = datetime.utcnow() - timedelta(seconds=NODE_STALE_SECONDS)
+    return db[NODES_COLLECTION].count_documents({"last_seen": {"$gte": since}})
+
+
+def node_report_lines(nodes):
+    lines = [f"Canlı düğüm: {len(nodes)} | toplam işçi süreç: {sum(n.get('processes', 0) for n in nodes)}"]
+    for n in nodes:
+        lines.append(
+            f"  {n['_id']}: {n.get('processes', 0)} süreç, çalışan={n.get('in_flight', 0)} "
+            f"bitti={n.get('completed', 0)} hata={n.get('failed', 0)} "
+            f"son görülme={n['last_seen'].strftime('%H:%M:%S')}"
+        )
+    return lines
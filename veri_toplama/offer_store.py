@@ -0,0 +1,98 @@
+# veri_toplama/offer_store.py
+# Scraper'ların ortak yazma yolu. Yazmalar süreç başına bir BulkWriter'da birikir;
+# görev sonunda (engine.run_site_task) veya boyut/zaman sınırında tek bulk_write ile yazılır.
+
+import os
+
+from pymongo import DeleteMany, InsertOne, UpdateOne
+
+from bulk_writer import BulkWriter
+from price_history import ensure_price_history, observation_from_offer, PRICE_HISTORY_COLLECTION
+from catalog import refresh_product_summary
+from review_stats import ingest_reviews
+
+OFFERS_COLLECTION = "e_ticaret_offers"
+
+_writers = {}
+
+
+def _refresh_summaries(db, written):
+    # Katalog özeti teklifler yazıldıktan sonra, ürün başına bir kez yenilenir
+    for collection_name, product_id in {(c, tag[0]) for c, tag in written if c != PRICE_HISTORY_COLLECTION}:
+        refresh_product_summary(db, product_id, collection_name)
+
+
+def get_offer_writer(db):
+    """Bu süreç ve veritabanı için paylaşılan BulkWriter (fork sonrası yeniden oluşturulur)."""
+    key = (os.getpid(), db.name)
+    writer = _writers.get(key)
+    if writer is None:
+        writer = BulkWriter(db, after_flush=lambda written: _refresh_summaries(db, written))
+        _writers[key] = writer
+    return writer
+
+
+def offer_key(doc):
+    """
+    Teklifin kimliği: aynı pazar yerindeki farklı mağazalar (seller_nickname) ayrı teklif olarak tutulur.
+    Sadece vendor_name ile anahtarlamak aynı pazar yerinin satıcılarını tek dokümana çökertirdi.
+    """
+    return {
+        "product_id": doc["product_id"],
+        "site": doc.get("site"),
+        "vendor_name": doc["vendor_name"],
+        "seller_nickname": doc.get("seller_nickname"),
+    }
+
+
+def save_offer(db, doc, collection_name=OFFERS_COLLECTION):
+    """
+    Scraper'ların ortak yazma yolu (tampona ekler, hemen yazmaz):
+    - yorumları reviews koleksiyonuna (içerik hash'i ile, tekrarsız) yazar ve yeni olanların
+      kelime frekanslarını review_stats'a ekler (hemen, tampona girmeden),
+    - e_ticaret_offers'taki güncel teklifi günceller (aynı ürün + site + satıcı + mağaza varsa üzerine yazar);
+      yorumlar teklif dokümanında tekrar saklanmaz,
+    - price_history'ye yeni bir gözlem ekler,
+    - yazma sonrası products katalog özetini bu ürün için yeniler.
+    Yorumlar kaydedildiyse True döndürür (yorum imleci sadece bu durumda ilerletilmeli).
+    """
+    doc = dict(doc)
+    reviews = doc.pop("reviews_list", None)
+    reviews_saved = True
+    try:
+        ingest_reviews(db, doc["product_id"], doc.get("site"), reviews)
+    except Exception as e:
+        # Yorum arşivi teklifin kaydedilmesini engellememeli
+        print(f"WARNING yorumlar kaydedilemedi ({doc['product_id']}): {e}")
+        reviews_saved = False
+    ensure_price_history(db)
+    writer = get_offer_writer(db)
+    tag = (doc["product_id"], doc.get("site"), doc["vendor_name"], doc.get("seller_nickname"))
+    # Eski dokümanlardaki reviews_list dizisi her yeniden taramada temizlenir
+    writer.add(collection_name, UpdateOne(offer_key(doc), {"$set": doc, "$unset": {"reviews_list": ""}}, upsert=True), tag)
+    writer.add(PRICE_HISTORY_COLLECTION, InsertOne(observation_from_offer(doc)), tag)
+    return reviews_saved
+
+
+def expire_stale_offers(db, product_id, site, docs, collection_name=OFFERS_COLLECTION):
+    """
+    Bu taramada kaydedilen docs dışındaki, (ürün, site) için daha eski tüm teklifleri siler (tampona ekler).
+    Scraper Akakçe'deki tüm satıcıları kaydettiğinden eski teklifler ya listeden düşmüş satıcılardır ya da
+    eski (product_id, vendor_name) anahtarıyla tek dokümana çökertilmiş kayıtlardır; güncel görünümde kalmamalı.
+    Silme scrape_ts'e göre yapıldığı için sırasız yığında upsert'lerle hangi sırada çalıştığı fark etmez.
+    """
+    since = min(doc["scrape_ts"] for doc in docs)
+    stale = {"product_id": product_id, "site": site, "scrape_ts": {"$lt": since}}
+    get_offer_writer(db).add(collection_name, DeleteMany(stale), (product_id, site, None, None))
+
+
+def flush_offers():
+    """
+    Bu süreçteki bekleyen teklif yazmalarını boşaltır. Son çağrıdan beri başarısız olan tüm işlemleri
+    döndürür; zamanlayıcı veya boyut sınırıyla arka planda yapılan yazmaların hataları da dahildir.
+    """
+    errors = []
+    for (pid, _), writer in list(_writers.items()):
+        if pid == os.getpid():
+            errors.extend(writer.flush())
+    return errors
@@ -0,0 +1,206 @@
+# veri_toplama/page_parsers.py
+# Pazar yeri detay ve yorum sayfalarının çevrimdışı ayrıştırılması.
+# Sayfanın HTML'i (driver.page_source) bir kez alınır ve lxml ile site bazlı XPath tanımlarına
+# (SITE_SPECS) göre ayrıştırılır; yorum veya yıldız başına WebDriver çağrısı yapılmaz.
+# Selenium'a bağımlı değildir: kaydedilmiş HTML ile de çalışır.
+#
+#     parse_reviews(open("ty_yorumlar.html", encoding="utf-8").read(), "trendyol")
+
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from lxml import html as lxml_html
+
+# ----------------- SİTE TANIMLARI -----------------
+# rating / review_count: detay sayfasındaki genel puan ve yorum sayısı elementleri.
+# reviews.item: yorum elementleri (mutlak XPath); text ve rating.* bu elemente görelidir.
+# reviews.rating türleri:
+#   stars  -> yıldız elementleri sayılır (active_classes verilirse sadece class'ı bunlardan birini
+#             içerenler); container verilip bulunamazsa puan None olur
+#   number -> elementin metnindeki ilk sayı
+#   fixed  -> puan sayfada yok, default kullanılır
+# reviews.min_length: bundan kısa metinler (reklam, boş satır vb.) atılır.
+# newest_first: yorum listesini "en yeni önce" sıralayan kontrol (readiness.select_sort). Tanımı olmayan
+#   sitelerde sıra garanti edilemediği için yorum imleci bilinen yorumda durmaz.
+SITE_SPECS = {
+    "hepsiburada": {
+        "rating": '//*[@id="container"]/main/div/div[2]/section[1]/div[2]/div[1]/div[2]/div/div/span',
+        "review_count": '//*[@id="container"]/main/div/div[2]/section[1]/div[2]/div[1]/div[2]/div/a',
+        "newest_first": {
+            "open": "//div[@id='hermes-voltran-comments']//*[contains(@class, 'sort') or contains(@class, 'Sort')]",
+            "option": "//div[@id='hermes-voltran-comments']//*[normalize-space(text())='En yeni' or normalize-space(text())='En Yeni']",
+        },
+        # Yorum sayfaları ?sayfa=N ile sayfalanır (backfill)
+        "page_param": "sayfa",
+        "reviews": {
+            "item": "//div[@id='hermes-voltran-comments']/div/div[3]",
+            "text": ".//div[2]/div[2]/div[2]",
+            "rating": {
+                "kind": "stars",
+                "container": ".//div[2]/div[2]/div[1]/div[2]/div/span/div",
+                "star": ".//div",
+                "active_classes": ("fill", "active", "selected", "full"),
+                "default": 5,
+            },
+            "min_length": 11,
+        },
+    },
+    "trendyol": {
+        "rating": '//*[@id="envoy-mobile"]/div/div[2]/div/a/div[1]/span',
+        "review_count": '//*[@id="envoy-mobile"]/div/div[2]/div/a/div[2]',
+        "newest_first": {
+            "open": "//*[@id='review-detail']//*[contains(@class, 'sort') or contains(@class, 'select')]",
+            "option": "//*[@id='review-detail']//*[normalize-space(text())='En Yeni' or normalize-space(text())='En yeni']",
+        },
+        "reviews": {
+            "item": '//*[@id="review-detail"]/div/div[3]/div',
+            "text": ".//div[1]/div[2]/div/span",
+            "rating": {"kind": "stars", "star": ".//div[contains(@class, 'full')]", "default": 5},
+            "min_length": 11,
+        },
+    },
+    "n11": {
+        "rating": '//strong[@class="ratingScore"]',
+        "review_count": '//*[@id="readReviews"]/span',
+        "reviews": {
+            "item": '//*[@id="app"]/div/div[3]/div[2]/div',
+            "text": ".//div[2]/div[2]/span",
+            "rating": {"kind": "stars", "star": ".//span[contains(@class, 'active')]", "default": 5},
+            "min_length": 6,
+        },
+    },
+    "pazarama": {
+        "rating": '//*[@id="app"]/div[2]/div[1]/div[3]/div[2]/div[1]/div[2]/div/div/div[1]/span',
+        "review_count": '//*[@id="app"]/div[2]/div[1]/div[3]/div[2]/div[1]/div[2]/div/div/div[2]/a',
+        "reviews": {
+            # Yorumlar sekme başlığı altındaki p veya metin div'lerinde bulunur
+            "item": (
+                "(//*[contains(@id, 'product__comment__tab-header') or contains(@class, 'comment')])[1]//p"
+                " | (//*[contains(@id, 'product__comment__tab-header') or contains(@class, 'comment')])[1]"
+                "//div[contains(@class, 'text-gray-600')]"
+            ),
+            "text": ".",
+            "rating": {"kind": "fixed", "default": 5},
+            "extra": {"date": None},
+            "min_length": 11,
+        },
+    },
+    "pttavm": {
+        "rating": '//*[@id="tc-tab-comments"]/div[2]/div/div/div[1]/div[1]/div[2]',
+        "review_count": '//*[@id="tc-tab-comments"]/div[2]/div/div/div[1]/div[2]',
+        "reviews": {
+            "item": '//*[@id="tc-tab-comments"]/div[2]/div/div/div[2]/div/div/div/div[1]',
+            "text": ".//div/div/div[2]/div",
+            "rating": {"kind": "number", "xpath": ".//div/div/div[1]/div[1]/div[2]", "default": 5},
+            "min_length": 6,
+        },
+    },
+}
+
+_NUMBER_RE = re.compile(r"(\d+)")
+
+
+def parse_html(html):
+    """HTML metnini lxml ağacına çevirir; zaten ayrıştırılmış bir ağaç verilirse olduğu gibi döner."""
+    return lxml_html.fromstring(html) if isinstance(html, (str, bytes)) else html
+
+
+def element_text(element):
+    """Selenium .text'e yakın görünen metin: <br> satır sonu olur, satır içi boşluklar teke iner."""
+    for br in element.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+    lines = (" ".join(line.split()) for line in element.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _first(element, xpath):
+    found = element.xpath(xpath)
+    return found[0] if found else None
+
+
+def review_item_xpath(site):
+    return SITE_SPECS[site]["reviews"]["item"]
+
+
+def review_text_xpath(site):
+    """Yorum metinlerinin mutlak XPath'i (tarayıcıda yeni yüklenen yorumları kontrol etmek için)."""
+    spec = SITE_SPECS[site]["reviews"]
+    return spec["item"] if spec["text"] == "." else spec["item"] + spec["text"][1:]
+
+
+def review_page_url(url, site, page):
+    """Sayfalı yorum listelerinde page. sayfanın URL'si; site sayfalı değilse None."""
+    param = SITE_SPECS[site].get("page_param")
+    if not param:
+        return None
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != param]
+    return urlunsplit(parts._replace(query=urlencode(query + [(param, str(page))])))
+
+
+def parse_detail(html, site, base_url=None):
+    """
+    Detay sayfasından genel puan, yorum sayısı ve yorum bağlantısını çıkarır:
+    {"rating": float | None, "reviews": int | None, "reviews_href": str | None}.
+    Element yoksa ilgili alan None kalır; yorum sayısında rakam yoksa 0 olur.
+    """
+    spec = SITE_SPECS[site]
+    root = parse_html(html)
+    data = {"rating": None, "reviews": None, "reviews_href": None}
+
+    review_el = _first(root, spec["review_count"])
+    if review_el is not None:
+        num = re.sub(r"[^\d]", "", element_text(review_el))
+        data["reviews"] = int(num) if num else 0
+        href = review_el.get("href")
+        if href:
+            data["reviews_href"] = urljoin(base_url, href) if base_url else href
+
+    rating_el = _first(root, spec["rating"])
+    if rating_el is not None:
+        try:
+            data["rating"] = float(element_text(rating_el).replace(",", "."))
+        except ValueError:
+            pass
+    return data
+
+
+def _review_rating(item, rating_spec):
+    default = rating_spec.get("default")
+    kind = rating_spec.get("kind", "fixed")
+    if kind == "number":
+        el = _first(item, rating_spec["xpath"])
+        match = _NUMBER_RE.search(element_text(el)) if el is not None else None
+        return int(match.group(1)) if match else default
+    if kind == "stars":
+        container = item
+        if rating_spec.get("container"):
+            container = _first(item, rating_spec["container"])
+            if container is None:
+                return None
+        stars = container.xpath(rating_spec["star"])
+        classes = rating_spec.get("active_classes")
+        if classes:
+            stars = [s for s in stars if any(c in (s.get("class") or "").lower() for c in classes)]
+        return len(stars) if 0 < len(stars) <= 5 else default
+    return default
+
+
+def parse_reviews(html, site, max_reviews=20, cursor=None):
+    """
+    Yorum listesini sayfa sırasıyla (en yeni önce) çıkarır: [{"text", "rating", ...}, ...].
+    cursor (review_cursor.ReviewCursor) verilirse bilinen ilk yorumda durur.
+    """
+    spec = SITE_SPECS[site]["reviews"]
+    root = parse_html(html)
+    reviews = []
+    for item in root.xpath(spec["item"])[:max_reviews]:
+        text_el = item if spec["text"] == "." else _first(item, spec["text"])
+        text = element_text(text_el) if text_el is not None else None
+        # Buradan sonrası önceki taramalarda kaydedildi
+        if cursor and cursor.reached(text):
+            break
+        if not text or len(text) < spec["min_length"]:
+            continue
+        reviews.append({"text": text, "rating": _review_rating(item, spec["rating"]), **spec.get("extra", {})})
+    return reviews
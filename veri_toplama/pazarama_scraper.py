@@ -1,18 +1,19 @@
 import sys
 import json
 import time
-import re
-import random
 import io
-from urllib.parse import urlparse, parse_qs, unquote
 
-from pymongo import MongoClient
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-from utils import initialize_driver, scrape_akakce_base_data
+from utils import get_base_data, site_offers, iter_offer_details, offers_data
+from driver_pool import borrow_driver
+from redirects import resolve_marketplace_url
+from readiness import load_page, scroll_reviews, wait_for, wait_network_idle, select_sort
+from offer_store import save_offer, expire_stale_offers
+from page_parsers import SITE_SPECS, parse_detail, parse_reviews, review_item_xpath, review_text_xpath
+from review_cursor import DEFAULT_MAX_REVIEWS, load_review_cursor, save_review_cursor
+from db import get_db
 
 # ----------------- UTF-8 KORUMASI (Kritik Hata Çözümü) -----------------
 # Windows terminalinde 'charmap' hatasını önlemek için boru hattını UTF-8'e zorlar.
@@ -20,67 +21,50 @@ if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 # ----------------- YAPILANDIRMA -----------------
-MONGO_DB_URL = "mongodb://localhost:27017/"
-DB_NAME = "missha_price_data"
 SITE_NAME = "pazarama"
 
-# Pazarama XPATH'leri (Dinamik yapılar için güncellendi)
-RATING_XPATH = '//*[@id="app"]/div[2]/div[1]/div[3]/div[2]/div[1]/div[2]/div/div/div[1]/span'
-REVIEW_XPATH = '//*[@id="app"]/div[2]/div[1]/div[3]/div[2]/div[1]/div[2]/div/div/div[2]/a'
+# XPath'ler ve yorum seçicileri page_parsers.SITE_SPECS'te
+SPEC = SITE_SPECS[SITE_NAME]
 
-def scrape_pazarama_reviews(driver, max_reviews=20):
-    """Asenkron yüklenen yorumları scroll ve element kontrolü ile çeker."""
+def scrape_pazarama_reviews(driver, max_reviews=DEFAULT_MAX_REVIEWS, cursor=None):
+    """Asenkron yüklenen yorumları kaydırıp sayfayı bir kez ayrıştırarak çeker (cursor: bilinen yorumda durur)."""
     reviews_list = []
+    if cursor:
+        max_reviews = cursor.max_reviews
     try:
-        wait = WebDriverWait(driver, 15)
-        
-        # 1. Sayfayı yavaşça aşağı kaydır (Lazy load tetiklensin)
-        for i in range(1, 5):
-            driver.execute_script(f"window.scrollTo(0, {i * 800});")
-            time.sleep(1.5)
-        
-        # 2. Yorum container'ını daha esnek bir şekilde bul
-        # Pazarama'da yorumlar genelde tab-header altındaki div'lerde bulunur
-        try:
-            parent_xpath = "//*[contains(@id, 'product__comment__tab-header') or contains(@class, 'comment')]"
-            parent_element = wait.until(EC.presence_of_element_located((By.XPATH, parent_xpath)))
-            
-            # Yorum metinlerini içeren p veya div etiketlerini ara
-            comment_elements = parent_element.find_elements(By.XPATH, ".//p | .//div[contains(@class, 'text-gray-600')]")
-            
-            for elem in comment_elements[:max_reviews]:
-                txt = elem.text.strip()
-                if len(txt) > 10: # Çok kısa (reklam vb.) metinleri ele
-                    reviews_list.append({
-                        "text": txt,
-                        "rating": 5, # Rating genelde yıldız ikon sayısıdır, opsiyonel olarak eklenebilir
-                        "date": None
-                    })
-        except:
+        # Bilinen yorumda durmak sadece en yeni önce sıralamada güvenli; seçilemezse durulmaz
+        if cursor:
+            cursor.set_newest_first(select_sort(driver, SPEC.get("newest_first")))
+
+        # 1. Yorum elemanları artmayı bırakana (veya bilinen bir yorum yüklenene) kadar kaydır
+        scroll_reviews(
+            driver,
+            (By.XPATH, review_item_xpath(SITE_NAME)),
+            review_text_xpath(SITE_NAME),
+            max_reviews,
+            cursor,
+        )
+
+        # 2. Sayfa bir kez alınıp çevrimdışı ayrıştırılır (çok kısa reklam vb. metinler elenir)
+        reviews_list = parse_reviews(driver.page_source, SITE_NAME, max_reviews, cursor)
+        if not reviews_list and not (cursor and cursor.stopped_at_known):
             print("DEBUG: Yorumlar asenkron olarak yüklenemedi.")
-            
     except Exception as e:
         print(f"DEBUG: Yorum çekme aşamasında hata: {e}")
+    if cursor:
+        cursor.record(reviews_list)
     return reviews_list
 
-def deep_scrape_pazarama(driver, paz_url):
+def deep_scrape_pazarama(driver, paz_url, cursor=None):
     """Pazarama sayfasında 'Değerlendirmeler' sekmesine tıklar ve verileri alır."""
     data = {"rating": None, "reviews": None, "reviews_list": []}
     try:
-        driver.get(paz_url)
-        time.sleep(random.uniform(5, 7))
-        wait = WebDriverWait(driver, 20)
+        load_page(driver, paz_url)
+        wait_for(driver, (By.XPATH, SPEC["review_count"]), timeout=20)
 
-        # 1. Sayısal verileri (Rating/Review count) çek
-        try:
-            review_el = wait.until(EC.presence_of_element_located((By.XPATH, REVIEW_XPATH)))
-            num = re.sub(r"[^\d]", "", review_el.text)
-            data["reviews"] = int(num) if num else 0
-            
-            rating_el = driver.find_element(By.XPATH, RATING_XPATH)
-            data["rating"] = float(rating_el.text.replace(",", "."))
-        except:
-            pass
+        # 1. Sayısal verileri (Rating/Review count) tek page_source'tan çek
+        detail = parse_detail(driver.page_source, SITE_NAME)
+        data["rating"], data["reviews"] = detail["rating"], detail["reviews"]
 
         # 2. KRİTİK: 'Yorumlar/Değerlendirmeler' sekmesine tıkla
         try:
@@ -88,94 +72,67 @@ def deep_scrape_pazarama(driver, paz_url):
             tab_button = driver.find_element(By.XPATH, "//*[contains(text(), 'Değerlendirmeler')] | //*[contains(text(), 'Yorumlar')]")
             driver.execute_script("arguments[0].click();", tab_button)
             print("DEBUG: Yorumlar sekmesine tıklandı.")
-            time.sleep(3)
+            # Sekme içeriği XHR ile gelir; istekler bitene kadar bekle
+            wait_network_idle(driver)
         except:
             print("DEBUG: Yorum sekmesi bulunamadı, mevcut sayfadan devam ediliyor.")
 
         # 3. Yorum listesini çek
-        data["reviews_list"] = scrape_pazarama_reviews(driver)
+        data["reviews_list"] = scrape_pazarama_reviews(driver, cursor=cursor)
 
     except Exception as e:
         print(f"DEBUG: Pazarama derin tarama hatası: {e}")
     return data
 
-def resolve_pazarama_url(akakce_link):
-    """Akakçe linkini nihai Pazarama URL'sine çözer."""
-    def _extract_f(link):
-        parsed = urlparse(link)
-        queries = parse_qs(parsed.query)
-        frag = parse_qs(parsed.fragment.replace("#", ""))
-        return (frag.get("f") or queries.get("f") or [None])[0]
-
-    f_param = _extract_f(akakce_link)
-    target = f"https://www.akakce.com/{unquote(f_param)}" if f_param else akakce_link
-    
-    driver = initialize_driver()
-    try:
-        driver.get(target)
-        time.sleep(5)
-        WebDriverWait(driver, 30).until(lambda d: "pazarama.com" in d.current_url)
-        return driver, driver.current_url
-    except:
-        if driver: driver.quit()
-        return None, None
+def resolve_pazarama_url(driver, akakce_link, db=None):
+    """Akakçe linkini nihai Pazarama URL'sine çözer (önbellek -> HTTP -> tarayıcı)."""
+    return resolve_marketplace_url(akakce_link, SITE_NAME, driver=driver, db=db)
 
 def scrape_pazarama_product(product_config):
     """Ana pazar yeri kazıma mantığı."""
-    client, DRIVER = None, None
-    try:
-        client = MongoClient(MONGO_DB_URL)
-        db = client[DB_NAME]
-        collection = db[product_config.get("collection", "e_ticaret_offers")]
-        
-        DRIVER = initialize_driver()
-        product_name, base_data = scrape_akakce_base_data(DRIVER, product_config["url"])
-        DRIVER.quit()
-        DRIVER = None
-
-        for item in base_data:
-            if "pazarama" not in item["vendor_name"].lower():
-                continue
-
-            paz_driver, final_url = resolve_pazarama_url(item["link"])
-            if paz_driver:
-                details = deep_scrape_pazarama(paz_driver, final_url)
-                
-                doc = {
-                    "product_id": product_config["product_id"],
-                    "product_name": product_name,
-                    "site": SITE_NAME,
-                    "vendor_name": item["vendor_name"],
-                    "seller_nickname": item.get("seller_nickname") or item["vendor_name"],
-                    "price": item["price"],
-                    "rating": details["rating"],
-                    "review_count": details["reviews"],
-                    "reviews_list": details["reviews_list"],
-                    "scrape_ts": time.strftime("%Y-%m-%dT%H:%M:%S")
-                }
-                
-                # MongoDB'ye güvenli yazım (Mükerrer kaydı önler)
-                collection.update_one(
-                    {"product_id": doc["product_id"], "vendor_name": doc["vendor_name"]},
-                    {"$set": doc},
-                    upsert=True
-                )
-                paz_driver.quit()
-                return f"✅ PAZARAMA: {product_name} verisi ve {len(details['reviews_list'])} yorum başarıyla çekildi."
-        
-        return "⚠️ PAZARAMA: Satıcı bulunamadı."
-
-    except Exception as e:
-        return f"❌ PAZARAMA HATA: {str(e)}"
-    finally:
-        if DRIVER: DRIVER.quit()
-        if client: client.close()
+    db = get_db()
+    collection_name = product_config.get("collection", "e_ticaret_offers")
+    
+    # Akakçe verisi koordinatörden gelir (yoksa burada bir kez çekilir)
+    product_name, base_data = get_base_data(product_config)
+
+    # Yorumlar son taramada görülen en yeni yoruma kadar okunur (review_backfill: daha derine iner)
+    cursor = load_review_cursor(db, product_config["product_id"], SITE_NAME, product_config.get("review_backfill", False))
+    docs, reviews_saved = [], True
+    with borrow_driver() as driver:
+        # Akakçe'deki bu siteye ait tüm satıcılar kaydedilir; aynı sayfayı paylaşanlar için sayfa bir kez açılır
+        deep_scrape = lambda d, url: deep_scrape_pazarama(d, url, cursor)
+        offers = iter_offer_details(driver, db, site_offers(base_data, SITE_NAME), resolve_pazarama_url, deep_scrape)
+        for item, _, details in offers:
+            doc = {
+                "product_id": product_config["product_id"],
+                "product_name": product_name,
+                "site": SITE_NAME,
+                "vendor_name": item["vendor_name"],
+                "seller_nickname": item.get("seller_nickname") or item["vendor_name"],
+                "price": item["price"],
+                "rating": details["rating"],
+                "review_count": details["reviews"],
+                "reviews_list": details["reviews_list"],
+                "scrape_ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            # Güncel teklif + fiyat geçmişi + katalog özeti tek yazma yolundan
+            reviews_saved = save_offer(db, doc, collection_name) and reviews_saved
+            docs.append(doc)
+
+    if docs and reviews_saved:
+        save_review_cursor(db, cursor)
+    if docs:
+        # Bu taramada görülmeyen (eski anahtarlı veya listeden düşen) teklifler güncel görünümden çıkar
+        expire_stale_offers(db, product_config["product_id"], SITE_NAME, docs, collection_name)
+        return {"status": "ok", "message": f"✅ PAZARAMA: {product_name} için {len(docs)} satıcı ve yorumları kaydedildi.", "data": offers_data(docs)}
+    return {"status": "not_found", "message": "⚠️ PAZARAMA: Satıcı bulunamadı."}
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         try:
             config = json.loads(sys.argv[1])
             res = scrape_pazarama_product(config)
-            print(f"\n{'='*50}\n{res}\n{'='*50}", flush=True)
+            print(f"\n{'='*50}\n{res['message']}\n{'='*50}", flush=True)
         except Exception as e:
             print(f"❌ KRİTİK HATA: {str(e)}")
\ No newline at end of file
@@ -1,26 +1,96 @@
+import json
 import time
-from main import main_scraper_runner
+from datetime import datetime
 
-# Dakika cinsinden periyot (örn. 60 = saatte bir)
-INTERVAL_MINUTES = 60
+from main import run_products, add_new_products_to_mongodb, ALL_SITES
+from schedule_store import ensure_schedule, due_entries, next_due_at, record_outcomes, BASE_INTERVAL_S
+from db import get_db
 
+# Dakika cinsinden başlangıç periyodu (örn. 60 = saatte bir). Fiyatı değişen (ürün, site)
+# çiftleri daha sık, değişmeyenler daha seyrek taranır (bkz. schedule_store.py).
+INTERVAL_MINUTES = BASE_INTERVAL_S // 60
 
-def run_periodic():
+# Bir turda en fazla kaç (ürün, site) görevi çalıştırılacağı (tarama bütçesi)
+MAX_TASKS_PER_CYCLE = 200
+
+# Vadesi gelen görev yokken en fazla bekleme (yeni ürünlerin fark edilmesi için)
+MAX_IDLE_SECONDS = 10 * 60
+
+
+def load_targets():
+    try:
+        with open("targets.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"HATA: targets.json okunamadı: {e}")
+        return []
+
+
+def collect_outcomes(results):
+    """TaskResult listesini {(product_id, site): (durum, fiyat)} sözlüğüne çevirir."""
+    outcomes = {}
+    base_ok = set()
+    for r in results:
+        if r.site == "akakce":
+            if r.ok:
+                base_ok.add(r.product_id)
+            continue
+        outcomes[(r.product_id, r.site)] = (r.status, r.data.get("price"))
+    return outcomes, base_ok
+
+
+def run_cycle(db, products, budget=MAX_TASKS_PER_CYCLE):
+    """Vadesi gelen (ürün, site) çiftlerini çalıştırıp takvimi günceller. Çalışan çift sayısını döndürür."""
+    due = due_entries(db, budget, product_ids=products.keys())
+    if not due:
+        return 0
+
+    sites_by_product = {}
+    for entry in due:
+        sites_by_product.setdefault(entry["product_id"], []).append(entry["site"])
+    print(f"=== {len(due)} vadeli görev ({len(sites_by_product)} ürün) çalıştırılıyor ===")
+
+    results = run_products([products[pid] for pid in sites_by_product], sites_by_product=sites_by_product) or []
+    outcomes, base_ok = collect_outcomes(results)
+    # Akakçe'de o site için satıcı yoksa görev üretilmez: hata değil, "bulunamadı" sayılır
+    for entry in due:
+        key = (entry["product_id"], entry["site"])
+        if key not in outcomes and entry["product_id"] in base_ok:
+            outcomes[key] = ("not_found", None)
+
+    changed = record_outcomes(db, due, outcomes)
+    print(f"=== Tur tamamlandı: {len(due)} görev, {changed} fiyat değişikliği ===")
+    return len(due)
+
+
+def run_periodic(budget=MAX_TASKS_PER_CYCLE):
     """
-    main_scraper_runner'ı belirli aralıklarla çalıştırır.
+    Kalıcı öncelik kuyruğundan (scrape_schedule) çalışan uyarlanabilir döngü.
+    Her turda yeni ürünler takvime eklenir, vadesi gelen en fazla `budget` görev çalışır,
+    sonra bir sonraki vade zamanına kadar beklenir.
 
     Bu script'i:
     - Manuel olarak terminalde çalıştırabilir
-    - Veya Windows Task Scheduler ile arka planda periyodik olarak tetikleyebilirsin.
+    - Veya Windows Task Scheduler ile arka planda tetikleyebilirsin (tek tur yeterliyse run_cycle).
     """
+    db = get_db()
     while True:
-        print(f"=== Yeni periyodik çekim başlıyor ===")
-        main_scraper_runner()
-        print(f"=== Çekim tamamlandı. {INTERVAL_MINUTES} dakika bekleniyor... ===")
-        time.sleep(INTERVAL_MINUTES * 60)
+        add_new_products_to_mongodb()
+        targets = load_targets()
+        ensure_schedule(db, targets, ALL_SITES)
+        products = {p["product_id"]: p for p in targets if p.get("product_id")}
 
+        if run_cycle(db, products, budget) >= budget:
+            # Bütçe doldu, hâlâ vadeli görev olabilir
+            continue
 
-if __name__ == "__main__":
-    run_periodic()
+        next_due = next_due_at(db, product_ids=products.keys())
+        wait_s = MAX_IDLE_SECONDS
+        if next_due is not None:
+            wait_s = min(MAX_IDLE_SECONDS, max(1.0, (next_due - datetime.utcnow()).total_seconds()))
+        print(f"=== Sonraki vade için {wait_s / 60:.1f} dakika bekleniyor... ===")
+        time.sleep(wait_s)
 
 
+if __name__ == "__main__":
+    run_periodic()
@@ -0,0 +1,120 @@
+# veri_toplama/price_history.py
+# Fiyat gözlemleri için sadece-ekleme (append-only) zaman serisi deposu.
+# e_ticaret_offers en güncel teklifleri tutan "güncel görünüm" olarak kalır.
+# Analiz katmanı da import ettiği için sadece pymongo'ya bağımlıdır.
+
+from datetime import datetime, timezone
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+PRICE_HISTORY_COLLECTION = "price_history"
+# Scraper'lar scrape_ts'i yerel saatle (time.strftime) yazar; gözlemlerin ts'i UTC'dir (naive, pymongo gibi)
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# price_trend kovaları: $dateTrunc MongoDB 5.0+ olduğundan tarih $dateFromParts (3.6+) ile
+# birimden küçük parçaları atılarak yeniden kurulur.
+TREND_UNITS = ("year", "month", "day", "hour", "minute")
+_DATE_PART_OPS = {"year": "$year", "month": "$month", "day": "$dayOfMonth", "hour": "$hour", "minute": "$minute"}
+
+_ENSURED = set()
+
+
+def ensure_price_history(db):
+    """
+    price_history koleksiyonunu MongoDB zaman serisi koleksiyonu olarak oluşturur.
+    Sunucu zaman serisini desteklemiyorsa (MongoDB < 5.0) normal koleksiyon + indeks kullanılır;
+    price_trend de 5.0 öncesinde çalışan operatörlerle yazılmıştır.
+    """
+    if db.name in _ENSURED:
+        return db[PRICE_HISTORY_COLLECTION]
+    if PRICE_HISTORY_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(
+                PRICE_HISTORY_COLLECTION,
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "hours"},
+            )
+        except CollectionInvalid:
+            pass  # Başka bir işçi aynı anda oluşturdu
+        except OperationFailure as e:
+            if "already exists" not in str(e):
+                print(f"WARNING zaman serisi koleksiyonu oluşturulamadı, normal koleksiyon kullanılacak: {e}")
+    col = db[PRICE_HISTORY_COLLECTION]
+    col.create_index([("meta.product_id", 1), ("ts", 1)], name="product_ts")
+    _ENSURED.add(db.name)
+    return col
+
+
+def _utc_from_local(scrape_ts):
+    """Yerel saatli scrape_ts metnini naive UTC datetime'a çevirir; okunamazsa şimdiki UTC zamanı."""
+    try:
+        local = datetime.strptime(scrape_ts, TS_FORMAT)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def observation_from_offer(doc):
+    """Bir teklif dokümanından kompakt fiyat gözlemi üretir (ts UTC)."""
+    ts = _utc_from_local(doc.get("scrape_ts"))
+    return {
+        "ts": ts,
+        "meta": {
+            "product_id": doc["product_id"],
+            "site": doc.get("site"),
+            "vendor_name": doc.get("vendor_name"),
+            "seller_nickname": doc.get("seller_nickname"),
+        },
+        "price": doc.get("price"),
+        "rating": doc.get("rating"),
+        "review_count": doc.get("review_count"),
+    }
+
+
+def load_price_history(db, product_id, start=None, end=None, site=None):
+    """Bir ürünün [start, end] (UTC) aralığındaki gözlemlerini zamana göre sıralı döndürür."""
+    query = {"meta.product_id": product_id}
+    if site:
+        query["meta.site"] = site
+    ts_filter = {}
+    if start is not None:
+        ts_filter["$gte"] = start
+    if end is not None:
+        ts_filter["$lte"] = end
+    if ts_filter:
+        query["ts"] = ts_filter
+    return list(db[PRICE_HISTORY_COLLECTION].find(query, {"_id": 0}).sort("ts", 1))
+
+
+def _bucket_expr(unit):
+    """ts'i unit başına indiren ifade; "week" ISO haftasının (pazartesi) başlangıcıdır."""
+    if unit == "week":
+        return {"$dateFromParts": {"isoWeekYear": {"$isoWeekYear": "$ts"}, "isoWeek": {"$isoWeek": "$ts"}}}
+    if unit not in TREND_UNITS:
+        raise ValueError(f"Desteklenmeyen trend birimi: {unit} (week, {', '.join(TREND_UNITS)})")
+    parts = TREND_UNITS[:TREND_UNITS.index(unit) + 1]
+    return {"$dateFromParts": {part: {_DATE_PART_OPS[part]: "$ts"} for part in parts}}
+
+
+def price_trend(db, product_id, unit="hour", start=None, end=None):
+    """Gözlemleri UTC zaman kovalarına (saat/gün/...) toplayıp min / max / ortalama fiyat döndürür."""
+    match = {"meta.product_id": product_id, "price": {"$gt": 0}}
+    ts_filter = {}
+    if start is not None:
+        ts_filter["$gte"] = start
+    if end is not None:
+        ts_filter["$lte"] = end
+    if ts_filter:
+        match["ts"] = ts_filter
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": _bucket_expr(unit),
+                "min": {"$min": "$price"},
+                "max": {"$max": "$price"},
+                "mean": {"$avg": "$price"},
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "scrape_ts": "$_id", "min": 1, "max": 1, "mean": 1}},
+    ]
+    return list(db[PRICE_HISTORY_COLLECTION].aggregate(pipeline))
@@ -0,0 +1,90 @@
+# veri_toplama/rate_limit.py
+# Host başına nezaket (politeness) gecikmeleri.
+# Sayfa bekleme mantığından ayrıdır: sadece aynı hosta art arda giden istekler arasında
+# en az "min aralık + rastgele sapma" kadar zaman geçmesini sağlar, gerekmedikçe beklemez.
+
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# ----------------- YAPILANDIRMA -----------------
+# Host -> (en az aralık, en fazla aralık) saniye. POLITENESS_DELAYS ortam değişkeni ile
+# JSON olarak ezilebilir: POLITENESS_DELAYS='{"akakce.com": [1, 2], "trendyol.com": [0.5, 1]}'
+DEFAULT_DELAYS = {
+    "akakce.com": (2.0, 4.0),
+    "hepsiburada.com": (1.0, 2.0),
+    "trendyol.com": (1.0, 2.0),
+    "n11.com": (1.0, 2.0),
+    "pazarama.com": (1.0, 2.0),
+    "pttavm.com": (1.0, 2.0),
+}
+FALLBACK_DELAY = (0.5, 1.0)
+
+
+def _load_delays():
+    delays = dict(DEFAULT_DELAYS)
+    raw = os.getenv("POLITENESS_DELAYS")
+    if raw:
+        try:
+            for host, (low, high) in json.loads(raw).items():
+                delays[host] = (float(low), float(high))
+        except (ValueError, TypeError) as e:
+            print(f"WARNING POLITENESS_DELAYS okunamadı, varsayılanlar kullanılıyor: {e}")
+    return delays
+
+
+def host_key(url):
+    """URL'yi yapılandırmadaki host anahtarına indirger (www.akakce.com -> akakce.com)."""
+    host = urlsplit(url).netloc.lower().split(":")[0] if "//" in url else url.lower()
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        candidate = ".".join(parts[i:])
+        if candidate in _delays:
+            return candidate
+    return host
+
+
+class HostRateLimiter:
+    """Süreç içi, host başına son istek zamanını tutan sınırlayıcı."""
+
+    def __init__(self, delays=None):
+        self.delays = delays if delays is not None else _delays
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "waited_s": 0.0}
+
+    def wait(self, url):
+        """Hostun sırası gelene kadar bekler; beklenen süreyi döndürür."""
+        host = host_key(url)
+        low, high = self.delays.get(host, FALLBACK_DELAY)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(host, 0.0))
+            self._next_allowed[host] = start + random.uniform(low, high)
+            self.stats["requests"] += 1
+            self.stats["waited_s"] += start - now
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+_delays = _load_delays()
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = HostRateLimiter()
+    return _limiter
+
+
+def throttle(url):
+    """Verilen URL'nin hostu için nezaket gecikmesini uygular."""
+    if not url or url.startswith(("about:", "data:")):
+        return 0.0
+    return get_limiter().wait(url)
@@ -0,0 +1,218 @@
+# veri_toplama/readiness.py
+# Sabit time.sleep yerine olay tabanlı sayfa hazır olma beklemeleri.
+# - DOM koşulları (WebDriverWait + expected_conditions)
+# - Ağ boşta (CDP performance logları; yoksa Resource Timing API ile JS yedeği)
+# - Sayfa/yorum listesi büyümeyi bırakana (veya bilinen bir yoruma gelinene) kadar kaydırma
+# Nezaket gecikmeleri burada değil, rate_limit modülündedir.
+
+import json
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from rate_limit import throttle
+
+# ----------------- YAPILANDIRMA -----------------
+DOM_TIMEOUT_S = 15
+NETWORK_IDLE_MS = 500
+NETWORK_IDLE_TIMEOUT_S = 8
+POLL_S = 0.1
+SCROLL_MAX_STEPS = 8
+SCROLL_SETTLE_S = 1.5  # Bir kaydırmadan sonra yeni içerik için en fazla bekleme
+
+_NETWORK_START = "Network.requestWillBeSent"
+_NETWORK_END = ("Network.loadingFinished", "Network.loadingFailed")
+
+
+def wait_for(driver, locator, timeout=DOM_TIMEOUT_S, condition=EC.presence_of_element_located):
+    """Koşul sağlanırsa elementi, zaman aşımında None döndürür (istisna fırlatmaz)."""
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_S).until(condition(locator))
+    except TimeoutException:
+        return None
+
+
+def wait_document_ready(driver, timeout=DOM_TIMEOUT_S):
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_S).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def _drain_performance_log(driver):
+    """CDP performance loglarını okur; log desteklenmiyorsa None döndürür."""
+    try:
+        return driver.get_log("performance")
+    except (WebDriverException, ValueError, AttributeError):
+        return None
+
+
+def _network_idle_cdp(driver, idle_ms, timeout):
+    inflight = set()
+    deadline = time.monotonic() + timeout
+    last_activity = time.monotonic()
+    while time.monotonic() < deadline:
+        entries = _drain_performance_log(driver)
+        if entries is None:
+            return None
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            request_id = message.get("params", {}).get("requestId")
+            if method == _NETWORK_START:
+                inflight.add(request_id)
+                last_activity = time.monotonic()
+            elif method in _NETWORK_END:
+                inflight.discard(request_id)
+                last_activity = time.monotonic()
+        if not inflight and (time.monotonic() - last_activity) * 1000 >= idle_ms:
+            return True
+        time.sleep(POLL_S)
+    return False
+
+
+def _network_idle_js(driver, idle_ms, timeout):
+    """Yedek: yüklenen kaynak sayısı idle_ms boyunca artmazsa ağ boşta kabul edilir."""
+    deadline = time.monotonic() + timeout
+    last_count, stable_since = -1, time.monotonic()
+    while time.monotonic() < deadline:
+        try:
+            count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        except WebDriverException:
+            return False
+        if count != last_count:
+            last_count, stable_since = count, time.monotonic()
+        elif (time.monotonic() - stable_since) * 1000 >= idle_ms:
+            return True
+        time.sleep(POLL_S)
+    return False
+
+
+def wait_network_idle(driver, idle_ms=NETWORK_IDLE_MS, timeout=NETWORK_IDLE_TIMEOUT_S):
+    """Açık ağ isteği kalmayıp idle_ms boyunca yeni istek başlamayana kadar bekler."""
+    result = _network_idle_cdp(driver, idle_ms, timeout)
+    if result is None:
+        result = _network_idle_js(driver, idle_ms, timeout)
+    return result
+
+
+def load_page(driver, url, ready=None, timeout=DOM_TIMEOUT_S, network_idle=False):
+    """
+    Sayfayı yükler ve hazır olmasını bekler:
+    host nezaket gecikmesi -> driver.get -> readyState -> (varsa) ready locator -> (istenirse) ağ boşta.
+    ready verildiyse bulunan elementi, verilmediyse readyState sonucunu döndürür.
+    """
+    throttle(url)
+    # Önceki sayfanın logları yeni sayfanın ağ ölçümüne karışmasın
+    _drain_performance_log(driver)
+    driver.get(url)
+    result = wait_document_ready(driver, timeout)
+    if ready is not None:
+        result = wait_for(driver, ready, timeout)
+    if network_idle:
+        wait_network_idle(driver)
+    return result
+
+
+def scroll_until_stable(driver, count_locator=None, target_count=None,
+                        max_steps=SCROLL_MAX_STEPS, settle_s=SCROLL_SETTLE_S, stop=None):
+    """
+    Lazy load içeriği için kaydırır: sayılan son element varsa onu görünür alana getirir, ardından
+    bir ekran aşağı iner. Her adımdan sonra kaydırma konumu, sayfa yüksekliği veya count_locator
+    element sayısı değişene kadar en fazla settle_s bekler; değişiklik yoksa (sayfa sonu ve yeni
+    içerik yok) ya da target_count'a ulaşıldıysa durur. stop(driver) verilirse her adımdan önce
+    çağrılır; True dönerse kaydırma biter. Son element sayısını döndürür.
+    """
+    def _state(d):
+        position = d.execute_script("return [window.scrollY, document.body.scrollHeight]")
+        count = len(d.find_elements(*count_locator)) if count_locator else 0
+        return position[0], position[1], count
+
+    state = _state(driver)
+    for _ in range(max_steps):
+        if target_count and count_locator and state[2] >= target_count:
+            break
+        if stop and stop(driver):
+            break
+        items = driver.find_elements(*count_locator) if count_locator else []
+        if items:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'end'});", items[-1])
+        driver.execute_script("window.scrollBy(0, window.innerHeight);")
+        previous = state
+        try:
+            WebDriverWait(driver, settle_s, poll_frequency=POLL_S).until(lambda d: _state(d) != previous)
+        except TimeoutException:
+            break
+        state = _state(driver)
+    return state[2]
+
+
+def element_texts(driver, xpath, start=0):
+    """XPath'e uyan elementlerin görünen metinleri (start'tan itibaren), tek bir JS çağrısıyla."""
+    return driver.execute_script(
+        """
+        const snap = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const texts = [];
+        for (let i = arguments[1]; i < snap.snapshotLength; i++) texts.push(snap.snapshotItem(i).innerText || "");
+        return texts;
+        """,
+        xpath, start,
+    ) or []
+
+
+def scroll_reviews(driver, count_locator, text_xpath, max_reviews, cursor=None):
+    """
+    Yorum listesini max_reviews'a kadar kaydırır. cursor (review_cursor.ReviewCursor) verilirse ve liste
+    en yeni önce sıralandıysa (cursor.set_newest_first) yüklenen yorumlardan biri daha önce görülmüşse
+    kaydırma hemen durur (ilk ekranda bile);
+    sadece yeni yüklenen metinler kontrol edilir. Backfill imlecinde adım sınırı büyür.
+    """
+    if cursor is None:
+        return scroll_until_stable(driver, count_locator=count_locator, target_count=max_reviews)
+    checked = 0
+
+    def _reached_known(d):
+        nonlocal checked
+        texts = element_texts(d, text_xpath, start=checked)
+        checked += len(texts)
+        return cursor.any_known(texts)
+
+    return scroll_until_stable(
+        driver,
+        count_locator=count_locator,
+        target_count=max_reviews,
+        max_steps=cursor.scroll_steps or SCROLL_MAX_STEPS,
+        stop=_reached_known,
+    )
+
+
+def select_sort(driver, sort_spec, timeout=5):
+    """
+    Listede sıralama seçeneğine tıklar (ör. "En Yeni"); sort_spec: {"option": xpath, "open": xpath | None}.
+    Önce varsa açılır menü düğmesine tıklanır. Seçenek tıklandıysa True, tanım yoksa veya bulunamazsa False.
+    """
+    if not sort_spec:
+        return False
+    try:
+        if sort_spec.get("open"):
+            opener = wait_for(driver, (By.XPATH, sort_spec["open"]), timeout=timeout)
+            if opener is not None:
+                driver.execute_script("arguments[0].click();", opener)
+        option = wait_for(driver, (By.XPATH, sort_spec["option"]), timeout=timeout)
+        if option is None:
+            return False
+        driver.execute_script("arguments[0].click();", option)
+        # Sıralanmış liste XHR ile yeniden gelir
+        wait_network_idle(driver)
+        return True
+    except WebDriverException:
+        return False
@@ -0,0 +1,186 @@
+# veri_toplama/redirects.py
+# Akakçe yönlendirme linklerini (…?f=...) pazar yeri URL'sine tarayıcı açmadan çözer.
+# HTTP 3xx, <meta http-equiv="refresh"> ve JS location atlamaları hafif bir istemci ile izlenir;
+# sonuç süreç içi sözlükte ve redirect_cache koleksiyonunda (TTL) saklanır.
+# HTTP ile çözülemeyen linkler için tarayıcı (driver) yedek olarak kullanılır.
+
+import html
+import os
+import random
+import re
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlparse, parse_qs, unquote
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from rate_limit import throttle
+
+# ----------------- YAPILANDIRMA -----------------
+REDIRECT_CACHE_COLLECTION = "redirect_cache"
+REDIRECT_CACHE_TTL_S = int(os.getenv("REDIRECT_CACHE_TTL", str(7 * 24 * 3600)))
+REDIRECT_MAX_HOPS = 8
+REDIRECT_TIMEOUT_S = 15
+BROWSER_TIMEOUT_S = 40
+MAX_BODY_BYTES = 256 * 1024
+
+# Site adı -> nihai URL'de aranan alan adı
+SITE_DOMAINS = {
+    "hepsiburada": "hepsiburada.com",
+    "trendyol": "trendyol.com",
+    "n11": "n11.com",
+    "pazarama": "pazarama.com",
+    "pttavm": "pttavm.com",
+}
+
+META_REFRESH_RE = re.compile(
+    r'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]*content=["\']?\s*\d*\s*;?\s*url\s*=\s*([^"\'>\s]+)',
+    re.IGNORECASE,
+)
+JS_LOCATION_RE = re.compile(
+    r'(?:window\.|document\.|top\.)?location(?:\.href)?\s*(?:=|\.replace\(|\.assign\()\s*["\']([^"\']+)["\']',
+    re.IGNORECASE,
+)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "tr-TR,tr;q=0.9",
+}
+
+_memory_cache = {}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """3xx yanıtlarını otomatik izlemez; her atlama elle kontrol edilir."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def akakce_redirect_target(akakce_link):
+    """Linkteki f parametresini (sorgu veya fragment) çözüp Akakçe yönlendirme adresini döndürür."""
+    parsed = urlparse(akakce_link)
+    queries = parse_qs(parsed.query)
+    frag_queries = parse_qs(parsed.fragment.replace("#", ""))
+    f_param = (frag_queries.get("f") or queries.get("f") or [None])[0]
+    if f_param:
+        decoded = unquote(f_param)
+        if decoded.startswith("http"):
+            return decoded
+        return f"https://www.akakce.com{decoded}" if decoded.startswith("/") else f"https://www.akakce.com/{decoded}"
+    return akakce_link
+
+
+def _on_domain(url, domain):
+    host = urlparse(url).netloc.lower()
+    return host == domain or host.endswith("." + domain)
+
+
+def _next_hop(url):
+    """Tek bir istek atar; sonraki adresi (Location, meta refresh, JS location) veya None döndürür."""
+    throttle(url)
+    request = urllib.request.Request(url, headers=HEADERS)
+    try:
+        response = _opener.open(request, timeout=REDIRECT_TIMEOUT_S)
+    except urllib.error.HTTPError as e:
+        if 300 <= e.code < 400 and e.headers.get("Location"):
+            return urljoin(url, e.headers["Location"])
+        return None
+    with response:
+        body = response.read(MAX_BODY_BYTES).decode(response.headers.get_content_charset() or "utf-8", errors="replace")
+    for pattern in (META_REFRESH_RE, JS_LOCATION_RE):
+        match = pattern.search(body)
+        if match:
+            return urljoin(url, html.unescape(match.group(1)))
+    return None
+
+
+def resolve_http(url, domain, max_hops=REDIRECT_MAX_HOPS):
+    """Atlamaları hedef alan adına ulaşana kadar izler; ulaşılamazsa None döndürür."""
+    seen = set()
+    for _ in range(max_hops):
+        if _on_domain(url, domain):
+            return url
+        if url in seen:
+            return None
+        seen.add(url)
+        try:
+            url = _next_hop(url)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"DEBUG: Yönlendirme HTTP ile çözülemedi ({type(e).__name__}: {e})")
+            return None
+        if not url:
+            return None
+    return url if url and _on_domain(url, domain) else None
+
+
+def resolve_browser(driver, url, domain, timeout=BROWSER_TIMEOUT_S):
+    """Yedek yol: tarayıcıyı hedef alan adına ulaşana kadar bekletir."""
+    try:
+        throttle(url)
+        driver.get(url)
+        if len(driver.window_handles) > 1:
+            driver.switch_to.window(driver.window_handles[-1])
+        WebDriverWait(driver, timeout).until(lambda d: _on_domain(d.current_url, domain))
+        return driver.current_url
+    except Exception as e:
+        print(f"DEBUG: Yönlendirme tarayıcı ile çözülemedi: {e}")
+        return None
+
+
+# ----------------- ÖNBELLEK -----------------
+
+def _cache_get(db, key):
+    item = _memory_cache.get(key)
+    if item and item[0] > time.time():
+        return item[1]
+    if db is None:
+        return None
+    doc = db[REDIRECT_CACHE_COLLECTION].find_one(
+        {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"url": 1, "expires_at": 1}
+    )
+    if doc:
+        remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        _memory_cache[key] = (time.time() + remaining, doc["url"])
+        return doc["url"]
+    return None
+
+
+def _cache_set(db, key, url, site):
+    # Aynı anda sona ermemeleri için TTL'ye küçük bir sapma eklenir
+    ttl = REDIRECT_CACHE_TTL_S * random.uniform(0.9, 1.1)
+    _memory_cache[key] = (time.time() + ttl, url)
+    if db is None:
+        return
+    now = datetime.utcnow()
+    db[REDIRECT_CACHE_COLLECTION].update_one(
+        {"_id": key},
+        {"$set": {"url": url, "site": site, "resolved_at": now, "expires_at": now + timedelta(seconds=ttl)}},
+        upsert=True,
+    )
+
+
+def resolve_marketplace_url(akakce_link, site, driver=None, db=None):
+    """
+    Akakçe linkini pazar yeri URL'sine çözer:
+    önbellek -> HTTP atlamaları -> (driver verildiyse) tarayıcı.
+    """
+    domain = SITE_DOMAINS.get(site, site)
+    target = akakce_redirect_target(akakce_link)
+
+    cached = _cache_get(db, target)
+    if cached:
+        return cached
+
+    final_url = resolve_http(target, domain)
+    if final_url is None and driver is not None:
+        final_url = resolve_browser(driver, target, domain)
+    if final_url:
+        _cache_set(db, target, final_url, site)
+    return final_url
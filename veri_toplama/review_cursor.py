@@ -0,0 +1,116 @@
+# veri_toplama/review_cursor.py
+# Artımlı yorum toplama: (ürün, site) başına en yeni yorumların parmak izleri (review_cursors koleksiyonu).
+# Scraper yorum listesini "en yeni" sıralamasına çevirebildiyse, daha önce gördüğü bir yoruma
+# ulaşınca kaydırmayı ve ayrıştırmayı bırakır; yeni yorum yoksa iş ilk ekrandaki yorumları okumaktan ibarettir.
+# Sıralama seçilemezse (varsayılan "önerilen" sıra) bilinen yorumda durulmaz ve parmak izi ilerletilmez:
+# aksi halde bilinen bir yorumun altında kalan daha yeni yorumlar kalıcı olarak atlanırdı.
+# Backfill modunda parmak izleri yok sayılır ve 20'lik sınırın çok ötesine kadar kaydırılır/sayfalanır.
+
+import os
+from datetime import datetime
+
+try:
+    from veri_toplama.review_store import review_hash
+except ImportError:
+    from review_store import review_hash
+
+# ----------------- YAPILANDIRMA -----------------
+REVIEW_CURSORS_COLLECTION = "review_cursors"
+DEFAULT_MAX_REVIEWS = 20
+BACKFILL_MAX_REVIEWS = int(os.getenv("REVIEW_BACKFILL_MAX", "1000"))
+BACKFILL_SCROLL_STEPS = int(os.getenv("REVIEW_BACKFILL_SCROLL_STEPS", "200"))
+# Sayfalı yorum listelerinde (ör. Hepsiburada ?sayfa=N) backfill'in gezeceği en fazla sayfa
+BACKFILL_MAX_PAGES = int(os.getenv("REVIEW_BACKFILL_MAX_PAGES", "100"))
+# En yeni yorum silinir/gizlenirse bir sonraki bilinen yorumda yine durulabilsin diye birkaç hash tutulur
+FINGERPRINT_SIZE = 10
+
+
+def cursor_id(product_id, site):
+    return f"{product_id}|{site}"
+
+
+class ReviewCursor:
+    """
+    Bir (ürün, site) için tarama boyunca kullanılan yorum imleci.
+
+        cursor = load_review_cursor(db, "p1", "trendyol")
+        cursor.set_newest_first(select_sort(driver, spec))   # sıralama seçilemezse durulmaz
+        if cursor.reached(text): break    # bilinen yoruma gelindi, daha eskiler zaten kayıtlı
+        cursor.record(reviews_list)       # bu sayfanın en yeni yorumları yeni parmak izi olur
+        save_review_cursor(db, cursor)    # yorumlar kaydedildikten sonra
+    """
+
+    def __init__(self, product_id, site, fingerprints=(), backfill=False):
+        self.product_id = product_id
+        self.site = site
+        self.fingerprints = list(fingerprints)
+        self._known = set(self.fingerprints)
+        self.backfill = backfill
+        self.max_reviews = BACKFILL_MAX_REVIEWS if backfill else DEFAULT_MAX_REVIEWS
+        # None: readiness'in varsayılan adım sınırı
+        self.scroll_steps = BACKFILL_SCROLL_STEPS if backfill else None
+        self.max_pages = BACKFILL_MAX_PAGES if backfill else 1
+        # Scraper sayfayı en yeni önce sıraladığını set_newest_first ile bildirene kadar durulmaz
+        self.newest_first = False
+        self.stopped_at_known = False
+
+    def _hash(self, text):
+        return review_hash(self.product_id, self.site, text.strip())
+
+    def set_newest_first(self, ok):
+        """Yorum listesi en yeni önce sıralandıysa (ok) bilinen yorumda durmaya izin verir."""
+        self.newest_first = bool(ok)
+        if not ok and not self.backfill and self._known:
+            print(f"DEBUG: {self.site} yorumları en yeni önce sıralanamadı; bilinen yorumda durulmayacak.")
+
+    def is_known(self, text):
+        if not self.newest_first or self.backfill or not text:
+            return False
+        return self._hash(text) in self._known
+
+    def any_known(self, texts):
+        """Yüklenen yorum metinlerinden biri daha önce görüldüyse True (kaydırmayı durdurmak için)."""
+        if not self.newest_first or self.backfill or not self._known:
+            return False
+        return any(self.is_known(text) for text in texts)
+
+    def reached(self, text):
+        """Sayfa sırasıyla okunan yorum bilinen ilk yorumsa True döndürür ve bunu kaydeder."""
+        if self.is_known(text):
+            self.stopped_at_known = True
+            return True
+        return False
+
+    def record(self, reviews):
+        """
+        Bu taramada okunan (en yeni önce) yorumları parmak izinin başına ekler.
+        Sıra en yeni önce değilse ilk yorumlar en yeniler olmayabilir; parmak izi değişmez.
+        """
+        if not self.newest_first:
+            return
+        fresh = [self._hash(r["text"]) for r in reviews if r.get("text")]
+        merged = list(dict.fromkeys(fresh[:FINGERPRINT_SIZE] + self.fingerprints))
+        self.fingerprints = merged[:FINGERPRINT_SIZE]
+        if self.stopped_at_known:
+            print(f"DEBUG: {self.site} yorumları: {len(reviews)} yeni yorum, bilinen yoruma ulaşılınca duruldu.")
+
+
+def load_review_cursor(db, product_id, site, backfill=False):
+    doc = db[REVIEW_CURSORS_COLLECTION].find_one({"_id": cursor_id(product_id, site)}, {"fingerprints": 1}) or {}
+    return ReviewCursor(product_id, site, doc.get("fingerprints", ()), backfill)
+
+
+def save_review_cursor(db, cursor):
+    """İmleci yazar; sadece yorumlar reviews koleksiyonuna kaydedildikten sonra çağrılmalı."""
+    now = datetime.utcnow()
+    fields = {
+        "product_id": cursor.product_id,
+        "site": cursor.site,
+        "fingerprints": cursor.fingerprints,
+        "updated_at": now,
+    }
+    if cursor.backfill:
+        fields["backfilled_at"] = now
+    db[REVIEW_CURSORS_COLLECTION].update_one(
+        {"_id": cursor_id(cursor.product_id, cursor.site)}, {"$set": fields}, upsert=True
+    )
@@ -0,0 +1,136 @@
+# veri_toplama/review_stats.py
+# Yorum kelime istatistiklerinin veri alımı (ingest) sırasında önceden hesaplanması.
+# Her yeni yorum bir kez kelimelerine ayrılır ve ürünün review_stats dokümanına puan bazında
+# $inc ile eklenir; analiz katmanı sayfa/sohbet isteklerinde sadece bu sayaçlardan top-k okur.
+# Aynı yorum tekrar sayılmasın diye sadece reviews koleksiyonuna ilk kez eklenen yorumlar sayılır
+# (içerik hash'i, bkz. review_store.py).
+
+from datetime import datetime
+
+try:
+    from veri_toplama.review_tokens import (
+        BandCounter, band_of_rating, count_terms, keyword_summary, parse_rating, review_text,
+    )
+    from veri_toplama.review_store import REVIEWS_COLLECTION, store_reviews
+except ImportError:
+    from review_tokens import BandCounter, band_of_rating, count_terms, keyword_summary, parse_rating, review_text
+    from review_store import REVIEWS_COLLECTION, store_reviews
+
+# ----------------- YAPILANDIRMA -----------------
+REVIEW_STATS_COLLECTION = "review_stats"
+# reviews koleksiyonundan önceki hash deposu; yeniden oluşturmada silinir
+LEGACY_HASHES_COLLECTION = "review_hashes"
+OFFERS_COLLECTION = "e_ticaret_offers"
+
+# Puanı olmayan yorumların bandı; puanlılar "r5", "r4_5" gibi anahtarlarla tutulur
+NO_RATING = "none"
+
+
+def rating_key(rating):
+    return NO_RATING if rating is None else "r" + f"{rating:g}".replace(".", "_")
+
+
+def rating_from_key(key):
+    return None if key == NO_RATING else float(key[1:].replace("_", "."))
+
+
+def band_counts(reviews):
+    """Yorumları kesin puan anahtarına göre gruplayıp {anahtar: (yorum sayısı, kelime frekansları)} döndürür."""
+    texts_by_key = {}
+    for review in reviews:
+        text = review_text(review)
+        if text is None:
+            continue
+        raw = review.get("rating")
+        rating = parse_rating(raw)
+        if raw is not None and rating is None:
+            continue
+        texts_by_key.setdefault(rating_key(rating), []).append(text)
+    return {key: (len(texts), count_terms(texts)) for key, texts in texts_by_key.items()}
+
+
+def ingest_reviews(db, product_id, site, reviews):
+    """
+    Yorumları reviews koleksiyonuna yazar ve sadece ilk kez görülenlerin kelime frekanslarını
+    ürünün istatistiklerine $inc ile ekler; sayılan yeni yorum sayısını döndürür.
+    Önce yorum kaydedilir, sonra sayaç artırılır: yarıda kesilirse yorum fazla değil eksik sayılır
+    (python main.py review-stats istatistikleri baştan kurar).
+    """
+    counts = band_counts(store_reviews(db, product_id, site, reviews))
+    if not counts:
+        return 0
+    inc = {}
+    for key, (n, terms) in counts.items():
+        inc[f"bands.{key}.reviews"] = n
+        for term, count in terms.items():
+            inc[f"bands.{key}.terms.{term}"] = count
+    db[REVIEW_STATS_COLLECTION].update_one(
+        {"_id": product_id},
+        {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    return sum(n for n, _ in counts.values())
+
+
+def load_review_stats(db, product_id):
+    return db[REVIEW_STATS_COLLECTION].find_one({"_id": product_id})
+
+
+def summary_from_stats(doc, min_rating=4, top_k=20):
+    """Saklanan puan bantlarını min_rating'e göre yüksek/düşük olarak birleştirip top-k özeti üretir."""
+    counter = BandCounter()
+    for key, band_doc in (doc or {}).get("bands", {}).items():
+        rating = rating_from_key(key)
+        band = band_of_rating(rating, min_rating)
+        if band is None:
+            continue
+        counter.add_counts(band, band_doc.get("terms", {}), band_doc.get("reviews", 0), rating)
+    return keyword_summary(counter, top_k)
+
+
+def migrate_offer_reviews(db, collection_name=OFFERS_COLLECTION):
+    """Eski e_ticaret_offers.reviews_list dizilerini reviews koleksiyonuna taşır; yeni eklenen yorum sayısını döndürür."""
+    added = 0
+    cursor = db[collection_name].find(
+        {"reviews_list.0": {"$exists": True}}, {"_id": 0, "product_id": 1, "site": 1, "reviews_list": 1}
+    )
+    for doc in cursor.batch_size(200):
+        added += len(store_reviews(db, doc["product_id"], doc.get("site"), doc["reviews_list"]))
+    return added
+
+
+def rebuild_review_stats(db, product_id=None):
+    """
+    review_stats'ı reviews koleksiyonundan baştan hesaplar (ürün verilirse sadece onu).
+    Yorumlar ürün sırasıyla akış halinde okunur; ürün başına tek bir doküman yazılır.
+    """
+    query = {"product_id": product_id} if product_id else {}
+    cursor = db[REVIEWS_COLLECTION].find(query, {"_id": 0, "product_id": 1, "text": 1, "rating": 1})
+    cursor = cursor.sort("product_id", 1).batch_size(1000)
+
+    def write(pid, reviews):
+        bands = {key: {"reviews": n, "terms": dict(terms)} for key, (n, terms) in band_counts(reviews).items()}
+        db[REVIEW_STATS_COLLECTION].replace_one(
+            {"_id": pid}, {"bands": bands, "updated_at": datetime.utcnow()}, upsert=True
+        )
+
+    products, current, reviews = 0, None, []
+    for doc in cursor:
+        if doc["product_id"] != current:
+            if current is not None:
+                write(current, reviews)
+                products += 1
+            current, reviews = doc["product_id"], []
+        reviews.append(doc)
+    if current is not None:
+        write(current, reviews)
+        products += 1
+    return products
+
+
+def backfill_review_stats(db, collection_name=OFFERS_COLLECTION):
+    """Eski yorumları reviews'a taşır ve istatistikleri baştan kurar (tekrar çalıştırılabilir)."""
+    migrated = migrate_offer_reviews(db, collection_name)
+    products = rebuild_review_stats(db)
+    db.drop_collection(LEGACY_HASHES_COLLECTION)
+    return migrated, products
@@ -0,0 +1,82 @@
+# veri_toplama/review_store.py
+# Yorumlar için içerik adresli depo (reviews koleksiyonu).
+# Her yorum (site, ürün, metin) içerik hash'i ile _id olarak bir kez saklanır; aynı ürünün farklı
+# satıcı dokümanlarında veya sonraki taramalarda tekrar görülen yorum yeniden yazılmaz,
+# sadece last_seen güncellenir. Böylece taramalar arası büyüyen, tekrarsız bir yorum arşivi oluşur.
+
+import hashlib
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+try:
+    from veri_toplama.review_tokens import parse_rating
+except ImportError:
+    from review_tokens import parse_rating
+
+# ----------------- YAPILANDIRMA -----------------
+REVIEWS_COLLECTION = "reviews"
+
+
+def review_hash(product_id, site, text):
+    """Yorumun içerik kimliği: aynı site + ürün + (boşlukları normalize edilmiş) metin aynı hash'i verir."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(f"{site}\x1f{product_id}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+
+def review_docs(product_id, site, reviews):
+    """Scraper yorum sözlüklerinden {hash: doküman} üretir (aynı tarama içindeki tekrarlar da elenir)."""
+    docs = {}
+    for review in reviews or []:
+        if not isinstance(review, dict) or not isinstance(review.get("text"), str) or not review["text"].strip():
+            continue
+        text = review["text"].strip()
+        h = review_hash(product_id, site, text)
+        if h in docs:
+            continue
+        docs[h] = {
+            **review,
+            "_id": h,
+            "product_id": product_id,
+            "site": site,
+            "text": text,
+            # Ham puan (rating) olduğu gibi tutulur; sıralama/filtre için sayısal değeri ayrıca saklanır
+            "rating_value": parse_rating(review.get("rating")),
+        }
+    return docs
+
+
+def store_reviews(db, product_id, site, reviews):
+    """
+    Yorumları tek sırasız bulk upsert ile yazar (tekrar çalıştırmaya karşı idempotent).
+    Bu çağrıda ilk kez eklenen yorum dokümanlarının listesini döndürür.
+    """
+    docs = review_docs(product_id, site, reviews)
+    if not docs:
+        return []
+    now = datetime.utcnow()
+    ordered = list(docs.values())
+    ops = []
+    for doc in ordered:
+        fields = {k: v for k, v in doc.items() if k != "_id"}
+        ops.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$setOnInsert": {**fields, "first_seen": now}, "$set": {"last_seen": now}},
+            upsert=True,
+        ))
+    result = db[REVIEWS_COLLECTION].bulk_write(ops, ordered=False)
+    return [ordered[index] for index in result.upserted_ids]
+
+
+def known_review_hashes(db, hashes):
+    """Verilen hash'lerden reviews koleksiyonunda zaten bulunanların kümesi."""
+    if not hashes:
+        return set()
+    return {doc["_id"] for doc in db[REVIEWS_COLLECTION].find({"_id": {"$in": list(hashes)}}, {"_id": 1})}
+
+
+def iter_product_reviews(db, product_id, fields=("text", "rating"), batch_size=1000):
+    """Ürünün yorumlarını (varsayılan: metin + ham puan) cursor'dan akış halinde verir."""
+    projection = {"_id": 0, **{f: 1 for f in fields}}
+    cursor = db[REVIEWS_COLLECTION].find({"product_id": product_id}, projection)
+    return cursor.batch_size(batch_size)
@@ -0,0 +1,185 @@
+# veri_toplama/review_tokens.py
+# Yorum metinleri için Türkçe'ye duyarlı kelime ayırma ve kelime sayımı.
+# Regex'ler ve stop-word kümesi modül yüklenirken bir kez kurulur; yorumlar akış (stream)
+# halinde okunur ve her batch tek bir küçük harfe çevirme + regex geçişi ile sayılır.
+# Analiz katmanı (veri_toplama.review_tokens) ve scraper'lar (review_tokens) ortak kullanır;
+# sadece standart kütüphaneye bağımlıdır.
+
+import re
+from collections import Counter
+from itertools import islice
+
+# ----------------- YAPILANDIRMA -----------------
+MIN_TEXT_LENGTH = 10
+MIN_TOKEN_LENGTH = 3
+BATCH_SIZE = 1000
+
+# Türkçe stop words (gereksiz kelimeler)
+STOP_WORDS = frozenset({
+    "bir", "bu", "şu", "o", "ve", "ile", "için", "de", "da", "ki", "mi", "mu", "mü",
+    "çok", "az", "en", "gibi", "kadar", "daha", "var", "yok", "ama", "ancak",
+    "fakat", "lakin", "şey", "her", "hiç", "kim", "ne", "nasıl", "niçin", "neden",
+    "ben", "sen", "biz", "siz", "onlar", "bana", "sana", "bize", "size", "onlara",
+    "göre", "dolayı", "rağmen", "karşı", "doğru",
+    "sonra", "önce", "beri", "dışında", "içinde", "üzerinde", "altında",
+    "ürün", "ürünü", "ürünün", "fiyat", "fiyatı", "fiyatın", "satıcı", "satıcıyı",
+    "almış", "aldım", "alındı", "geldi", "geldim", "geldiği", "oldu", "olduğu",
+    "iyi", "kötü", "güzel", "çirkin", "beğendim", "beğenmedim", "tavsiye",
+})
+
+# str.lower() "I"yı "i"ye, "İ"yi "i̇" (i + birleşik nokta) yapar; Türkçe'de I -> ı, İ -> i olmalı
+_TR_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_NON_LETTER_RE = re.compile(r"[^a-zçğıöşü\s]+")
+_RATING_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+
+HIGH, LOW = "yuksek", "dusuk"
+
+
+def turkish_lower(text):
+    return text.translate(_TR_UPPER).lower()
+
+
+def tokenize(text):
+    """Metni Türkçe küçük harfe çevirip kelimelere ayırır; kısa kelimeler ve stop words atılır."""
+    words = _NON_LETTER_RE.sub(" ", turkish_lower(text)).split()
+    return [w for w in words if len(w) >= MIN_TOKEN_LENGTH and w not in STOP_WORDS]
+
+
+def parse_rating(value):
+    """Yorum puanını 1-5 arası float'a çevirir; geçersizse None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        rating = float(value)
+    else:
+        match = _RATING_RE.search(str(value))
+        if not match:
+            return None
+        rating = float(match.group(1).replace(",", "."))
+    return rating if 1 <= rating <= 5 else None
+
+
+def band_of_rating(rating, min_rating=4):
+    """Puanın bandı: puansız -> HIGH, >= min_rating -> HIGH, <= 2 -> LOW, ara puanlar -> None."""
+    if rating is None or rating >= min_rating:
+        return HIGH
+    if rating <= 2:
+        return LOW
+    return None
+
+
+def rating_band(review, min_rating=4):
+    """
+    Yorumun puan bandı: (HIGH | LOW | None, puan).
+    Puanı olmayan yorumlar yüksek sayılır (bazı siteler puanı yorum metninde vermez);
+    puanı okunamayan veya ara banttaki yorumlar (ör. 3 yıldız) sayılmaz.
+    """
+    raw = review.get("rating")
+    if raw is None:
+        return HIGH, None
+    rating = parse_rating(raw)
+    if rating is None:
+        return None, None
+    return band_of_rating(rating, min_rating), rating
+
+
+def count_terms(texts):
+    """Metinleri tek metin olarak bir kez küçültüp temizler ve kelime frekanslarını döndürür."""
+    words = _NON_LETTER_RE.sub(" ", turkish_lower("\n".join(texts))).split()
+    return Counter(w for w in words if len(w) >= MIN_TOKEN_LENGTH and w not in STOP_WORDS)
+
+
+def review_text(review):
+    """Sayılmaya uygun yorum metni (boş/kısa ise None)."""
+    if not isinstance(review, dict):
+        return None
+    text = review.get("text")
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    return text if len(text) >= MIN_TEXT_LENGTH else None
+
+
+def iter_reviews(review_lists):
+    """reviews_list dizilerini (cursor'dan da gelebilir) tek tek geçerli yorum sözlüklerine açar."""
+    for reviews in review_lists:
+        if not reviews or not isinstance(reviews, list):
+            continue
+        for review in reviews:
+            if review_text(review) is not None:
+                yield review
+
+
+class BandCounter:
+    """Puan bandı başına kelime frekansı, yorum sayısı ve puan toplamı."""
+
+    def __init__(self):
+        self.terms = {HIGH: Counter(), LOW: Counter()}
+        self.reviews = {HIGH: 0, LOW: 0}
+        self.rating_sum = {HIGH: 0.0, LOW: 0.0}
+        self.rated = {HIGH: 0, LOW: 0}
+
+    def add_batch(self, band, texts):
+        # Batch tek metin olarak bir kez küçültülür ve temizlenir; yorum başına regex çağrısı yapılmaz
+        self.terms[band].update(count_terms(texts))
+
+    def add_counts(self, band, terms, reviews, rating=None):
+        """Önceden sayılmış (ör. review_stats'ta saklanan) frekansları ekler."""
+        self.terms[band].update(terms)
+        self.reviews[band] += reviews
+        if rating is not None:
+            self.rating_sum[band] += rating * reviews
+            self.rated[band] += reviews
+
+    def add_reviews(self, reviews, min_rating=4, batch_size=BATCH_SIZE):
+        reviews = iter(reviews)
+        while True:
+            batch = list(islice(reviews, batch_size))
+            if not batch:
+                break
+            texts = {HIGH: [], LOW: []}
+            for review in batch:
+                band, rating = rating_band(review, min_rating)
+                if band is None:
+                    continue
+                texts[band].append(review_text(review))
+                self.reviews[band] += 1
+                if rating is not None:
+                    self.rating_sum[band] += rating
+                    self.rated[band] += 1
+            for band, band_texts in texts.items():
+                if band_texts:
+                    self.add_batch(band, band_texts)
+        return self
+
+    def average(self, band):
+        return self.rating_sum[band] / self.rated[band] if self.rated[band] else None
+
+
+def keyword_summary(counter, top_k=20):
+    """BandCounter'dan yuksek_puan_yorum_analizi çıktısını üretir (hiç yorum yoksa None)."""
+    if not counter.reviews[HIGH] and not counter.reviews[LOW]:
+        return None
+    ortalama_yuksek = counter.average(HIGH)
+    ortalama_dusuk = counter.average(LOW)
+    return {
+        "yuksek_puan_kelimeler": [{"kelime": k, "frekans": n} for k, n in counter.terms[HIGH].most_common(top_k)],
+        "dusuk_puan_kelimeler": [{"kelime": k, "frekans": n} for k, n in counter.terms[LOW].most_common(top_k)],
+        "yuksek_puan_yorum_sayisi": counter.reviews[HIGH],
+        "dusuk_puan_yorum_sayisi": counter.reviews[LOW],
+        "ortalama_yuksek_puan": round(ortalama_yuksek, 2) if ortalama_yuksek else None,
+        "ortalama_dusuk_puan": round(ortalama_dusuk, 2) if ortalama_dusuk else None,
+    }
+
+
+def analyze_review_stream(reviews, min_rating=4, top_k=20, batch_size=BATCH_SIZE):
+    """Tek tek yorum sözlüklerinin akışından (ör. reviews cursor'ı) anahtar kelime özetini hesaplar."""
+    valid = (review for review in reviews if review_text(review) is not None)
+    counter = BandCounter().add_reviews(valid, min_rating, batch_size)
+    return keyword_summary(counter, top_k)
+
+
+def analyze_reviews(review_lists, min_rating=4, top_k=20, batch_size=BATCH_SIZE):
+    """reviews_list dizilerinin akışından yüksek/düşük puanlı anahtar kelime özetini hesaplar."""
+    counter = BandCounter().add_reviews(iter_reviews(review_lists), min_rating, batch_size)
+    return keyword_summary(counter, top_k)
@@ -0,0 +1,135 @@
+# veri_toplama/schedule_store.py
+# (ürün, site) çiftleri için kalıcı, değişime duyarlı tarama takvimi (scrape_schedule koleksiyonu).
+# Fiyatı değişen çiftler daha sık, değişmeyenler üstel olarak daha seyrek taranır;
+# hatalı görevler jitter'lı geri çekilme ile yeniden denenir. periodic_runner bu kuyruktan çalışır.
+
+import os
+import random
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+# ----------------- YAPILANDIRMA -----------------
+SCHEDULE_COLLECTION = "scrape_schedule"
+
+MIN_INTERVAL_S = int(os.getenv("SCHEDULE_MIN_INTERVAL", str(15 * 60)))
+BASE_INTERVAL_S = int(os.getenv("SCHEDULE_BASE_INTERVAL", str(60 * 60)))
+MAX_INTERVAL_S = int(os.getenv("SCHEDULE_MAX_INTERVAL", str(24 * 60 * 60)))
+BACKOFF_FACTOR = 2.0
+INTERVAL_JITTER = 0.1  # Aynı anda vadesi gelen yığılmalar olmasın diye ±%10
+
+RETRY_BASE_S = 5 * 60
+RETRY_MAX_S = 2 * 60 * 60
+
+
+def schedule_id(product_id, site):
+    return f"{product_id}|{site}"
+
+
+def _jittered(seconds, spread=INTERVAL_JITTER):
+    return seconds * random.uniform(1 - spread, 1 + spread)
+
+
+def ensure_schedule(db, product_list, sites, now=None):
+    """Her (ürün, site) çifti için takvim kaydı oluşturur; mevcut kayıtlara dokunmaz. Yeni kayıtlar hemen vadelidir."""
+    now = now or datetime.utcnow()
+    ops = []
+    for product in product_list:
+        product_id = product.get("product_id")
+        if not product_id:
+            continue
+        for site in sites:
+            ops.append(UpdateOne(
+                {"_id": schedule_id(product_id, site)},
+                {"$setOnInsert": {
+                    "product_id": product_id,
+                    "site": site,
+                    "next_due": now,
+                    "interval_s": BASE_INTERVAL_S,
+                    "fail_count": 0,
+                    "last_price": None,
+                    "last_status": None,
+                }},
+                upsert=True,
+            ))
+    if not ops:
+        return 0
+    result = db[SCHEDULE_COLLECTION].bulk_write(ops, ordered=False)
+    return result.upserted_count
+
+
+def _scope(product_ids):
+    # targets.json'dan çıkarılan ürünlerin kayıtları kuyruğu tıkamasın
+    return {"product_id": {"$in": list(product_ids)}} if product_ids is not None else {}
+
+
+def due_entries(db, limit, product_ids=None, now=None):
+    """Vadesi gelmiş kayıtları en gecikmiş olandan başlayarak döndürür (öncelik kuyruğu)."""
+    now = now or datetime.utcnow()
+    query = {"next_due": {"$lte": now}, **_scope(product_ids)}
+    cursor = db[SCHEDULE_COLLECTION].find(query).sort("next_due", 1).limit(limit)
+    return list(cursor)
+
+
+def next_due_at(db, product_ids=None):
+    """En yakın vade zamanını döndürür (takvim boşsa None)."""
+    doc = db[SCHEDULE_COLLECTION].find_one(_scope(product_ids), {"next_due": 1}, sort=[("next_due", 1)])
+    return doc["next_due"] if doc else None
+
+
+def plan_next(entry, status, price=None, now=None):
+    """
+    Bir görev sonucuna göre takvim kaydının yeni alanlarını hesaplar.
+    - ok + fiyat değişti: aralık yarıya iner (en az MIN_INTERVAL_S)
+    - ok + fiyat aynı / not_found / skipped: aralık BACKOFF_FACTOR ile büyür (en fazla MAX_INTERVAL_S)
+    - ok + ilk gözlem: aralık korunur
+    - error: aralık korunur, RETRY_BASE_S * 2^(hata-1) kadar jitter'lı bekleyip yeniden denenir
+    """
+    now = now or datetime.utcnow()
+    interval = entry.get("interval_s") or BASE_INTERVAL_S
+    update = {"last_status": status, "last_run": now}
+
+    if status == "error":
+        fail_count = entry.get("fail_count", 0) + 1
+        delay = min(RETRY_MAX_S, RETRY_BASE_S * (2 ** (fail_count - 1)))
+        update.update({
+            "fail_count": fail_count,
+            "next_due": now + timedelta(seconds=delay * random.uniform(0.5, 1.5)),
+        })
+        return update
+
+    observed = status == "ok" and price is not None
+    first_observation = observed and entry.get("last_price") is None
+    changed = observed and not first_observation and price != entry["last_price"]
+    if changed:
+        interval = max(MIN_INTERVAL_S, interval / BACKOFF_FACTOR)
+        update["changed_at"] = now
+    elif not first_observation:
+        # İlk gözlemde karşılaştırılacak fiyat yok; aralık korunur
+        interval = min(MAX_INTERVAL_S, interval * BACKOFF_FACTOR)
+    if status == "ok" and price is not None:
+        update["last_price"] = price
+    update.update({
+        "interval_s": int(interval),
+        "fail_count": 0,
+        "next_due": now + timedelta(seconds=_jittered(interval)),
+    })
+    return update
+
+
+def record_outcomes(db, entries, outcomes, now=None):
+    """
+    outcomes: {(product_id, site): (status, price)}. Sonucu olmayan kayıtlar hata sayılır.
+    Tüm güncellemeler tek bulk_write ile yazılır. Fiyatı değişen çift sayısını döndürür.
+    """
+    now = now or datetime.utcnow()
+    ops, changed = [], 0
+    for entry in entries:
+        status, price = outcomes.get((entry["product_id"], entry["site"]), ("error", None))
+        update = plan_next(entry, status, price, now)
+        if "changed_at" in update:
+            changed += 1
+        ops.append(UpdateOne({"_id": entry["_id"]}, {"$set": update}))
+    if ops:
+        db[SCHEDULE_COLLECTION].bulk_write(ops, ordered=False)
+    return changed
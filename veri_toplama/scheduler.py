@@ -0,0 +1,203 @@
+# veri_toplama/scheduler.py
+# Scrape görevleri için alan adı (domain) bazlı zamanlayıcı.
+# Her domain için bir token bucket (görev başlatma hızı) ve eşzamanlılık sınırı tutulur;
+# görevler domainler arasında sırayla (round-robin) dağıtılır. Böylece işçiler boş kalmaz
+# ama tek bir hosta ani yük bindirilmez. Ana süreçte çalışır (engine.ScraperEngine).
+
+import json
+import os
+import time
+from collections import deque
+
+# ----------------- YAPILANDIRMA -----------------
+# Domain -> rate: saniyede başlatılabilecek görev, burst: biriken en fazla token,
+# concurrency: aynı anda çalışabilecek en fazla görev.
+# SCHEDULER_LIMITS ortam değişkeni ile JSON olarak ezilebilir:
+# SCHEDULER_LIMITS='{"trendyol": {"rate": 1.0, "burst": 3, "concurrency": 4}}'
+DEFAULT_LIMITS = {
+    "akakce": {"rate": 0.5, "burst": 2, "concurrency": 2},
+    "hepsiburada": {"rate": 0.5, "burst": 2, "concurrency": 2},
+    "trendyol": {"rate": 0.5, "burst": 2, "concurrency": 2},
+    "n11": {"rate": 0.5, "burst": 2, "concurrency": 2},
+    "pazarama": {"rate": 0.3, "burst": 1, "concurrency": 2},
+    "pttavm": {"rate": 0.3, "burst": 1, "concurrency": 2},
+}
+FALLBACK_LIMIT = {"rate": 0.5, "burst": 1, "concurrency": 1}
+
+
+def load_limits():
+    limits = {domain: dict(spec) for domain, spec in DEFAULT_LIMITS.items()}
+    raw = os.getenv("SCHEDULER_LIMITS")
+    if raw:
+        try:
+            for domain, spec in json.loads(raw).items():
+                limits.setdefault(domain, dict(FALLBACK_LIMIT)).update(spec)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"WARNING SCHEDULER_LIMITS okunamadı, varsayılanlar kullanılıyor: {e}")
+    return limits
+
+
+def total_concurrency(limits=None):
+    """Tüm domainlerin eşzamanlılık sınırlarının toplamı (anlamlı en fazla işçi sayısı)."""
+    return sum(spec["concurrency"] for spec in (limits or load_limits()).values())
+
+
+def share_limits(limits, nodes):
+    """
+    Domain sınırlarını `nodes` düğüm arasında paylaştırır: her düğüm hızın ve eşzamanlılığın
+    1/nodes kadarını alır. Böylece birden çok makineden taranırken toplam yük tek makine ile aynı kalır.
+    """
+    nodes = max(1, int(nodes))
+    if nodes == 1:
+        return limits
+    return {
+        domain: {
+            "rate": spec["rate"] / nodes,
+            "burst": max(1, spec["burst"] // nodes),
+            "concurrency": max(1, spec["concurrency"] // nodes),
+        }
+        for domain, spec in limits.items()
+    }
+
+
+class TokenBucket:
+    """Saniyede rate token dolan, en fazla burst token biriktiren kova."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(max(1, burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now=None):
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class DomainState:
+    def __init__(self, spec):
+        self.bucket = TokenBucket(spec["rate"], spec["burst"])
+        self.concurrency = spec["concurrency"]
+        self.queue = deque()
+        self.in_flight = 0
+        self.dispatched = 0
+        self.completed = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+
+class DomainScheduler:
+    """
+    Görevleri domain kuyruklarında tutar ve başlatılmaya hazır olanı seçer.
+
+        scheduler.submit("trendyol", task)
+        picked = scheduler.next_ready()      # (domain, task) veya None
+        ...
+        scheduler.done(domain)               # görev bittiğinde
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits or load_limits()
+        self.domains = {}
+        self._order = deque()
+        self.started = time.monotonic()
+
+    def _state(self, domain):
+        if domain not in self.domains:
+            self.domains[domain] = DomainState(self.limits.get(domain, FALLBACK_LIMIT))
+            self._order.append(domain)
+        return self.domains[domain]
+
+    def submit(self, domain, item):
+        self._state(domain).queue.append((time.monotonic(), item))
+
+    @property
+    def pending(self):
+        return sum(len(s.queue) for s in self.domains.values())
+
+    @property
+    def in_flight(self):
+        return sum(s.in_flight for s in self.domains.values())
+
+    def next_ready(self):
+        """Sırası gelen domainlerden başlatılabilecek ilk görevi döndürür (round-robin)."""
+        now = time.monotonic()
+        for _ in range(len(self._order)):
+            domain = self._order[0]
+            self._order.rotate(-1)
+            state = self.domains[domain]
+            if not state.queue or state.in_flight >= state.concurrency:
+                continue
+            if not state.bucket.try_take(now):
+                continue
+            enqueued_at, item = state.queue.popleft()
+            waited = now - enqueued_at
+            state.in_flight += 1
+            state.dispatched += 1
+            state.wait_total_s += waited
+            state.wait_max_s = max(state.wait_max_s, waited)
+            return domain, item
+        return None
+
+    def done(self, domain):
+        state = self.domains[domain]
+        state.in_flight -= 1
+        state.completed += 1
+
+    def wait_hint(self):
+        """
+        Kuyrukta olup eşzamanlılık sınırına takılmamış domainlerin bir sonraki token'ına
+        kalan en kısa süre. Hepsi sınırdaysa None (bir görevin bitmesi beklenmeli).
+        """
+        now = time.monotonic()
+        waits = [
+            s.bucket.time_until_token(now)
+            for s in self.domains.values()
+            if s.queue and s.in_flight < s.concurrency
+        ]
+        return min(waits) if waits else None
+
+    def snapshot(self):
+        """Domain bazında kuyruk derinliği, çalışan görev ve bekleme süresi istatistikleri."""
+        domains = {}
+        for domain, s in self.domains.items():
+            domains[domain] = {
+                "queued": len(s.queue),
+                "in_flight": s.in_flight,
+                "dispatched": s.dispatched,
+                "completed": s.completed,
+                "avg_wait_s": round(s.wait_total_s / s.dispatched, 2) if s.dispatched else 0.0,
+                "max_wait_s": round(s.wait_max_s, 2),
+            }
+        return {
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "queued": self.pending,
+            "in_flight": self.in_flight,
+            "domains": domains,
+        }
+
+    def report_lines(self):
+        snap = self.snapshot()
+        lines = [f"Zamanlayıcı: {snap['elapsed_s']}s | kuyruk={snap['queued']} | çalışan={snap['in_flight']}"]
+        for domain, d in snap["domains"].items():
+            lines.append(
+                f"  {domain}: {d['completed']}/{d['dispatched'] + d['queued']} bitti, "
+                f"kuyruk={d['queued']} çalışan={d['in_flight']} "
+                f"ort. bekleme={d['avg_wait_s']}s en fazla={d['max_wait_s']}s"
+            )
+        return lines
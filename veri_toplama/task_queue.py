@@ -0,0 +1,237 @@
+# veri_toplama/task_queue.py
+# MongoDB üzerinde kalıcı scrape görev kuyruğu (scrape_tasks koleksiyonu).
+# Her çalıştırma (run) ürün başına bir Akakçe "base" görevi ile başlar; base görevi bitince
+# o ürünün site görevleri base_data gömülü olarak kuyruğa eklenir.
+# Durumlar: pending -> running (lease) -> done | failed. Lease'i dolan görevler yeniden alınabilir;
+# böylece çöken bir çalıştırma kaldığı yerden devam eder ve birden çok süreç kuyruğu güvenle boşaltır.
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, UpdateOne
+
+# ----------------- YAPILANDIRMA -----------------
+TASKS_COLLECTION = "scrape_tasks"
+LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "300"))
+HEARTBEAT_SECONDS = max(5, LEASE_SECONDS // 5)
+MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+BASE_STAGE, SITE_STAGE = "base", "site"
+BASE_SITE = "akakce"
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def node_id():
+    """Bu sürecin kuyruktaki kimliği (lease sahibi)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def task_id(run_id, product_id, site):
+    # Belirlenimci kimlik: aynı görev iki kez eklenmez, sonuç hangi göreve ait bulunabilir
+    return f"{run_id}|{product_id}|{site}"
+
+
+def _task_op(run_id, stage, site, config, extra=None, now=None):
+    doc = {
+        "run_id": run_id,
+        "stage": stage,
+        "product_id": config["product_id"],
+        "site": site,
+        "config": config,
+        "state": PENDING,
+        "attempts": 0,
+        "created_at": now or datetime.utcnow(),
+        **(extra or {}),
+    }
+    return UpdateOne(
+        {"_id": task_id(run_id, config["product_id"], site)},
+        {"$setOnInsert": doc},
+        upsert=True,
+    )
+
+
+def enqueue_run(db, product_list, sites_by_product=None, run_id=None):
+    """Ürünler için base görevlerini ekler ve run_id döndürür. sites_by_product ürün başına siteleri sınırlar."""
+    run_id = run_id or new_run_id()
+    now = datetime.utcnow()
+    ops = []
+    for product in product_list:
+        if not product.get("product_id"):
+            continue
+        sites = (sites_by_product or {}).get(product["product_id"])
+        ops.append(_task_op(run_id, BASE_STAGE, BASE_SITE, product, {"sites": sites}, now))
+    if ops:
+        db[TASKS_COLLECTION].bulk_write(ops, ordered=False)
+    return run_id
+
+
+def enqueue_site_tasks(db, run_id, site_tasks):
+    """Base görevinden türeyen site görevlerini ekler (tekrar eklemeye karşı idempotent)."""
+    now = datetime.utcnow()
+    ops = [_task_op(run_id, SITE_STAGE, t["target_site"], t, now=now) for t in site_tasks]
+    if ops:
+        db[TASKS_COLLECTION].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def claim(db, owner, limit, run_id=None, stage=None):
+    """
+    En fazla `limit` görevi atomik olarak (find_one_and_update) bu sahibe kiralar.
+    Bekleyen veya lease'i dolmuş görevler alınır; her alış attempts'i artırır.
+    """
+    query = {
+        "$or": [
+            {"state": PENDING},
+            {"state": RUNNING, "lease_expires": {"$lt": datetime.utcnow()}},
+        ],
+        "attempts": {"$lt": MAX_ATTEMPTS},
+    }
+    if run_id:
+        query["run_id"] = run_id
+    if stage:
+        query["stage"] = stage
+    claimed = []
+    col = db[TASKS_COLLECTION]
+    for _ in range(limit):
+        now = datetime.utcnow()
+        doc = col.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "state": RUNNING,
+                    "lease_owner": owner,
+                    "lease_expires": now + timedelta(seconds=LEASE_SECONDS),
+                    "heartbeat_at": now,
+                    "started_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            break
+        claimed.append(doc)
+    return claimed
+
+
+def complete(db, task, owner, result, ok=True):
+    """
+    Görevin sonucunu yazar. Başarısız görev deneme hakkı kaldıysa tekrar pending olur.
+    Lease başka bir sürece geçmişse (sahiplik kaybı) yazmaz ve False döndürür.
+    """
+    if ok:
+        state = DONE
+    else:
+        state = PENDING if task.get("attempts", 0) < MAX_ATTEMPTS else FAILED
+    updated = db[TASKS_COLLECTION].update_one(
+        {"_id": task["_id"], "lease_owner": owner, "state": RUNNING},
+        {
+            "$set": {"state": state, "result": result, "finished_at": datetime.utcnow()},
+            "$unset": {"lease_owner": "", "lease_expires": ""},
+        },
+    )
+    return updated.modified_count == 1
+
+
+def heartbeat(db, owner):
+    """Bu sahibin tüm çalışan görevlerinin lease süresini uzatır."""
+    now = datetime.utcnow()
+    db[TASKS_COLLECTION].update_many(
+        {"lease_owner": owner, "state": RUNNING},
+        {"$set": {"heartbeat_at": now, "lease_expires": now + timedelta(seconds=LEASE_SECONDS)}},
+    )
+
+
+class Heartbeat:
+    """
+    Arka planda HEARTBEAT_SECONDS aralıkla heartbeat atan bağlam yöneticisi.
+    on_beat verilirse her heartbeat'te çağrılır (ör. işçi düğüm kaydını yenilemek için).
+    """
+
+    def __init__(self, db, owner, interval=HEARTBEAT_SECONDS, on_beat=None):
+        self.db = db
+        self.owner = owner
+        self.interval = interval
+        self.on_beat = on_beat
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                heartbeat(self.db, self.owner)
+                if self.on_beat:
+                    self.on_beat()
+            except Exception as e:
+                print(f"WARNING heartbeat gönderilemedi: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+def run_status(db, run_id):
+    """Çalıştırmanın durum sayıları: {"pending": n, "running": n, "done": n, "failed": n}."""
+    counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+    for row in db[TASKS_COLLECTION].aggregate([
+        {"$match": {"run_id": run_id}},
+        {"$group": {"_id": "$state", "n": {"$sum": 1}}},
+    ]):
+        counts[row["_id"]] = row["n"]
+    return counts
+
+
+def has_unfinished(db, run_id=None):
+    query = {"state": {"$in": [PENDING, RUNNING]}}
+    if run_id:
+        query["run_id"] = run_id
+    return db[TASKS_COLLECTION].find_one(query, {"_id": 1}) is not None
+
+
+def fail_exhausted(db, run_id=None):
+    """Deneme hakkı bitmiş ama lease'i dolmuş (sahibi çökmüş) görevleri failed yapar. run_id yoksa tüm kuyruk."""
+    query = {
+        "state": RUNNING,
+        "attempts": {"$gte": MAX_ATTEMPTS},
+        "lease_expires": {"$lt": datetime.utcnow()},
+    }
+    if run_id:
+        query["run_id"] = run_id
+    db[TASKS_COLLECTION].update_many(
+        query,
+        {"$set": {"state": FAILED, "finished_at": datetime.utcnow()}, "$unset": {"lease_owner": "", "lease_expires": ""}},
+    )
+
+
+def latest_unfinished_run(db):
+    """Bitmemiş görevi olan en son çalıştırmanın run_id'si (yoksa None)."""
+    doc = db[TASKS_COLLECTION].find_one(
+        {"state": {"$in": [PENDING, RUNNING]}},
+        {"run_id": 1},
+        sort=[("created_at", -1)],
+    )
+    return doc["run_id"] if doc else None
+
+
+def run_results(db, run_id):
+    """Çalıştırmanın tüm biten görevlerinin sonuç sözlüklerini döndürür."""
+    return [
+        doc["result"]
+        for doc in db[TASKS_COLLECTION].find(
+            {"run_id": run_id, "state": {"$in": [DONE, FAILED]}, "result": {"$exists": True}},
+            {"result": 1},
+        )
+    ]
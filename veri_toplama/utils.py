@@ -4,12 +4,11 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager 
+import os
 import re
 import random
-import time
-from selenium.webdriver.support.ui import WebDriverWait
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 
 # Bloklanmaya karşı rastgele User-Agent listesi
@@ -21,6 +20,17 @@ USER_AGENTS = [
 
 HEADLESS = True  # Çoklu ürün (ör. 100+) için kaynak tüketimini azaltır
 
+# ChromeDriver yolu süreç başına bir kez çözülür (CHROMEDRIVER_PATH ile sabitlenebilir)
+_CHROMEDRIVER_PATH = None
+
+
+def get_chromedriver_path():
+    """ChromeDriver yolunu ilk çağrıda çözer, sonraki çağrılarda önbellekten döndürür."""
+    global _CHROMEDRIVER_PATH
+    if _CHROMEDRIVER_PATH is None:
+        _CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+    return _CHROMEDRIVER_PATH
+
 
 def initialize_driver():
     """Yeni bir tarayıcı oturumu başlatır."""
@@ -43,8 +53,10 @@ def initialize_driver():
     
     prefs = {"profile.managed_default_content_settings.images": 2}
     OPTIONS.add_experimental_option("prefs", prefs)
+    # readiness.wait_network_idle CDP ağ olaylarını performance logundan okur
+    OPTIONS.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     
-    SERVICE = Service(ChromeDriverManager().install()) 
+    SERVICE = Service(get_chromedriver_path())
     driver= webdriver.Chrome(service=SERVICE, options=OPTIONS)
     
 
@@ -74,21 +86,33 @@ def clean_and_parse_price(price_text):
     except ValueError:
         return 0.0
         
+AKAKCE_NO_SELLER_LIST = "Satıcı listesi bulunamadı"
+
+
 def scrape_akakce_base_data(driver, akakce_url):
-    """Akakçe'den ürünün adını ve satıcı listesinin temel verilerini çeker."""
-    driver.get(akakce_url)
-    
-    wait = WebDriverWait(driver, 30)
-    wait.until(EC.presence_of_element_located((By.ID, "PL")))
-    time.sleep(random.uniform(3, 5)) 
+    """Akakçe'den ürünün adını ve satıcı listesinin temel verilerini tarayıcı ile çeker."""
+    from readiness import load_page
+
+    # Satıcı listesi sunucu tarafında render edilir; #PL geldiğinde sayfa ayrıştırılabilir
+    if load_page(driver, akakce_url, ready=(By.ID, "PL"), timeout=30) is None:
+        return AKAKCE_NO_SELLER_LIST, []
 
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    return parse_akakce_html(driver.page_source)
+
+
+def parse_akakce_html(html):
+    """
+    Akakçe ürün sayfası HTML'inden (product_name, base_data) çıkarır.
+    Hem Selenium yolu hem de akakce_http (httpx) yolu bu ayrıştırıcıyı kullanır.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
     seller_list = soup.find('ul', id='PL')
     
     if not seller_list:
-        return "Satıcı listesi bulunamadı", []
+        return AKAKCE_NO_SELLER_LIST, []
         
-    product_name_element = soup.find('div', class_='pdt_v8').find('h1')
+    title_container = soup.find('div', class_='pdt_v8')
+    product_name_element = title_container.find('h1') if title_container else None
     product_name = product_name_element.text.strip() if product_name_element else "Başlık Bulunamadı"
     rows = seller_list.find_all('li')
     
@@ -170,4 +194,99 @@ def scrape_akakce_base_data(driver, akakce_url):
             continue
       #  print("DEBUG BASE DATA:", base_data)
             
-    return product_name, base_data
\ No newline at end of file
+    return product_name, base_data
+
+# ----------------- AKAKÇE KOORDİNATÖR YARDIMCILARI -----------------
+
+# Her pazar yeri için Akakçe vendor_name içinde aranan anahtar kelimeler
+SITE_KEYWORDS = {
+    "hepsiburada": ("hepsiburada",),
+    "trendyol": ("trendyol",),
+    "n11": ("n11",),
+    "pazarama": ("pazarama",),
+    "pttavm": ("ptt", "pttavm"),
+}
+
+
+def site_offers(base_data, site):
+    """base_data içinden verilen pazar yerine ait satıcı satırlarını döndürür."""
+    keywords = SITE_KEYWORDS.get(site, (site,))
+    matches = []
+    for item in base_data:
+        v_name = item["vendor_name"].lower()
+        link = item.get("link", "").lower()
+        # Hepsiburada satırları bazen sadece linkten tanınabiliyor
+        if any(k in v_name for k in keywords) or (site == "hepsiburada" and "hepsiburada" in link):
+            matches.append(item)
+    return matches
+
+
+def detail_page_key(url):
+    """Aynı ürün sayfasını tanımak için URL'den fragment ve utm_* izleme parametrelerini atar."""
+    parsed = urlparse(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parsed.query) if not k.startswith("utm_")])
+    return urlunparse(parsed._replace(query=query, fragment=""))
+
+
+def iter_offer_details(driver, db, items, resolve, deep_scrape):
+    """
+    Bir sitenin tüm satıcı satırları için (satır, nihai URL, detaylar) üretir.
+    Aynı pazar yeri sayfasına düşen satıcılar için detay sayfası görev içinde bir kez açılır.
+    """
+    details_by_page = {}
+    for item in items:
+        final_url = resolve(driver, item["link"], db)
+        if not final_url:
+            continue
+        page = detail_page_key(final_url)
+        if page not in details_by_page:
+            details_by_page[page] = deep_scrape(driver, final_url)
+        else:
+            print(f"DEBUG: {item['vendor_name']} / {item.get('seller_nickname')} aynı sayfada, detay tekrar açılmadı.")
+        yield item, final_url, details_by_page[page]
+
+
+def offers_data(docs):
+    """Kaydedilen tekliflerden görev sonucu verisi: en düşük fiyat ve teklif sayısı."""
+    prices = [d["price"] for d in docs if d.get("price") is not None]
+    return {"price": min(prices) if prices else None, "offers": len(docs)}
+
+
+def fetch_product_base_data(product_config, use_http=True):
+    """
+    Koordinatör aşaması: Akakçe sayfasını ürün başına BİR KEZ çeker ve
+    sonucu görev yapılandırmasına ekler (akakce_product_name, base_data).
+    Önce hafif HTTP yolu denenir; sayfa engellenmiş/eksikse tarayıcıya düşülür.
+    """
+    if use_http:
+        from akakce_http import fetch_base_data_http, HTTP_ENABLED
+        if HTTP_ENABLED:
+            outcome = fetch_base_data_http([product_config])[0]
+            if outcome["state"] == "ok":
+                return outcome["config"]
+            print(f"DEBUG: Akakçe HTTP yolu başarısız ({outcome['state']}: {outcome['detail']}), tarayıcıya düşülüyor.")
+
+    from driver_pool import borrow_driver
+
+    with borrow_driver() as driver:
+        product_name, base_data = scrape_akakce_base_data(driver, product_config["url"])
+    return enrich_with_base_data(product_config, product_name, base_data)
+
+
+def enrich_with_base_data(product_config, product_name, base_data):
+    """Görev yapılandırmasının kopyasına Akakçe verisini ekler."""
+    enriched = product_config.copy()
+    enriched["akakce_product_name"] = product_name
+    enriched["base_data"] = base_data
+    return enriched
+
+
+def get_base_data(product_config):
+    """
+    Koordinatörün hazırladığı base_data varsa onu kullanır; yoksa (tekil
+    çalıştırma) Akakçe'yi kendisi çeker.
+    """
+    if "base_data" in product_config:
+        return product_config.get("akakce_product_name") or product_config.get("product_name"), product_config["base_data"]
+    enriched = fetch_product_base_data(product_config)
+    return enriched["akakce_product_name"], enriched["base_data"]